@@ -1,5 +1,34 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+
+
+def ensure_triggers(using, plan=None, **kwargs):
+    from django.db import connections
+    from django.db.migrations.executor import MigrationExecutor
+    from .counters import install_counter_triggers
+    from .search import install_search_index
+
+    connection = connections[using]
+    # The triggers match the latest schema: after migrating backwards they
+    # would reference columns that are gone (the migrations create their own)
+    executor = MigrationExecutor(connection)
+    if executor.migration_plan(executor.loader.graph.leaf_nodes()):
+        return
+
+    install_search_index(connection)
+    install_counter_triggers(connection)
 
 
 class BooklistConfig(AppConfig):
     name = 'booklist'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .middleware import install_query_recorder
+
+        # ServerTimingMiddleware counts queries through a wrapper on each connection
+        connection_created.connect(install_query_recorder)
+
+        # Table rebuilds during migrate drop the FTS and counter triggers
+        post_migrate.connect(ensure_triggers, sender=self)
@@ -0,0 +1,122 @@
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+
+from .authentication import authenticate_jwt
+from .cache import cache_public_response
+from .filters import book_ordering, filter_books
+from .models import Book, UserBook
+from .pagination import KeysetPagination
+from .renderers import dumps
+from .rows import BookRowSerializer, requested_fields, sideloaded_users
+from .serializer import BookSerializer, UserSerializer, user_marks_queryset, marks_by_book
+
+
+# Native async versions of the hot read endpoints. DRF views are sync only,
+# so these are plain Django async views that reuse the serializers (and the
+# rows.py fast path), filters and pagination, and do every database access
+# through the async ORM. Responses are byte-for-byte the same as the sync
+# endpoints.
+
+
+def _json(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(dumps(data), content_type='application/json', status=status_code)
+
+
+def _error(exc):
+    """Same error body DRF's exception handler produces"""
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    return _json(data, exc.status_code)
+
+
+async def _authenticate(request):
+    """Authenticate with the async JWT lookup and wrap the request for DRF helpers"""
+    user = await authenticate_jwt(request)
+    drf_request = Request(request)
+    drf_request.user = user
+    return drf_request
+
+
+@cache_public_response
+@require_GET
+async def bookListAsync(request):
+    """
+    GET: Async version of bookList (same filters and pagination)
+    """
+    try:
+        request = await _authenticate(request)
+        fields, compact = requested_fields(request)
+        sideload = sideloaded_users(request, fields)
+        ordering = book_ordering(request)
+        serializer = BookRowSerializer(request, fields=fields, compact=compact, sideload_users=sideload)
+        books = serializer.rows(filter_books(request, Book.objects.order_by(*ordering)))
+
+        paginator = KeysetPagination(ordering)
+        if paginator.is_requested(request):
+            page = paginator.paginate_rows([row async for row in paginator.get_page_queryset(books, request)])
+        else:
+            paginator = None
+            page = [row async for row in books]
+    except APIException as exc:
+        return _error(exc)
+
+    if 'user_mark' in fields:
+        marks = user_marks_queryset(request.user, [row.id for row in page])
+        if marks is not None:
+            marks = [mark async for mark in marks]
+        serializer.user_marks = marks_by_book(marks)
+    data = serializer.serialize(page)
+
+    if paginator is not None:
+        data = {'next': paginator.get_next_link(), 'results': data}
+    elif sideload:
+        data = {'results': data}
+    if sideload:
+        data['users'] = serializer.users
+    return _json(data)
+
+
+@cache_public_response
+@require_GET
+async def bookDetailAsync(request, bookId):
+    """
+    GET: Async version of bookDetail
+    """
+    try:
+        request = await _authenticate(request)
+    except APIException as exc:
+        return _error(exc)
+
+    try:
+        book = await Book.objects.select_related('user').aget(pk=bookId)
+    except Book.DoesNotExist:
+        return _json({"error": "Book not found"}, status.HTTP_404_NOT_FOUND)
+
+    user_marks = {}
+    if request.user.is_authenticated:
+        mark = await UserBook.objects.filter(user=request.user, book=book).values('bought', 'read', 'onBookshelf').afirst()
+        if mark is not None:
+            user_marks[book.pk] = mark
+
+    serialized = BookSerializer(book, context={'request': request, 'user_marks': user_marks})
+    return _json(serialized.data)
+
+
+@require_GET
+async def userProfileAsync(request):
+    """
+    GET: Async version of userProfile
+    """
+    try:
+        request = await _authenticate(request)
+    except APIException as exc:
+        return _error(exc)
+
+    if not request.user.is_authenticated:
+        return _json(
+            {"detail": "Authentication credentials were not provided."},
+            status.HTTP_401_UNAUTHORIZED
+        )
+    return _json(UserSerializer(request.user).data)
@@ -0,0 +1,217 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+User = get_user_model()
+
+USER_VERSION_KEY = 'booklist:user_version:{}'
+
+
+def get_user_version(user_id):
+    """
+    Return the auth version of a user, bumped whenever the user changes
+
+    Like the catalog version it lives in Django's cache, so with a shared
+    CACHES backend a change made through one worker invalidates every
+    worker. With the default per-process cache other workers keep their
+    entries until BOOK_AUTH_CACHE_TTL runs out.
+    """
+    key = USER_VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_user_version(user_id):
+    key = USER_VERSION_KEY.format(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+class TokenCache:
+    """
+    Thread-safe LRU of verified access tokens and snapshots of their users
+
+    Entries are keyed on the raw token and hold the validated token, the
+    user's field values and the user's auth version when they were loaded.
+    An entry is dropped once it is older than `ttl` seconds, once the token
+    expires or once the user's version changes (see invalidate_user), so a
+    deactivated account or a changed password is seen by the next request.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._by_user = {}
+        self._lock = threading.Lock()
+
+    def get(self, raw_token):
+        """Return (user, validated token) of a cached token, or None"""
+        with self._lock:
+            entry = self._entries.get(raw_token)
+            if entry is not None:
+                self._entries.move_to_end(raw_token)
+        if entry is None:
+            return None
+
+        validated_token, user_id, version, db, values, expires = entry
+        if time.time() >= expires or get_user_version(user_id) != version:
+            self._remove(raw_token)
+            return None
+        # A fresh instance per request, views may modify and save it
+        return User.from_db(db, _USER_FIELDS, values), validated_token
+
+    def set(self, raw_token, validated_token, user, version):
+        if self.max_entries <= 0:
+            return
+        expires = min(time.time() + self.ttl, validated_token.get('exp', float('inf')))
+        values = tuple(getattr(user, name) for name in _USER_FIELDS)
+        entry = (validated_token, user.pk, version, user._state.db, values, expires)
+        with self._lock:
+            self._remove_locked(raw_token)
+            self._entries[raw_token] = entry
+            self._by_user.setdefault(user.pk, set()).add(raw_token)
+            while len(self._entries) > self.max_entries:
+                self._remove_locked(next(iter(self._entries)))
+
+    def _remove(self, raw_token):
+        with self._lock:
+            self._remove_locked(raw_token)
+
+    def _remove_locked(self, raw_token):
+        entry = self._entries.pop(raw_token, None)
+        if entry is None:
+            return
+        tokens = self._by_user.get(entry[1])
+        tokens.discard(raw_token)
+        if not tokens:
+            del self._by_user[entry[1]]
+
+    def invalidate_user(self, user_id):
+        """Forget every cached token of a user, in all workers sharing Django's cache"""
+        bump_user_version(user_id)
+        with self._lock:
+            for raw_token in list(self._by_user.get(user_id, ())):
+                self._remove_locked(raw_token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+
+_USER_FIELDS = tuple(field.attname for field in User._meta.concrete_fields)
+
+token_cache = TokenCache(
+    getattr(settings, 'BOOK_AUTH_CACHE_SIZE', 10000),
+    getattr(settings, 'BOOK_AUTH_CACHE_TTL', 30),
+)
+
+
+def _token_user_id(validated_token):
+    try:
+        return validated_token[api_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken("Token contained no recognizable user identification")
+
+
+def check_user(user, validated_token):
+    """Raise AuthenticationFailed for an inactive user or a token issued before a password change"""
+    if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+        raise AuthenticationFailed("User is inactive", code="user_inactive")
+
+    if api_settings.CHECK_REVOKE_TOKEN:
+        if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed("The user's password has been changed.", code="password_changed")
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that skips the token verification and the user query
+    for tokens seen in the last BOOK_AUTH_CACHE_TTL seconds (see TokenCache)
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        cached = token_cache.get(raw_token)
+        if cached is not None:
+            return cached
+
+        validated_token = self.get_validated_token(raw_token)
+        # Read before the user, so a change made meanwhile invalidates the entry
+        version = get_user_version(_token_user_id(validated_token))
+        user = self.get_user(validated_token)
+        token_cache.set(raw_token, validated_token, user, version)
+        return user, validated_token
+
+    def get_user(self, validated_token):
+        # Always from the primary: a lagging replica would still return the
+        # row from before a deactivation or password change, and it would be
+        # cached under the new version
+        try:
+            user = User.objects.using(DEFAULT_DB_ALIAS).get(
+                **{api_settings.USER_ID_FIELD: _token_user_id(validated_token)}
+            )
+        except User.DoesNotExist:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        return check_user(user, validated_token)
+
+
+async def authenticate_jwt(request):
+    """
+    Async counterpart of JWTAuthentication for the async views
+
+    Token validation is pure CPU work and reused as-is, only the user lookup
+    goes through the async ORM. Shares CachedJWTAuthentication's token cache.
+    Returns AnonymousUser when there is no Authorization header, raises
+    AuthenticationFailed/InvalidToken like the sync authentication class.
+    """
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        return AnonymousUser()
+
+    raw_token = authentication.get_raw_token(header)
+    if raw_token is None:
+        return AnonymousUser()
+
+    cached = token_cache.get(raw_token)
+    if cached is not None:
+        return cached[0]
+
+    validated_token = authentication.get_validated_token(raw_token)
+    user_id = _token_user_id(validated_token)
+    version = get_user_version(user_id)
+
+    try:
+        # From the primary, like CachedJWTAuthentication.get_user
+        user = await User.objects.using(DEFAULT_DB_ALIAS).aget(**{api_settings.USER_ID_FIELD: user_id})
+    except User.DoesNotExist:
+        raise AuthenticationFailed("User not found", code="user_not_found")
+    check_user(user, validated_token)
+
+    token_cache.set(raw_token, validated_token, user, version)
+    return user
@@ -0,0 +1,188 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+
+from .routers import pin_seconds, replica_used
+
+
+CATALOG_VERSION_KEY = 'booklist:catalog_version'
+CATALOG_CHANGED_KEY = 'booklist:catalog_changed'
+
+
+def get_catalog_version():
+    """
+    Return the current catalog version
+
+    The version lives in Django's cache so every worker sharing that cache
+    sees the same value; with the default per-process LocMemCache a change
+    only invalidates the process that handled it (see CACHES in settings).
+    If it was evicted a fresh time-based value is used, which can never
+    collide with an older version.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Invalidate every cached public book response"""
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+    cache.set(CATALOG_CHANGED_KEY, time.time(), timeout=None)
+
+
+def replica_may_be_stale():
+    """
+    True if the read replicas may not have the last catalog change yet
+
+    They are assumed to lag at most BOOK_PRIMARY_PIN_SECONDS behind.
+    """
+    changed = cache.get(CATALOG_CHANGED_KEY)
+    return changed is not None and time.time() - changed < pin_seconds()
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU of rendered response bodies bounded by total size in bytes
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, etag, content_type, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[2])
+            self._entries[key] = (etag, content_type, body)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+response_cache = ResponseCache(getattr(settings, 'BOOK_RESPONSE_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+
+
+def make_etag(body):
+    return '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def etag_matches(request, etag):
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    return header.strip() == '*' or etag in [tag.strip() for tag in header.split(',')]
+
+
+def _finalize(response, etag):
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    patch_vary_headers(response, ('Accept', 'Authorization'))
+    return response
+
+
+def _cached_response(request, key):
+    entry = response_cache.get(key)
+    if entry is None:
+        return None
+    etag, content_type, body = entry
+    if etag_matches(request, etag):
+        return _finalize(HttpResponseNotModified(), etag)
+    return _finalize(HttpResponse(body, content_type=content_type), etag)
+
+
+def _store_response(request, key, response):
+    if response.status_code != 200 or response.streaming:
+        return response
+    if hasattr(response, 'render'):
+        response.render()
+
+    body = response.content
+    etag = make_etag(body)
+    # Not under the new catalog version if it may predate the change
+    if not (replica_used() and replica_may_be_stale()):
+        response_cache.set(key, etag, response['Content-Type'], body)
+    if etag_matches(request, etag):
+        return _finalize(HttpResponseNotModified(), etag)
+    return _finalize(response, etag)
+
+
+def _cache_key(request):
+    if request.method != 'GET' or 'Authorization' in request.headers:
+        return None
+    # Engagement counters change with every mark, without a catalog change:
+    # entries roll over every BOOK_RESPONSE_CACHE_TTL seconds instead
+    ttl = getattr(settings, 'BOOK_RESPONSE_CACHE_TTL', 60)
+    period = int(time.time() // ttl) if ttl else 0
+    # Bodies hold absolute URLs (cover, coverRenditions, coverProxyUrl)
+    origin = f'{request.scheme}://{request.get_host()}'
+    return (get_catalog_version(), period, origin, request.get_full_path(), request.headers.get('Accept', ''))
+
+
+def cache_public_response(view):
+    """
+    Serve anonymous GETs of a book view from the versioned response cache
+
+    Entries are keyed on the catalog version, scheme and host, full path and
+    Accept header, so a Book or User change (see signals.py) makes every
+    older entry unreachable.
+    Entries also expire after at most BOOK_RESPONSE_CACHE_TTL seconds, which
+    bounds how stale the engagement counters can get.
+    Responses carry a strong ETag; a matching If-None-Match on a cached
+    entry gets a 304 without touching the database. Works on sync and
+    async views.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            key = _cache_key(request)
+            if key is None:
+                return await view(request, *args, **kwargs)
+            cached = _cached_response(request, key)
+            if cached is not None:
+                return cached
+            return _store_response(request, key, await view(request, *args, **kwargs))
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = _cache_key(request)
+        if key is None:
+            return view(request, *args, **kwargs)
+        cached = _cached_response(request, key)
+        if cached is not None:
+            return cached
+        return _store_response(request, key, view(request, *args, **kwargs))
+
+    return wrapper
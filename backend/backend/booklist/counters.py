@@ -0,0 +1,131 @@
+from django.db import connection as default_connection
+
+from .models import Book, UserBook
+
+
+# Book counter column for each UserBook flag
+COUNTER_COLUMNS = {
+    'read': 'read_count',
+    'bought': 'bought_count',
+    'onBookshelf': 'shelved_count',
+}
+
+BOOK_TABLE = Book._meta.db_table
+MARK_TABLE = UserBook._meta.db_table
+TRIGGER_PREFIX = 'booklist_book_counters'
+
+
+def _flag(name):
+    return f'"{UserBook._meta.get_field(name).column}"'
+
+
+def _changes(row, sign):
+    return ', '.join(f'{counter} = {counter} {sign} {row}.{_flag(flag)}' for flag, counter in COUNTER_COLUMNS.items())
+
+
+def _any_flag(row):
+    return ' OR '.join(f'{row}.{_flag(flag)}' for flag in COUNTER_COLUMNS)
+
+
+def _flag_changed():
+    return ' OR '.join(f'old.{_flag(flag)} != new.{_flag(flag)}' for flag in COUNTER_COLUMNS)
+
+
+# The counters change in the same statement (so the same transaction) as
+# the mark, whether it comes from marks.py's raw SQL, bulk_create or a
+# cascading delete
+TRIGGERS = {
+    f'{TRIGGER_PREFIX}_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS {TRIGGER_PREFIX}_ai AFTER INSERT ON {MARK_TABLE}
+        WHEN {_any_flag('new')} BEGIN
+            UPDATE {BOOK_TABLE} SET {_changes('new', '+')} WHERE id = new.book_id;
+        END
+    """,
+    f'{TRIGGER_PREFIX}_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS {TRIGGER_PREFIX}_ad AFTER DELETE ON {MARK_TABLE}
+        WHEN {_any_flag('old')} BEGIN
+            UPDATE {BOOK_TABLE} SET {_changes('old', '-')} WHERE id = old.book_id;
+        END
+    """,
+    f'{TRIGGER_PREFIX}_au': f"""
+        CREATE TRIGGER IF NOT EXISTS {TRIGGER_PREFIX}_au
+        AFTER UPDATE OF {', '.join(_flag(flag) for flag in COUNTER_COLUMNS)}, book_id ON {MARK_TABLE}
+        WHEN old.book_id != new.book_id OR {_flag_changed()} BEGIN
+            UPDATE {BOOK_TABLE} SET {_changes('old', '-')} WHERE id = old.book_id;
+            UPDATE {BOOK_TABLE} SET {_changes('new', '+')} WHERE id = new.book_id;
+        END
+    """,
+}
+
+
+def is_supported(connection=default_connection):
+    return connection.vendor == 'sqlite'
+
+
+def install_counter_triggers(connection=default_connection):
+    """
+    Create the triggers that keep the Book engagement counters up to date
+
+    Like the search index triggers, they are dropped by SQLite table rebuilds
+    during migrate, so this runs after every migrate and recounts every book
+    when a trigger had to be recreated.
+    """
+    if not is_supported(connection):
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s",
+            [MARK_TABLE]
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        for sql in TRIGGERS.values():
+            cursor.execute(sql)
+
+    if not set(TRIGGERS) <= existing:
+        reconcile_counters(connection)
+
+
+def drop_counter_triggers(connection=default_connection):
+    if not is_supported(connection):
+        return
+
+    with connection.cursor() as cursor:
+        for name in TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def reconcile_counters(connection=default_connection, batch_size=10000):
+    """
+    Recount the engagement counters from UserBook and fix the ones that drifted
+
+    Books are recounted in id ranges of `batch_size`, one UPDATE each, so a
+    full pass doesn't hold the write lock for long. Only rows whose counters
+    differ are written. Returns the number of books fixed.
+    """
+    counters = list(COUNTER_COLUMNS.values())
+    totals = ', '.join(
+        f'COALESCE(SUM(CASE WHEN m.{_flag(flag)} THEN 1 ELSE 0 END), 0) AS {counter}'
+        for flag, counter in COUNTER_COLUMNS.items()
+    )
+    sql = (
+        f'UPDATE {BOOK_TABLE} SET {", ".join(f"{counter} = counts.{counter}" for counter in counters)} '
+        f'FROM ('
+        f'SELECT b.id AS book_id, {totals} FROM {BOOK_TABLE} b '
+        f'LEFT JOIN {MARK_TABLE} m ON m.book_id = b.id '
+        f'WHERE b.id >= %s AND b.id < %s GROUP BY b.id'
+        f') AS counts '
+        f'WHERE {BOOK_TABLE}.id = counts.book_id '
+        f'AND ({" OR ".join(f"{BOOK_TABLE}.{counter} != counts.{counter}" for counter in counters)})'
+    )
+
+    fixed = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN(id), MAX(id) FROM {BOOK_TABLE}')
+        low, high = cursor.fetchone()
+        if low is None:
+            return 0
+        for start in range(low, high + 1, batch_size):
+            cursor.execute(sql, [start, start + batch_size])
+            fixed += cursor.rowcount
+    return fixed
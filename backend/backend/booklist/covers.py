@@ -0,0 +1,248 @@
+import hashlib
+import http.client
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import Future
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponseNotModified
+from django.urls import reverse
+
+from .cache import etag_matches
+
+
+class CoverFetchError(Exception):
+    """The remote cover could not be fetched"""
+
+
+class CachedCover:
+    def __init__(self, path, content_type, digest, size):
+        self.path = path
+        self.content_type = content_type
+        self.digest = digest
+        self.size = size
+
+
+class CoverCache:
+    """
+    Size-bounded on-disk LRU of remote cover images
+
+    Each URL is stored as two files named after the SHA-256 of the URL: the
+    image itself and a small JSON sidecar with its content type and the
+    SHA-256 of its content (used as the ETag). Reads refresh the file's
+    mtime, and when the cache grows past `max_bytes` the least recently
+    used entries are deleted. Concurrent misses for the same URL in this
+    process share a single fetch.
+    """
+    # Don't rewrite the mtime of hot entries on every hit
+    touch_interval = 60
+
+    def __init__(self, directory, max_bytes, timeout=5, max_image_bytes=5 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.max_image_bytes = max_image_bytes
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._total = None
+
+    def key(self, url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key[:2], key)
+        return base, base + '.json'
+
+    def get(self, url):
+        """Return the CachedCover of `url`, fetching it on a miss"""
+        key = self.key(url)
+        cover = self._read(key)
+        if cover is not None:
+            return cover
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+
+        if not leader:
+            return future.result()
+
+        try:
+            # Another process may have stored it meanwhile
+            cover = self._read(key) or self._store(key, *self.fetch(url))
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(cover)
+            return cover
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def open(self, url):
+        """Return (CachedCover, open image file) of `url`, fetching it on a miss"""
+        for _ in range(2):
+            cover = self.get(url)
+            try:
+                return cover, open(cover.path, 'rb')
+            except FileNotFoundError:
+                # Evicted between the lookup and the open, fetch it again
+                continue
+        raise CoverFetchError('Cover was evicted while being served')
+
+    def _read(self, key):
+        path, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as meta_file:
+                meta = json.load(meta_file)
+            stat = os.stat(path)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - stat.st_mtime > self.touch_interval:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return CachedCover(path, meta['content_type'], meta['digest'], stat.st_size)
+
+    def fetch(self, url):
+        """Download `url`, returning (content, content type)"""
+        request = urllib.request.Request(url, headers={'User-Agent': 'booklist-cover-proxy'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                content_type = response.headers.get_content_type()
+                if not content_type.startswith('image/'):
+                    raise CoverFetchError(f'Not an image: {content_type}')
+                content = response.read(self.max_image_bytes + 1)
+                # read(amt) returns what arrived when the origin closes early
+                if len(content) <= self.max_image_bytes and response.length:
+                    raise CoverFetchError('Incomplete response')
+        except (urllib.error.URLError, http.client.HTTPException, OSError, ValueError) as exc:
+            # HTTPException (IncompleteRead, BadStatusLine) is not an OSError
+            raise CoverFetchError(str(exc)) from exc
+
+        if len(content) > self.max_image_bytes:
+            raise CoverFetchError('Image too large')
+        return content, content_type
+
+    def _store(self, key, content, content_type):
+        path, meta_path = self._paths(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        digest = hashlib.sha256(content).hexdigest()
+
+        # Write to temporary names and rename, so readers never see half a file
+        suffix = f'.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(path + suffix, 'wb') as image_file:
+            image_file.write(content)
+        with open(meta_path + suffix, 'w') as meta_file:
+            json.dump({'content_type': content_type, 'digest': digest}, meta_file)
+        os.replace(path + suffix, path)
+        os.replace(meta_path + suffix, meta_path)
+
+        self._added(len(content))
+        return CachedCover(path, content_type, digest, len(content))
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.json') or name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def _added(self, size):
+        with self._lock:
+            if self._total is None:
+                self._total = sum(entry_size for _, entry_size, _ in self._entries())
+            else:
+                self._total += size
+            if self._total <= self.max_bytes:
+                return
+
+            # Other processes write here too, so evict from the real contents
+            entries = sorted(self._entries())
+            self._total = sum(entry_size for _, entry_size, _ in entries)
+            for _, entry_size, path in entries:
+                if self._total <= self.max_bytes:
+                    break
+                for stale in (path + '.json', path):
+                    try:
+                        os.remove(stale)
+                    except OSError:
+                        pass
+                self._total -= entry_size
+
+    def clear(self):
+        with self._lock:
+            for _, _, path in list(self._entries()):
+                for stale in (path + '.json', path):
+                    try:
+                        os.remove(stale)
+                    except OSError:
+                        pass
+            self._total = 0
+
+
+def is_proxied(url):
+    """Only covers on BOOK_COVER_PROXY_HOSTS go through the proxy"""
+    if not url:
+        return False
+    parts = urlsplit(url)
+    return parts.scheme in ('http', 'https') and parts.hostname in getattr(settings, 'BOOK_COVER_PROXY_HOSTS', ())
+
+
+def proxy_version(url):
+    """Short hash of the URL, added to proxy links so a new coverUrl busts browser caches"""
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()[:12]
+
+
+def proxy_url(book_id, url, request=None):
+    """Link to the book's cover through the proxy, or None if `url` is not proxied"""
+    if not is_proxied(url):
+        return None
+    link = f"{reverse('booklist:bookCover', args=[book_id])}?v={proxy_version(url)}"
+    return request.build_absolute_uri(link) if request is not None else link
+
+
+def cover_response(request, url):
+    """
+    Serve the cached copy of the cover at `url`
+
+    The ETag is the content hash. Proxy links carry the URL version
+    (see proxy_version): requests with the current version are cached as
+    immutable, others (no or an outdated `?v=`) only for
+    BOOK_COVER_UNVERSIONED_MAX_AGE seconds, as the book's coverUrl may change.
+    """
+    cover, image_file = cover_cache.open(url)
+    etag = f'"{cover.digest}"'
+    if etag_matches(request, etag):
+        image_file.close()
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(image_file, content_type=cover.content_type)
+    response['ETag'] = etag
+    if request.GET.get('v') == proxy_version(url):
+        response['Cache-Control'] = f"public, max-age={getattr(settings, 'BOOK_COVER_PROXY_MAX_AGE', 365 * 24 * 3600)}, immutable"
+    else:
+        response['Cache-Control'] = f"public, max-age={getattr(settings, 'BOOK_COVER_UNVERSIONED_MAX_AGE', 300)}"
+    return response
+
+
+cover_cache = CoverCache(
+    getattr(settings, 'BOOK_COVER_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cover_cache')),
+    getattr(settings, 'BOOK_COVER_CACHE_MAX_BYTES', 256 * 1024 * 1024),
+    timeout=getattr(settings, 'BOOK_COVER_PROXY_TIMEOUT', 5),
+)
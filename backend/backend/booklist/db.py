@@ -0,0 +1,59 @@
+import random
+import sqlite3
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, connection
+
+
+_LOCKED_MESSAGES = ('database is locked', 'database table is locked', 'database is busy')
+
+
+def is_locked_error(exc):
+    """True for SQLite's "database is locked" family of errors"""
+    return isinstance(exc, OperationalError) and any(message in str(exc) for message in _LOCKED_MESSAGES)
+
+
+def retry_on_locked(func):
+    """
+    Retry a write when SQLite reports the database as locked
+
+    busy_timeout already makes SQLite wait for the write lock, this covers
+    what is left: waits longer than the timeout and the immediate SQLITE_BUSY
+    of a transaction that cannot get the lock without deadlocking. The call
+    is retried up to BOOK_DB_WRITE_RETRIES times, sleeping BOOK_DB_RETRY_DELAY
+    seconds doubled on each attempt, with jitter, capped at
+    BOOK_DB_RETRY_MAX_DELAY. Only retried outside of atomic blocks: inside one
+    the whole transaction has to be restarted by its owner.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        retries = getattr(settings, 'BOOK_DB_WRITE_RETRIES', 4)
+        delay = getattr(settings, 'BOOK_DB_RETRY_DELAY', 0.05)
+        max_delay = getattr(settings, 'BOOK_DB_RETRY_MAX_DELAY', 1.0)
+        for attempt in range(retries + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as exc:
+                if attempt == retries or connection.in_atomic_block or not is_locked_error(exc):
+                    raise
+            time.sleep(min(delay * 2 ** attempt, max_delay) * random.uniform(0.5, 1.5))
+    return wrapper
+
+
+def snapshot_database(path):
+    """
+    Copy the primary SQLite database to the file at `path`
+
+    Keeps the stand-in read replica in sync (see sync_replica). Uses SQLite's
+    online backup API, so the copy is consistent and, in WAL mode, neither
+    writers on the primary nor open transactions on the copy are blocked;
+    replica connections see the new snapshot from their next transaction.
+    """
+    connection.ensure_connection()
+    target = sqlite3.connect(path, timeout=getattr(settings, 'SQLITE_PRAGMAS', {}).get('busy_timeout', 5000) / 1000)
+    try:
+        connection.connection.backup(target)
+    finally:
+        target.close()
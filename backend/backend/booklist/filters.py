@@ -0,0 +1,82 @@
+from rest_framework.exceptions import NotAuthenticated, ValidationError
+
+from .models import Book
+
+
+MARK_FIELDS = ('read', 'bought', 'onBookshelf')
+
+# ?sort= values, each a unique ordering backed by an index for keyset pagination
+BOOK_ORDERINGS = {
+    'author': ('author', 'id'),
+    'popular': ('-read_count', 'id'),
+}
+
+
+def book_ordering(request):
+    """
+    Return the book list ordering asked for with `?sort=`
+
+    author (default): by author, then id
+    popular: most read first, from the maintained read counter
+    """
+    sort = request.query_params.get('sort', 'author')
+    if sort not in BOOK_ORDERINGS:
+        raise ValidationError({"error": f"sort must be one of: {', '.join(BOOK_ORDERINGS)}"})
+    return BOOK_ORDERINGS[sort]
+
+
+def filter_books(request, queryset):
+    """
+    Apply the book list query parameters to `queryset`
+
+    author: case-insensitive exact author name
+    genre: case-insensitive exact genre
+    user: uploader's user ID
+    marked: `any` or a comma separated list of read/bought/onBookshelf,
+            books the current user has marked with all of the given flags
+
+    Every filter is backed by an index (normalized author/genre columns,
+    the user foreign key and the partial UserBook flag indexes).
+    """
+    params = request.query_params
+
+    author = params.get('author')
+    if author:
+        queryset = queryset.filter(author_normalized=Book.normalize(author))
+
+    genre = params.get('genre')
+    if genre:
+        queryset = queryset.filter(genre_normalized=Book.normalize(genre))
+
+    uploader = params.get('user')
+    if uploader:
+        try:
+            queryset = queryset.filter(user_id=int(uploader))
+        except ValueError:
+            raise ValidationError({"error": "user must be a user ID"})
+
+    marked = params.get('marked')
+    if marked:
+        if not request.user.is_authenticated:
+            raise NotAuthenticated("Authentication required to filter by marks")
+
+        # A single filter() call keeps every condition on the same UserBook row
+        conditions = {'user_marks__user': request.user}
+        for flag in mark_flags(marked):
+            conditions[f'user_marks__{flag}'] = True
+        queryset = queryset.filter(**conditions)
+
+    return queryset
+
+
+def mark_flags(marked):
+    """
+    Parse a `marked` parameter into the list of flags to require
+
+    `any` requires none (any mark), unknown flags are a validation error.
+    """
+    flags = [flag.strip() for flag in marked.split(',') if flag.strip()]
+    unknown = [flag for flag in flags if flag != 'any' and flag not in MARK_FIELDS]
+    if unknown:
+        raise ValidationError({"error": f"Unknown mark filter: {', '.join(unknown)}"})
+    return [flag for flag in flags if flag != 'any']
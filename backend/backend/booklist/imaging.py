@@ -0,0 +1,64 @@
+import os
+
+from PIL import Image, ImageOps
+
+
+# Runs inside the thumbnail worker processes: keep this module free of
+# Django imports so workers start without setting Django up.
+
+
+def _flatten(image):
+    """Composite transparent images on white for JPEG"""
+    if image.mode == 'RGB':
+        return image
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A') if image.mode == 'RGBA' else None)
+    return background
+
+
+# (key, Pillow format, extension, encoder options)
+FORMATS = (
+    ('webp', 'WEBP', 'webp', {'method': 4}),
+    ('jpeg', 'JPEG', 'jpg', {'optimize': True, 'progressive': True}),
+)
+
+
+def _save(image, path, format, quality, options):
+    # Write next to the target and rename, so readers never see half a file
+    tmp_path = f'{path}.tmp'
+    image.save(tmp_path, format=format, quality=quality, **options)
+    os.replace(tmp_path, path)
+
+
+def render_renditions(source_path, target_dir, stem, sizes, quality):
+    """
+    Write resized WebP and JPEG copies of the image at `source_path`
+
+    `sizes` maps a rendition name to the (width, height) box it must fit in,
+    images are never upscaled. EXIF orientation is applied to the pixels and
+    all metadata is left out of the copies. Returns
+    {name: {'webp': filename, 'jpeg': filename}} with filenames relative to
+    `target_dir`.
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    renditions = {}
+
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if image.has_transparency_data else 'RGB')
+
+        # Largest first, so every smaller rendition is resized from a smaller image
+        for name, box in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+            image = image.copy()
+            image.thumbnail(tuple(box), Image.Resampling.LANCZOS)
+
+            files = {}
+            for key, format, extension, options in FORMATS:
+                filename = f'{stem}-{name}.{extension}'
+                rendition = image if format == 'WEBP' else _flatten(image)
+                _save(rendition, os.path.join(target_dir, filename), format, quality, options)
+                files[key] = filename
+            renditions[name] = files
+
+    return renditions
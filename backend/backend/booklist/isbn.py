@@ -0,0 +1,38 @@
+DIGITS = frozenset('0123456789')
+
+
+def _digits(value):
+    # str.isdigit() also accepts e.g. '²' and Arabic-Indic digits
+    return all(ch in DIGITS for ch in value)
+
+
+def _isbn13_check_digit(core):
+    total = sum(int(digit) * (1 if i % 2 == 0 else 3) for i, digit in enumerate(core))
+    return str((10 - total % 10) % 10)
+
+
+def normalize_isbn(value):
+    """
+    Normalize an ISBN to its 13 digit form, or None if it is not a valid ISBN
+
+    Hyphens and spaces are ignored and ISBN-10 values are converted to
+    ISBN-13, so the same book always dedupes to the same key. The check
+    digit must match, and ISBN-13s must have the 978/979 prefix.
+    """
+    if not value:
+        return None
+    isbn = ''.join(ch for ch in str(value) if ch not in '- ').upper()
+
+    if len(isbn) == 10 and _digits(isbn[:9]) and (isbn[9] in DIGITS or isbn[9] == 'X'):
+        digits = [int(digit) for digit in isbn[:9]] + [10 if isbn[9] == 'X' else int(isbn[9])]
+        if sum(digit * (10 - i) for i, digit in enumerate(digits)) % 11:
+            return None
+        core = '978' + isbn[:9]
+        return core + _isbn13_check_digit(core)
+
+    if len(isbn) == 13 and _digits(isbn) and isbn[:3] in ('978', '979'):
+        if isbn[12] != _isbn13_check_digit(isbn[:12]):
+            return None
+        return isbn
+
+    return None
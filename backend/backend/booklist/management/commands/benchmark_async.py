@@ -0,0 +1,111 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from django.test import AsyncClient
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework_simplejwt.tokens import RefreshToken
+from booklist.cache import response_cache
+from booklist.models import Book
+import asyncio
+import os
+import time
+
+User = get_user_model()
+
+PASSWORD = 'loadtest123'
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares throughput of the sync read endpoints with their native async '
+        'versions under concurrent requests, through the ASGI handler'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=1000, help='Size of the generated dataset')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint')
+        parser.add_argument('--concurrency', type=int, default=20, help='Requests in flight at the same time')
+
+    def handle(self, *args, **options):
+        if options['requests'] <= 0 or options['concurrency'] <= 0:
+            raise CommandError('--requests and --concurrency must be positive')
+
+        # Same throwaway test database as benchmark_endpoints
+        setup_test_environment()
+        runner = DiscoverRunner(interactive=False, verbosity=0)
+        old_config = runner.setup_databases()
+        try:
+            self.generate(options['books'])
+            asyncio.run(self.run_pairs(options['requests'], options['concurrency']))
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+    def generate(self, size):
+        with open(os.devnull, 'w') as devnull:
+            call_command(
+                'generate_dataset',
+                users=max(size // 100, 10),
+                books=size,
+                marks=size * 10,
+                password=PASSWORD,
+                clear=True,
+                stdout=devnull,
+            )
+        self.user = (
+            User.objects.filter(username__startswith='loadtest_')
+            .annotate(marks=Count('marked_books')).order_by('-marks').first()
+        )
+        self.book = Book.objects.first()
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    def pairs(self):
+        return [
+            ('profile', '/api/profile/', '/api/async/profile/'),
+            ('books (page)', '/api/books/?page_size=50', '/api/async/books/?page_size=50'),
+            ('book detail', f'/api/books/{self.book.pk}/', f'/api/async/books/{self.book.pk}/'),
+        ]
+
+    async def run_pairs(self, total, concurrency):
+        self.stdout.write(f'{total} requests per endpoint, {concurrency} concurrent')
+        for name, sync_path, async_path in self.pairs():
+            sync_result = await self.load(sync_path, total, concurrency)
+            async_result = await self.load(async_path, total, concurrency)
+            for label, result in (('sync', sync_result), ('async', async_result)):
+                self.stdout.write(
+                    f"  {name + ' (' + label + ')':<22} {result['rps']:9.1f} req/s   "
+                    f"p50 {result['p50_ms']:8.2f} ms   p95 {result['p95_ms']:8.2f} ms"
+                )
+
+    async def load(self, path, total, concurrency):
+        client = AsyncClient()
+        response_cache.clear()
+        await self.request(client, path)
+
+        semaphore = asyncio.Semaphore(concurrency)
+        timings = []
+
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                await self.request(client, path)
+                timings.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+
+        timings.sort()
+        return {
+            'rps': total / elapsed,
+            'p50_ms': timings[int(0.50 * (len(timings) - 1))],
+            'p95_ms': timings[int(0.95 * (len(timings) - 1))],
+        }
+
+    async def request(self, client, path):
+        response = await client.get(path, headers={'Authorization': f'Bearer {self.token}'})
+        if response.status_code >= 400:
+            raise CommandError(f'GET {path} returned {response.status_code}')
+        return response
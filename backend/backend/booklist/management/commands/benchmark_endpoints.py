@@ -0,0 +1,305 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import get_resolver
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from booklist.models import Book
+from booklist.cache import response_cache
+from booklist.covers import CoverCache, proxy_version
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+from unittest import mock
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+
+User = get_user_model()
+
+PASSWORD = 'loadtest123'
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), '..', '..', 'benchmarks', 'baseline.json')
+
+
+@dataclass
+class Case:
+    name: str
+    url_name: str
+    method: str
+    path: str
+    auth: Optional[str] = None
+    data: Callable[[int], object] = field(default=lambda i: None)
+
+
+class CoverOriginHandler(BaseHTTPRequestHandler):
+    """Stand-in cover host for the cover proxy case, so no request leaves the machine"""
+    body = b'\xff\xd8' + b'\0' * 40 * 1024
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks every booklist endpoint on generated datasets of increasing size '
+        'and compares latency, query count and peak memory with a stored baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000', help='Comma separated book counts, e.g. 1000,100000,1000000')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per endpoint')
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON file to compare with')
+        parser.add_argument('--save-baseline', action='store_true', help='Write the results as the new baseline')
+        parser.add_argument('--threshold', type=float, default=2.0, help='Allowed p95 latency / peak memory ratio over the baseline')
+        parser.add_argument('--min-delta-ms', type=float, default=5.0, help='Ignore p95 increases smaller than this (timer noise)')
+        parser.add_argument('--output', help='Also write the results to this JSON file')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes must be a comma separated list of integers')
+
+        # Benchmarks run on a throwaway test database, never on db.sqlite3
+        setup_test_environment()
+        runner = DiscoverRunner(interactive=False, verbosity=0)
+        old_config = runner.setup_databases()
+        origin = ThreadingHTTPServer(('127.0.0.1', 0), CoverOriginHandler)
+        threading.Thread(target=origin.serve_forever, daemon=True).start()
+        self.origin_url = f'http://127.0.0.1:{origin.server_port}'
+        try:
+            with tempfile.TemporaryDirectory() as cover_dir, \
+                    override_settings(BOOK_COVER_PROXY_HOSTS=['127.0.0.1']), \
+                    mock.patch('booklist.covers.cover_cache', CoverCache(cover_dir, 64 * 1024 * 1024)):
+                results = {}
+                for size in sizes:
+                    self.stdout.write(self.style.MIGRATE_HEADING(f'Dataset: {size} books'))
+                    self.generate(size)
+                    results[str(size)] = self.run_cases(options['iterations'])
+        finally:
+            origin.shutdown()
+            origin.server_close()
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        if options['output']:
+            self.write_json(options['output'], results)
+
+        baseline_path = os.path.normpath(options['baseline'])
+        if options['save_baseline']:
+            self.write_json(baseline_path, results)
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {baseline_path}'))
+            return
+
+        if not os.path.exists(baseline_path):
+            self.stdout.write(self.style.WARNING(f'No baseline at {baseline_path}, run with --save-baseline to record one'))
+            return
+
+        with open(baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)
+        unrecorded = [size for size in results if size not in baseline]
+        if unrecorded:
+            self.stdout.write(self.style.WARNING(f'No baseline for dataset size(s) {", ".join(unrecorded)}, not compared'))
+        missing = [
+            f'[{size}] {name}' for size, cases in results.items() if size in baseline
+            for name in cases if name not in baseline[size]
+        ]
+        if missing:
+            # Every request that adds a case records its baseline entry with it
+            raise CommandError(
+                f'No baseline entry for case(s) {", ".join(missing)} in {baseline_path}; '
+                'add them from a --output run on the same machine'
+            )
+
+        regressions = self.compare(baseline, results, options['threshold'], options['min_delta_ms'])
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(self.style.ERROR(regression))
+            raise CommandError(f'{len(regressions)} performance regression(s) against {baseline_path}')
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
+
+    def generate(self, size):
+        with open(os.devnull, 'w') as devnull:
+            call_command(
+                'generate_dataset',
+                users=max(size // 100, 10),
+                books=size,
+                marks=size * 10,
+                password=PASSWORD,
+                clear=True,
+                stdout=devnull,
+            )
+        self.admin, _ = User.objects.get_or_create(
+            username='bench_admin', defaults={'is_staff': True, 'is_superuser': True}
+        )
+        # The most active reader, so mark lookups have real work to do
+        self.user = (
+            User.objects.filter(username__startswith='loadtest_')
+            .annotate(marks=Count('marked_books')).order_by('-marks').first()
+        )
+        self.book = Book.objects.filter(user=self.user).first() or Book.objects.first()
+        self.book_ids = list(Book.objects.values_list('pk', flat=True)[:50])
+        self.covered_book = Book.objects.exclude(pk=self.book.pk).first()
+        self.covered_book.coverUrl = f'{self.origin_url}/b/id/{self.covered_book.pk}-L.jpg'
+        self.covered_book.save(update_fields=['coverUrl'])
+        self.tokens = {
+            'user': str(RefreshToken.for_user(self.user).access_token),
+            'admin': str(RefreshToken.for_user(self.admin).access_token),
+        }
+
+    def cases(self):
+        user, book = self.user, self.book
+        own_book = Book.objects.filter(user=user).first()
+        return [
+            Case('login', 'login', 'POST', '/api/login/',
+                 data=lambda i: {'username': user.username, 'password': PASSWORD}),
+            Case('register', 'register', 'POST', '/api/register/',
+                 data=lambda i: {'username': f'bench_{time.time_ns()}_{i}', 'password': PASSWORD, 'email': 'bench@example.com'}),
+            Case('change_password', 'change_password', 'POST', '/api/change-password/', auth='user',
+                 data=lambda i: {'old_password': PASSWORD, 'new_password': PASSWORD}),
+            Case('profile', 'userProfile', 'GET', '/api/profile/', auth='user'),
+            Case('profile (async)', 'userProfileAsync', 'GET', '/api/async/profile/', auth='user'),
+            Case('profile books', 'profileBooks', 'GET', '/api/profile/books/?page_size=50', auth='user'),
+            Case('profile stats', 'profileStats', 'GET', '/api/profile/stats/', auth='user'),
+            Case('books (anonymous page)', 'bookList', 'GET', '/api/books/?page_size=50'),
+            Case('books (page)', 'bookList', 'GET', '/api/books/?page_size=50', auth='user'),
+            Case('books (author filter)', 'bookList', 'GET', f'/api/books/?page_size=50&author={book.author}', auth='user'),
+            Case('books (async page)', 'bookListAsync', 'GET', '/api/async/books/?page_size=50', auth='user'),
+            Case('books (stream)', 'bookList', 'GET', '/api/books/?stream=ndjson', auth='user'),
+            Case('books (compact page)', 'bookList', 'GET', '/api/books/?page_size=50&view=compact', auth='user'),
+            Case('books (side-loaded users)', 'bookList', 'GET', '/api/books/?page_size=200&include=users', auth='user'),
+            Case('books (popular page)', 'bookList', 'GET', '/api/books/?page_size=50&sort=popular', auth='user'),
+            Case('books (marked by me)', 'bookList', 'GET', '/api/books/?page_size=50&marked=any', auth='user'),
+            Case('search', 'bookSearch', 'GET', '/api/books/search/?q=twin+pea', auth='user'),
+            Case('bulk marks', 'bookMarkBulk', 'POST', '/api/books/marks/bulk/', auth='user',
+                 data=lambda i: [{'book': pk, 'read': i % 2 == 0} for pk in self.book_ids]),
+            Case('book detail', 'bookDetail', 'GET', f'/api/books/{book.pk}/', auth='user'),
+            Case('book detail (async)', 'bookDetailAsync', 'GET', f'/api/async/books/{book.pk}/', auth='user'),
+            Case('cover proxy (cached)', 'bookCover', 'GET', f'/api/books/{self.covered_book.pk}/cover/?v={proxy_version(self.covered_book.coverUrl)}'),
+            Case('book update', 'bookDetail', 'PATCH', f'/api/books/{own_book.pk if own_book else book.pk}/', auth='user',
+                 data=lambda i: {'genre': 'Mystery'}),
+            Case('mark', 'bookMark', 'POST', f'/api/books/{book.pk}/mark/', auth='user',
+                 data=lambda i: {'read': i % 2 == 0}),
+            Case('admin users', 'adminUserList', 'GET', '/api/admin/users/', auth='admin'),
+            Case('admin user update', 'adminUserDetail', 'PATCH', f'/api/admin/users/{user.pk}/', auth='admin',
+                 data=lambda i: {'first_name': 'Bench'}),
+            Case('admin books (stream)', 'adminBookList', 'GET', '/api/admin/books/?stream=ndjson', auth='admin'),
+            Case('admin books (page)', 'adminBookList', 'GET', '/api/admin/books/?page_size=50', auth='admin'),
+            Case('admin book update', 'adminBookDetail', 'PATCH', f'/api/admin/books/{book.pk}/', auth='admin',
+                 data=lambda i: {'genre': 'Mystery'}),
+        ]
+
+    def run_cases(self, iterations):
+        cases = self.cases()
+        covered = {case.url_name for case in cases}
+        missing = [
+            pattern.name for pattern in get_resolver('booklist.urls').url_patterns
+            if pattern.name not in covered
+        ]
+        if missing:
+            raise CommandError(f'No benchmark case for endpoint(s): {", ".join(missing)}')
+
+        results = {}
+        for case in cases:
+            results[case.name] = self.measure(case, iterations)
+            result = results[case.name]
+            self.stdout.write(
+                f"  {case.name:<28} p50 {result['p50_ms']:8.2f} ms   p95 {result['p95_ms']:8.2f} ms   "
+                f"{result['queries']:4d} queries   peak {result['peak_kb']:10.1f} KiB"
+            )
+        return results
+
+    def request(self, client, case, iteration):
+        headers = {}
+        if case.auth:
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {self.tokens[case.auth]}'
+        call = getattr(client, case.method.lower())
+        response = call(case.path, case.data(iteration), format='json', **headers)
+        if response.status_code >= 400:
+            raise CommandError(f'{case.name}: {case.method} {case.path} returned {response.status_code}')
+        # Drain streaming bodies so their cost is measured too
+        if getattr(response, 'streaming', False):
+            for _ in response.streaming_content:
+                pass
+        return response
+
+    def measure(self, case, iterations):
+        client = APIClient()
+        response_cache.clear()
+
+        # Warm up, then count queries of one representative request.
+        # request_started resets connection.queries, so count with a wrapper.
+        self.request(client, case, 0)
+        queries = []
+        with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+            self.request(client, case, 1)
+
+        timings = []
+        for iteration in range(iterations):
+            started = time.perf_counter()
+            self.request(client, case, iteration)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        # tracemalloc slows everything down, so peak memory gets its own runs.
+        # The lowest of three ignores one-off growth of long-lived structures
+        # (e.g. the test client's signal registry resizing) during one of them.
+        peaks = []
+        for _ in range(3):
+            tracemalloc.start()
+            try:
+                self.request(client, case, 0)
+                peaks.append(tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+        peak = min(peaks)
+
+        timings.sort()
+        return {
+            'p50_ms': round(self.percentile(timings, 0.50), 3),
+            'p95_ms': round(self.percentile(timings, 0.95), 3),
+            'queries': len(queries),
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    @staticmethod
+    def percentile(sorted_values, fraction):
+        if not sorted_values:
+            return 0.0
+        return sorted_values[min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)]
+
+    def compare(self, baseline, results, threshold, min_delta_ms):
+        regressions = []
+        for size, cases in results.items():
+            for name, result in cases.items():
+                base = baseline.get(size, {}).get(name)
+                if base is None:
+                    # Reported by handle()
+                    continue
+                if result['queries'] > base['queries']:
+                    regressions.append(f"[{size}] {name}: {result['queries']} queries (baseline {base['queries']})")
+                # Ignore timer noise on fast endpoints
+                if result['p95_ms'] > base['p95_ms'] * threshold and result['p95_ms'] - base['p95_ms'] > min_delta_ms:
+                    regressions.append(f"[{size}] {name}: p95 {result['p95_ms']} ms (baseline {base['p95_ms']} ms)")
+                if result['peak_kb'] > base['peak_kb'] * threshold and result['peak_kb'] - base['peak_kb'] > 64:
+                    regressions.append(f"[{size}] {name}: peak {result['peak_kb']} KiB (baseline {base['peak_kb']} KiB)")
+        return regressions
+
+    def write_json(self, path, results):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+            output.write('\n')
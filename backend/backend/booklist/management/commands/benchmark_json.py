@@ -0,0 +1,82 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management import call_command
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from booklist.models import Book
+from booklist.parsers import FastJSONParser
+from booklist.renderers import FastJSONRenderer, orjson
+from booklist.rows import BookRowSerializer, book_rows
+import io
+import os
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures encode/decode throughput of the API JSON renderer and parser '
+        'on the book list payload, against DRF\'s stdlib ones'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=1000, help='Books in the list payload')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed runs of each encoder/decoder')
+
+    def handle(self, *args, **options):
+        if options['books'] <= 0 or options['iterations'] <= 0:
+            raise CommandError('--books and --iterations must be positive')
+        if orjson is None:
+            self.stderr.write(self.style.WARNING('orjson is not installed, FastJSONRenderer falls back to the stdlib encoder'))
+
+        # Same throwaway test database as benchmark_endpoints
+        setup_test_environment()
+        runner = DiscoverRunner(interactive=False, verbosity=0)
+        old_config = runner.setup_databases()
+        try:
+            payload = self.payload(options['books'])
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        with override_settings(BOOK_JSON_BACKEND='orjson'):
+            self.compare(payload, options['iterations'])
+
+    def payload(self, size):
+        with open(os.devnull, 'w') as devnull:
+            call_command('generate_dataset', users=max(size // 100, 10), books=size, marks=0, clear=True, stdout=devnull)
+        rows = list(book_rows(Book.objects.order_by('author', 'id')))
+        return BookRowSerializer().serialize(rows)
+
+    def compare(self, payload, iterations):
+        stdlib_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+        content = stdlib_renderer.render(payload)
+        if fast_renderer.render(payload) != content:
+            raise CommandError('FastJSONRenderer output differs from JSONRenderer')
+
+        size_mb = len(content) / (1024 * 1024)
+        self.stdout.write(f'{len(payload)} books, {size_mb:.2f} MB of JSON, {iterations} iterations')
+
+        results = [
+            ('encode', 'json', self.time(lambda: stdlib_renderer.render(payload), iterations)),
+            ('encode', 'orjson', self.time(lambda: fast_renderer.render(payload), iterations)),
+            ('decode', 'json', self.time(lambda: JSONParser().parse(io.BytesIO(content)), iterations)),
+            ('decode', 'orjson', self.time(lambda: FastJSONParser().parse(io.BytesIO(content)), iterations)),
+        ]
+        baseline = {}
+        for operation, backend, seconds in results:
+            baseline.setdefault(operation, seconds)
+            self.stdout.write(
+                f"  {operation + ' (' + backend + ')':<18} {seconds * 1000:8.2f} ms   {size_mb / seconds:8.1f} MB/s   "
+                f'{baseline[operation] / seconds:5.1f}x'
+            )
+
+    def time(self, run, iterations):
+        run()
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        return timings[len(timings) // 2]
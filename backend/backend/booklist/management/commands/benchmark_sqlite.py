@@ -0,0 +1,173 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, connection, connections
+from django.test import Client
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from rest_framework_simplejwt.tokens import RefreshToken
+from booklist.models import Book
+from collections import Counter
+import json
+import logging
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares read/write throughput of concurrent requests on the stock SQLite '
+        'configuration and on the tuned one from settings (pragmas, persistent '
+        'connections, IMMEDIATE transactions, write retries)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=1000, help='Size of the generated dataset')
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent clients')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per client')
+        parser.add_argument('--write-ratio', type=float, default=0.3, help='Share of requests that write marks')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed of the request mix')
+
+    def handle(self, *args, **options):
+        if options['threads'] <= 0 or options['requests'] <= 0:
+            raise CommandError('--threads and --requests must be positive')
+        if not 0 <= options['write_ratio'] <= 1:
+            raise CommandError('--write-ratio must be between 0 and 1')
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark is for the SQLite backend')
+
+        settings_dict = connections.settings['default']
+        tuned = (settings_dict.get('OPTIONS', {}), settings_dict.get('CONN_MAX_AGE', 0))
+
+        # Same throwaway test database as benchmark_endpoints, but in a file:
+        # an in-memory database can't be shared by concurrent connections
+        directory = tempfile.mkdtemp()
+        settings_dict['TEST'] = {**settings_dict.get('TEST', {}), 'NAME': os.path.join(directory, 'benchmark.sqlite3')}
+        setup_test_environment()
+        runner = DiscoverRunner(interactive=False, verbosity=0)
+        old_config = runner.setup_databases()
+        try:
+            self.generate(options['books'], options['threads'])
+            self.stdout.write(
+                f"{options['threads']} clients x {options['requests']} requests, "
+                f"{options['write_ratio']:.0%} mark writes"
+            )
+            # Stock Django SQLite: rollback journal, a connection per request,
+            # deferred transactions and no retries
+            self.configure({}, 0, journal_mode='DELETE')
+            with override_settings(BOOK_DB_WRITE_RETRIES=0):
+                self.report('stock', self.load(options))
+            self.configure(*tuned)
+            self.report('tuned', self.load(options))
+        finally:
+            self.configure(*tuned)
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def generate(self, size, threads):
+        with open(os.devnull, 'w') as devnull:
+            call_command(
+                'generate_dataset',
+                users=max(size // 100, threads),
+                books=size,
+                marks=size * 5,
+                clear=True,
+                stdout=devnull,
+            )
+        users = list(User.objects.filter(username__startswith='loadtest_').order_by('pk')[:threads])
+        self.tokens = [str(RefreshToken.for_user(user).access_token) for user in users]
+        self.book_ids = list(Book.objects.values_list('pk', flat=True))
+
+    def configure(self, db_options, max_age, journal_mode=None):
+        connections.close_all()
+        settings_dict = connections.settings['default']
+        settings_dict['OPTIONS'] = db_options
+        settings_dict['CONN_MAX_AGE'] = max_age
+        if journal_mode:
+            # The journal mode is stored in the database file
+            with connection.cursor() as cursor:
+                cursor.execute(f'PRAGMA journal_mode={journal_mode}')
+            connection.close()
+
+    def load(self, options):
+        barrier = threading.Barrier(options['threads'] + 1)
+        results = [None] * options['threads']
+
+        def client(index):
+            rng = random.Random(options['seed'] + index)
+            http = Client(raise_request_exception=False, HTTP_AUTHORIZATION=f'Bearer {self.tokens[index % len(self.tokens)]}')
+            timings = {'read': [], 'write': []}
+            errors = Counter()
+            barrier.wait()
+            try:
+                for _ in range(options['requests']):
+                    kind = 'write' if rng.random() < options['write_ratio'] else 'read'
+                    started = time.perf_counter()
+                    response = self.request(http, kind, rng)
+                    if response.status_code >= 500:
+                        exc = response.exc_info[1] if response.exc_info else None
+                        errors[str(exc) if exc else f'HTTP {response.status_code}'] += 1
+                    timings[kind].append((time.perf_counter() - started) * 1000)
+                    # What request_finished does outside the test client
+                    close_old_connections()
+            finally:
+                connection.close()
+            results[index] = (timings, errors)
+
+        workers = [threading.Thread(target=client, args=(index,)) for index in range(options['threads'])]
+        # Failed writes are counted below, not logged with their tracebacks
+        logging.disable(logging.CRITICAL)
+        try:
+            with override_settings(DEBUG=False):
+                for worker in workers:
+                    worker.start()
+                barrier.wait()
+                started = time.perf_counter()
+                for worker in workers:
+                    worker.join()
+                elapsed = time.perf_counter() - started
+        finally:
+            logging.disable(logging.NOTSET)
+
+        timings = {'read': [], 'write': []}
+        errors = Counter()
+        for client_timings, client_errors in results:
+            for kind in timings:
+                timings[kind].extend(client_timings[kind])
+            errors.update(client_errors)
+        return elapsed, timings, errors
+
+    def request(self, http, kind, rng):
+        if kind == 'read':
+            if rng.random() < 0.5:
+                return http.get('/api/books/?page_size=50')
+            return http.get(f'/api/books/{rng.choice(self.book_ids)}/')
+
+        if rng.random() < 0.25:
+            items = [{'book': book_id, 'read': rng.random() < 0.5} for book_id in rng.sample(self.book_ids, 20)]
+            return http.post('/api/books/marks/bulk/', json.dumps(items), content_type='application/json')
+        flags = {'read': rng.random() < 0.5, 'onBookshelf': rng.random() < 0.5}
+        return http.post(f'/api/books/{rng.choice(self.book_ids)}/mark/', json.dumps(flags), content_type='application/json')
+
+    def report(self, name, result):
+        elapsed, timings, errors = result
+        total = sum(len(values) for values in timings.values())
+        self.stdout.write(f'  {name:<6} {total / elapsed:8.1f} req/s   {sum(errors.values())} errors')
+        for kind, values in timings.items():
+            if not values:
+                continue
+            values.sort()
+            self.stdout.write(
+                f'    {kind:<6} {len(values) / elapsed:8.1f} req/s   '
+                f'p50 {values[int(0.50 * (len(values) - 1))]:8.2f} ms   '
+                f'p95 {values[int(0.95 * (len(values) - 1))]:8.2f} ms'
+            )
+        for message, count in errors.most_common(3):
+            self.stdout.write(f'    {count} x {message}')
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from booklist.models import Book
+from booklist.thumbnails import needs_renditions, render_book_cover
+
+
+class Command(BaseCommand):
+    help = 'Generates the resized WebP/JPEG renditions of uploaded covers that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Regenerate every cover, e.g. after changing BOOK_COVER_RENDITIONS')
+
+    def handle(self, *args, **options):
+        books = Book.objects.exclude(cover='').exclude(cover__isnull=True).only('id', 'cover', 'cover_renditions')
+
+        done = failed = 0
+        for book in books.iterator(chunk_size=500):
+            if not (options['all'] or needs_renditions(book)):
+                continue
+            try:
+                render_book_cover(book.pk, book.cover.name)
+            except (OSError, ValueError) as exc:
+                failed += 1
+                self.stderr.write(self.style.WARNING(f'Book {book.pk}: {exc}'))
+                continue
+            done += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Generated renditions for {done} cover(s), {failed} failed'))
@@ -0,0 +1,204 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+from booklist.models import Book, UserBook
+from booklist.cache import bump_catalog_version
+from bisect import bisect_left
+from itertools import accumulate
+import random
+import time
+
+User = get_user_model()
+
+USERNAME_PREFIX = 'loadtest_'
+
+GENRES = [
+    'Classic Fiction', 'Dystopian Fiction', 'Romance', 'Mystery', 'Fantasy', 'Science Fiction',
+    'Horror', 'Thriller', 'Historical Fiction', 'Biography', 'Poetry', 'Philosophy',
+    'Self-Help', 'Travel', 'Humor', 'Young Adult', 'Children', 'Graphic Novel',
+]
+FIRST_NAMES = [
+    'Anna', 'Bence', 'Clara', 'Dániel', 'Emma', 'Ferenc', 'George', 'Hanna', 'István', 'Julia',
+    'Kate', 'László', 'Mark', 'Nóra', 'Oliver', 'Péter', 'Rita', 'Scott', 'Tamás', 'Zsófia',
+]
+LAST_NAMES = [
+    'Austen', 'Bartók', 'Christie', 'Dickens', 'Eco', 'Frost', 'Gaiman', 'Herbert', 'Ishiguro',
+    'Jókai', 'King', 'Lee', 'Márai', 'Nabokov', 'Orwell', 'Pratchett', 'Rowling', 'Szabó', 'Tolkien', 'Woolf',
+]
+WORDS = [
+    'shadow', 'river', 'night', 'garden', 'secret', 'house', 'winter', 'fire', 'silent', 'road',
+    'glass', 'mountain', 'last', 'forgotten', 'city', 'dream', 'stone', 'letter', 'storm', 'light',
+    'peaks', 'twin', 'ocean', 'kingdom', 'crown', 'whisper', 'clock', 'island', 'wolf', 'memory',
+]
+
+
+def isbn13(number):
+    """Build a valid, unique ISBN-13 from a running number"""
+    core = f'979{number:09d}'
+    total = sum(int(digit) * (1 if i % 2 == 0 else 3) for i, digit in enumerate(core))
+    return core + str((10 - total % 10) % 10)
+
+
+class ZipfSampler:
+    """Draws indexes 0..n-1 with probability proportional to 1 / (rank + 1) ** exponent"""
+
+    def __init__(self, n, exponent, rng):
+        self.rng = rng
+        self.cumulative = list(accumulate(1.0 / (rank ** exponent) for rank in range(1, n + 1)))
+        self.total = self.cumulative[-1]
+
+    def sample(self):
+        return bisect_left(self.cumulative, self.rng.random() * self.total)
+
+
+class Command(BaseCommand):
+    help = 'Generates a deterministic, skewed synthetic dataset of users, books and marks for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Number of users to create')
+        parser.add_argument('--books', type=int, default=10000, help='Number of books to create')
+        parser.add_argument('--marks', type=int, default=50000, help='Approximate number of UserBook marks to create')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, the same seed gives the same dataset')
+        parser.add_argument('--zipf', type=float, default=1.1, help='Zipf exponent of book popularity and uploader activity')
+        parser.add_argument('--shelf-alpha', type=float, default=1.5, help='Pareto shape of per-user shelf sizes')
+        parser.add_argument('--password', default='loadtest123', help='Password of every generated user (hashed once)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert transaction')
+        parser.add_argument('--clear', action='store_true', help='Delete previously generated users and their data first')
+
+    def handle(self, *args, **options):
+        n_users, n_books, n_marks = options['users'], options['books'], options['marks']
+        if n_users <= 0 or n_books <= 0 or n_marks < 0:
+            raise CommandError('--users and --books must be positive and --marks not negative')
+
+        self.batch_size = options['batch_size']
+        self.rng = random.Random(options['seed'])
+        started = time.perf_counter()
+
+        if options['clear']:
+            deleted, _ = User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+            self.stdout.write(self.style.WARNING(f'Deleted {deleted} previously generated rows'))
+        elif User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            raise CommandError('Generated users already exist, pass --clear to replace them')
+
+        user_ids = self.create_users(n_users, options['password'])
+        book_ids = self.create_books(n_books, user_ids, options['zipf'])
+        created_marks = self.create_marks(n_marks, user_ids, book_ids, options['zipf'], options['shelf_alpha'])
+        bump_catalog_version()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {len(user_ids)} users, {len(book_ids)} books and {created_marks} marks in {elapsed:.1f}s'
+        ))
+
+    def flush(self, model, rows):
+        with transaction.atomic():
+            return model.objects.bulk_create(rows, batch_size=self.batch_size)
+
+    def flush_marks(self, rows):
+        columns = ', '.join(
+            connection.ops.quote_name(UserBook._meta.get_field(name).column)
+            for name in ('user', 'book', 'bought', 'read', 'onBookshelf', 'created_at', 'updated_at')
+        )
+        sql = f'INSERT INTO {UserBook._meta.db_table} ({columns}) VALUES (%s, %s, %s, %s, %s, %s, %s)'
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+        return len(rows)
+
+    def create_users(self, count, password):
+        # Hashing is deliberately slow, so every user shares one precomputed hash
+        password_hash = make_password(password)
+        user_ids = []
+        for start in range(0, count, self.batch_size):
+            users = [
+                User(
+                    username=f'{USERNAME_PREFIX}{number:07d}',
+                    email=f'{USERNAME_PREFIX}{number:07d}@example.com',
+                    first_name=self.rng.choice(FIRST_NAMES),
+                    last_name=self.rng.choice(LAST_NAMES),
+                    password=password_hash,
+                )
+                for number in range(start, min(start + self.batch_size, count))
+            ]
+            user_ids.extend(user.pk for user in self.flush(User, users))
+        self.stdout.write(f'Created {len(user_ids)} users')
+        return user_ids
+
+    def create_books(self, count, user_ids, exponent):
+        # A few prolific uploaders own most of the catalog
+        uploaders = ZipfSampler(len(user_ids), exponent, self.rng)
+        authors = [
+            f'{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}'
+            for _ in range(max(count // 10, 1))
+        ]
+        author_sampler = ZipfSampler(len(authors), exponent, self.rng)
+
+        book_ids = []
+        for start in range(0, count, self.batch_size):
+            books = []
+            for number in range(start, min(start + self.batch_size, count)):
+                words = self.rng.sample(WORDS, self.rng.randint(1, 4))
+                book = Book(
+                    title=' '.join(words).title()[:100],
+                    author=authors[author_sampler.sample()],
+                    description=' '.join(self.rng.choices(WORDS, k=self.rng.randint(10, 60))).capitalize() + '.',
+                    isbn=isbn13(number),
+                    genre=self.rng.choice(GENRES),
+                    user_id=user_ids[uploaders.sample()],
+                )
+                # bulk_create skips save(), so fill the normalized columns here
+                book.normalize_fields()
+                books.append(book)
+            book_ids.extend(book.pk for book in self.flush(Book, books))
+        self.stdout.write(f'Created {len(book_ids)} books')
+        return book_ids
+
+    def create_marks(self, count, user_ids, book_ids, exponent, alpha):
+        if count == 0:
+            return 0
+
+        # Power-law shelf sizes, scaled so they add up to roughly `count`
+        raw_sizes = [self.rng.paretovariate(alpha) for _ in user_ids]
+        scale = count / sum(raw_sizes)
+        max_shelf = max(len(book_ids) // 2, 1)
+        shelf_sizes = [min(max(int(size * scale), 0), max_shelf) for size in raw_sizes]
+
+        # Popularity rank -> book, shuffled so the popular books are spread over the id range
+        popular = list(book_ids)
+        self.rng.shuffle(popular)
+        popularity = ZipfSampler(len(popular), exponent, self.rng)
+
+        # Marks are the bulk of the rows: a plain executemany is several
+        # times faster than building and saving UserBook instances
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        created = 0
+        rows = []
+        for user_id, size in zip(user_ids, shelf_sizes):
+            picked = set()
+            attempts = 0
+            while len(picked) < size and attempts < 3 * size:
+                picked.add(popular[popularity.sample()])
+                attempts += 1
+            # Large shelves would take forever to fill from the Zipf tail alone
+            while len(picked) < size:
+                picked.add(self.rng.choice(book_ids))
+            # Set order depends on the ids, sorting keeps the flags seed-determined
+            for book_id in sorted(picked):
+                rows.append((
+                    user_id,
+                    book_id,
+                    self.rng.random() < 0.4,
+                    self.rng.random() < 0.6,
+                    self.rng.random() < 0.5,
+                    now,
+                    now,
+                ))
+            if len(rows) >= self.batch_size:
+                created += self.flush_marks(rows)
+                rows = []
+        if rows:
+            created += self.flush_marks(rows)
+
+        self.stdout.write(f'Created {created} marks')
+        return created
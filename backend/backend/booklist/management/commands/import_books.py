@@ -0,0 +1,187 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from booklist.models import Book
+from booklist.cache import bump_catalog_version
+from booklist.isbn import normalize_isbn
+from booklist.stats import invalidate_readers_stats
+import csv
+import json
+import os
+import sys
+import time
+
+User = get_user_model()
+
+FIELDS = ('title', 'author', 'description', 'isbn', 'genre', 'coverUrl')
+UPDATE_FIELDS = ['title', 'author', 'description', 'genre', 'coverUrl', 'author_normalized', 'genre_normalized']
+
+
+class Command(BaseCommand):
+    help = 'Streams books from a CSV or JSONL file into the database in batches, deduplicating by ISBN'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file to import, or - for stdin')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Input format (default: from the file extension)')
+        parser.add_argument('--user', default='bookadmin', help='Username the imported books are assigned to')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per batch and transaction')
+        parser.add_argument(
+            '--on-duplicate', choices=['update', 'skip'], default='update',
+            help='What to do with rows whose ISBN is already in the database'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User not found: {options['user']}")
+
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size must be positive')
+
+        input_format = options['format'] or self.detect_format(options['path'])
+        self.update_existing = options['on_duplicate'] == 'update'
+        self.stats = {'created': 0, 'updated': 0, 'skipped': 0, 'invalid': 0}
+
+        started = time.perf_counter()
+        processed = 0
+        with self.open_input(options['path']) as stream:
+            batch = []
+            for line_number, row in self.read_rows(stream, input_format):
+                book = self.build_book(row, user, line_number)
+                if book is not None:
+                    batch.append(book)
+                processed += 1
+
+                if len(batch) >= batch_size:
+                    self.import_batch(batch)
+                    batch = []
+                    self.report_progress(processed, started)
+
+            if batch:
+                self.import_batch(batch)
+
+        elapsed = time.perf_counter() - started
+        rate = processed / elapsed if elapsed else processed
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {processed} rows in {elapsed:.1f}s ({rate:,.0f} rows/s): "
+            f"{self.stats['created']} created, {self.stats['updated']} updated, "
+            f"{self.stats['skipped']} skipped, {self.stats['invalid']} invalid"
+        ))
+
+    def detect_format(self, path):
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.csv':
+            return 'csv'
+        if extension in ('.jsonl', '.ndjson'):
+            return 'jsonl'
+        raise CommandError('Cannot detect the input format, use --format')
+
+    def open_input(self, path):
+        if path == '-':
+            return open(sys.stdin.fileno(), encoding='utf-8', newline='', closefd=False)
+        try:
+            return open(path, encoding='utf-8', newline='')
+        except OSError as exc:
+            raise CommandError(f'Cannot open {path}: {exc}')
+
+    def read_rows(self, stream, input_format):
+        """Yield (line number, row dict) one row at a time"""
+        if input_format == 'csv':
+            reader = csv.DictReader(stream)
+            for row in reader:
+                yield reader.line_num, row
+            return
+
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else None
+
+    def build_book(self, row, user, line_number):
+        if row is None:
+            return self.invalid(line_number, 'not a JSON object')
+
+        data = {}
+        for field in FIELDS:
+            value = row.get(field)
+            data[field] = (str(value).strip() or None) if value is not None else None
+        if not data['title'] or not data['author']:
+            return self.invalid(line_number, 'title and author are required')
+
+        # Before the length checks: hyphenated ISBN-13s are longer than the column
+        if data['isbn']:
+            data['isbn'] = normalize_isbn(data['isbn'])
+            if data['isbn'] is None:
+                return self.invalid(line_number, 'invalid ISBN')
+
+        for field in FIELDS:
+            max_length = Book._meta.get_field(field).max_length
+            if max_length and data[field] and len(data[field]) > max_length:
+                return self.invalid(line_number, f'{field} is longer than {max_length} characters')
+
+        data['description'] = data['description'] or ''
+        book = Book(user=user, **data)
+        # bulk_create skips save(), so fill the normalized columns here
+        book.normalize_fields()
+        return book
+
+    def invalid(self, line_number, reason):
+        self.stats['invalid'] += 1
+        if self.stats['invalid'] <= 20:
+            self.stderr.write(self.style.WARNING(f'Line {line_number}: {reason}'))
+        return None
+
+    def import_batch(self, batch):
+        """Insert new books and update (or skip) existing ISBNs in one transaction"""
+        # The last row wins when an ISBN repeats inside the batch
+        by_isbn = {}
+        without_isbn = []
+        for book in batch:
+            if book.isbn:
+                if book.isbn in by_isbn:
+                    self.stats['skipped'] += 1
+                by_isbn[book.isbn] = book
+            else:
+                without_isbn.append(book)
+
+        with transaction.atomic():
+            # Compared on the normalized column: books created through the
+            # API keep the ISBN as typed, with hyphens or in ISBN-10 form.
+            # The oldest book wins when several share an ISBN.
+            existing = dict(
+                Book.objects.filter(isbn_normalized__in=list(by_isbn))
+                .order_by('-pk').values_list('isbn_normalized', 'pk')
+            )
+
+            updates = []
+            for isbn, pk in existing.items():
+                book = by_isbn.pop(isbn)
+                if self.update_existing:
+                    book.pk = pk
+                    updates.append(book)
+                else:
+                    self.stats['skipped'] += 1
+
+            creates = without_isbn + list(by_isbn.values())
+            Book.objects.bulk_create(creates)
+            if updates:
+                Book.objects.bulk_update(updates, UPDATE_FIELDS)
+                # bulk_update sends no post_save, and the genre may have changed
+                invalidate_readers_stats(*(book.pk for book in updates))
+
+        self.stats['created'] += len(creates)
+        self.stats['updated'] += len(updates)
+        # bulk_create/bulk_update do not send the signals the response cache listens to
+        bump_catalog_version()
+
+    def report_progress(self, processed, started):
+        elapsed = time.perf_counter() - started
+        rate = processed / elapsed if elapsed else processed
+        self.stdout.write(f'{processed} rows processed ({rate:,.0f} rows/s)')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from booklist.cache import bump_catalog_version
+from booklist.counters import reconcile_counters
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        'Recounts the per-book read/bought/bookshelf counters from the marks '
+        'and repairs the ones that drifted'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help='Books recounted per UPDATE')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be positive')
+
+        started = time.perf_counter()
+        fixed = reconcile_counters(batch_size=options['batch_size'])
+        if fixed:
+            bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Repaired the counters of {fixed} books in {time.perf_counter() - started:.2f}s'
+        ))
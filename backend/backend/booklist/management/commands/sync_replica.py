@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from booklist.db import snapshot_database
+import os
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        'Refreshes the SQLite read replicas with a snapshot of the primary, '
+        'once or every --interval seconds'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', action='append', dest='aliases',
+            help='Replica alias to refresh, can be repeated (default: BOOK_READ_REPLICAS)',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Keep refreshing every this many seconds, should stay below BOOK_PRIMARY_PIN_SECONDS',
+        )
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or list(getattr(settings, 'BOOK_READ_REPLICAS', []))
+        if not aliases:
+            raise CommandError('No replicas configured, set BOOK_READ_REPLICAS or pass --database')
+        if options['interval'] < 0:
+            raise CommandError('--interval must not be negative')
+
+        primary = connections[DEFAULT_DB_ALIAS]
+        paths = []
+        for alias in aliases:
+            if alias not in connections:
+                raise CommandError(f'Unknown database alias "{alias}"')
+            replica = connections[alias]
+            if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+                raise CommandError('Snapshots are only supported between SQLite databases')
+            path = os.fspath(replica.settings_dict['NAME'])
+            if path == os.fspath(primary.settings_dict['NAME']):
+                raise CommandError(f'"{alias}" is the primary database')
+            paths.append((alias, path))
+
+        while True:
+            for alias, path in paths:
+                started = time.perf_counter()
+                snapshot_database(path)
+                self.stdout.write(f'{alias}: synced in {(time.perf_counter() - started) * 1000:.1f} ms')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,206 @@
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .db import retry_on_locked
+from .models import Book, UserBook
+from .stats import invalidate_profile_stats
+
+
+MARK_FIELDS = ('bought', 'read', 'onBookshelf')
+
+_table = UserBook._meta.db_table
+_book_table = Book._meta.db_table
+_boolean = serializers.BooleanField()
+
+
+def _column(name):
+    return connection.ops.quote_name(UserBook._meta.get_field(name).column)
+
+
+def _now():
+    return connection.ops.adapt_datetimefield_value(timezone.now())
+
+
+def _as_mark(row):
+    return {field: bool(value) for field, value in zip(MARK_FIELDS, row)}
+
+
+def parse_mark_fields(data):
+    """
+    Pick the provided mark flags out of request data as real booleans
+
+    Raises ValidationError for values that are not booleans.
+    """
+    fields = {}
+    for field in MARK_FIELDS:
+        if field in data:
+            try:
+                fields[field] = _boolean.to_internal_value(data[field])
+            except serializers.ValidationError as exc:
+                raise serializers.ValidationError({field: exc.detail})
+    return fields
+
+
+@retry_on_locked
+def upsert_mark(user_id, book_id, fields):
+    """
+    Create or update a mark with one INSERT ... ON CONFLICT DO UPDATE
+
+    New marks default missing flags to False, existing marks only change the
+    provided ones. The row is inserted with INSERT ... SELECT from the book
+    table, so a missing book simply inserts nothing and returns None.
+    Otherwise returns (mark, created).
+    """
+    now = _now()
+    columns = [_column(name) for name in ('user', 'book', *MARK_FIELDS, 'created_at', 'updated_at')]
+    updates = [f'{_column(field)} = excluded.{_column(field)}' for field in MARK_FIELDS if field in fields]
+    updates.append(f'{_column("updated_at")} = excluded.{_column("updated_at")}')
+    returning = ', '.join(_column(field) for field in MARK_FIELDS)
+
+    sql = (
+        f'INSERT INTO {_table} ({", ".join(columns)}) '
+        f'SELECT %s, id, %s, %s, %s, %s, %s FROM {_book_table} WHERE id = %s '
+        f'ON CONFLICT ({_column("user")}, {_column("book")}) DO UPDATE SET {", ".join(updates)} '
+        # created_at only equals updated_at when the row was just inserted
+        f'RETURNING {returning}, {_column("created_at")} = {_column("updated_at")}'
+    )
+    params = [user_id, *(fields.get(field, False) for field in MARK_FIELDS), now, now, book_id]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    invalidate_profile_stats(user_id)
+    return _as_mark(row[:3]), bool(row[3])
+
+
+@retry_on_locked
+def update_mark(user_id, book_id, fields):
+    """Update the provided flags of an existing mark, None if there is no mark"""
+    assignments = [f'{_column(field)} = %s' for field in fields]
+    assignments.append(f'{_column("updated_at")} = %s')
+    returning = ', '.join(_column(field) for field in MARK_FIELDS)
+
+    sql = (
+        f'UPDATE {_table} SET {", ".join(assignments)} '
+        f'WHERE {_column("user")} = %s AND {_column("book")} = %s '
+        f'RETURNING {returning}'
+    )
+    params = [*fields.values(), _now(), user_id, book_id]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    invalidate_profile_stats(user_id)
+    return _as_mark(row)
+
+
+@retry_on_locked
+def delete_mark(user_id, book_id):
+    """Delete a mark, returns False if there was none"""
+    sql = f'DELETE FROM {_table} WHERE {_column("user")} = %s AND {_column("book")} = %s'
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, book_id])
+        deleted = cursor.rowcount > 0
+    if deleted:
+        invalidate_profile_stats(user_id)
+    return deleted
+
+
+@retry_on_locked
+def apply_bulk_marks(user, items):
+    """
+    Apply a batch of mark changes for `user` in one transaction
+
+    Each item is `{"book": id, "bought"/"read"/"onBookshelf": bool}` to
+    create or update a mark (omitted flags keep their current value), or
+    `{"book": id, "delete": true}` to remove it. `delete` and the flags are
+    parsed as booleans, anything else is an error for that item. All upserts go through one
+    bulk_create(update_conflicts=True) and all removals through one DELETE,
+    so the query count does not depend on the number of items.
+
+    Returns one result dict per item, in request order.
+    """
+    results = [None] * len(items)
+    upserts = {}
+    deletions = {}
+
+    for index, item in enumerate(items):
+        book_id = item.get('book') if isinstance(item, dict) else None
+        if not isinstance(book_id, int) or isinstance(book_id, bool):
+            results[index] = {'book': book_id, 'status': 'error', 'error': 'book must be a book ID'}
+            continue
+        if book_id in upserts or book_id in deletions:
+            results[index] = {'book': book_id, 'status': 'error', 'error': 'Duplicate book in request'}
+            continue
+
+        try:
+            # Validated like the flags: "false" or 0 must not delete the mark
+            delete = 'delete' in item and _boolean.to_internal_value(item['delete'])
+        except serializers.ValidationError as exc:
+            results[index] = {'book': book_id, 'status': 'error', 'error': {'delete': exc.detail}}
+            continue
+        if delete:
+            deletions[book_id] = index
+            continue
+        try:
+            upserts[book_id] = (index, parse_mark_fields(item))
+        except serializers.ValidationError as exc:
+            results[index] = {'book': book_id, 'status': 'error', 'error': exc.detail}
+
+    with transaction.atomic():
+        existing_books = set(
+            Book.objects.filter(pk__in=[*upserts, *deletions]).values_list('pk', flat=True)
+        )
+        existing_marks = {
+            mark.book_id: mark
+            for mark in UserBook.objects.filter(user=user, book_id__in=list(upserts))
+        }
+
+        marks = []
+        for book_id, (index, fields) in upserts.items():
+            if book_id not in existing_books:
+                results[index] = {'book': book_id, 'status': 'error', 'error': 'Book not found'}
+                continue
+            current = existing_marks.get(book_id)
+            values = {
+                field: fields.get(field, getattr(current, field) if current else False)
+                for field in MARK_FIELDS
+            }
+            marks.append(UserBook(user=user, book_id=book_id, **values))
+            results[index] = {
+                'book': book_id,
+                'status': 'updated' if current else 'created',
+                'mark': values,
+            }
+
+        if marks:
+            UserBook.objects.bulk_create(
+                marks,
+                update_conflicts=True,
+                unique_fields=['user', 'book'],
+                update_fields=[*MARK_FIELDS, 'updated_at'],
+            )
+
+        deleted = set()
+        if deletions:
+            marked = UserBook.objects.filter(user=user, book_id__in=list(deletions))
+            deleted = set(marked.values_list('book_id', flat=True))
+            marked.delete()
+
+        for book_id, index in deletions.items():
+            if book_id in deleted:
+                results[index] = {'book': book_id, 'status': 'deleted'}
+            elif book_id not in existing_books:
+                results[index] = {'book': book_id, 'status': 'error', 'error': 'Book not found'}
+            else:
+                results[index] = {'book': book_id, 'status': 'error', 'error': 'Mark not found'}
+
+        if marks or deleted:
+            invalidate_profile_stats(user.pk)
+
+    return results
@@ -0,0 +1,240 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from .routers import SAFE_METHODS, pin_to_primary, read_replicas, start_routing, stop_routing
+
+
+logger = logging.getLogger('booklist.performance')
+
+_current_metrics = ContextVar('booklist_request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Timings collected while one request is handled"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.query_time = 0.0
+        self.slowest_query = 0.0
+        self.query_templates = Counter()
+        self.serialize_time = 0.0
+        self.serialize_depth = 0
+        self.render_started = None
+        self.render_time = 0.0
+
+    def record_query(self, sql, duration):
+        self.query_count += 1
+        self.query_time += duration
+        self.slowest_query = max(self.slowest_query, duration)
+        # Parameters are passed separately, so per-row lookups share one template
+        self.query_templates[sql] += 1
+
+    def duplicate_queries(self, threshold):
+        return [(sql, count) for sql, count in self.query_templates.most_common() if count >= threshold]
+
+
+def current_metrics():
+    """Return the metrics of the request being handled, if instrumentation is on"""
+    return _current_metrics.get()
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper adding every query to the metrics of the current request
+
+    Installed once per connection (see install_query_recorder) and never
+    removed: concurrent async requests share the thread-sensitive connection,
+    so the context variable, not the wrapper, tells whose query it is.
+    """
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(sql, time.perf_counter() - started)
+
+
+def install_query_recorder(connection, **kwargs):
+    """connection_created receiver putting record_query on the connection"""
+    if record_query not in connection.execute_wrappers:
+        # Outermost: execute_wrapper() blocks pop the last wrapper on exit
+        connection.execute_wrappers.insert(0, record_query)
+
+
+class TimedSerializerMixin:
+    """
+    Adds the time spent in to_representation() to the request metrics
+
+    Nested serializers are only counted once, at the outermost level.
+    """
+
+    def to_representation(self, instance):
+        metrics = _current_metrics.get()
+        if metrics is None:
+            return super().to_representation(instance)
+
+        metrics.serialize_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serialize_depth -= 1
+            if metrics.serialize_depth == 0:
+                metrics.serialize_time += time.perf_counter() - started
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets ReplicaRouter send the reads of safe requests to the read replicas
+
+    After a successful unsafe request the client is pinned to the primary
+    for BOOK_PRIMARY_PIN_SECONDS, so it reads its own writes. Works in both
+    sync and async mode.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = start_routing(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_routing(token)
+        return self.finish(request, response)
+
+    async def __acall__(self, request):
+        token = start_routing(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_routing(token)
+        return self.finish(request, response)
+
+    def finish(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400 and read_replicas():
+            pin_to_primary(request)
+        return response
+
+
+class ServerTimingMiddleware:
+    """
+    Per-request SQL and timing instrumentation
+
+    Records the number of SQL queries with their total and slowest duration,
+    serializer and render time and the total view time. These are exposed as
+    a Server-Timing header (BOOK_SERVER_TIMING) and/or a JSON log line on the
+    `booklist.performance` logger (BOOK_TIMING_LOG). Any query template run
+    BOOK_DUPLICATE_QUERY_THRESHOLD times or more is flagged as a likely N+1.
+
+    Keep it last in MIDDLEWARE so rendering happens inside its window.
+    Works in both sync and async mode, so async views stay async under ASGI.
+    Queries are counted by record_query, which BooklistConfig installs on
+    every connection. A StreamingHttpResponse body (?stream=) is iterated
+    after this middleware has returned, so only the queries run before the
+    first row are counted and logged for streamed responses.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'BOOK_SERVER_TIMING', settings.DEBUG)
+        self.log = getattr(settings, 'BOOK_TIMING_LOG', False)
+        self.duplicate_threshold = getattr(settings, 'BOOK_DUPLICATE_QUERY_THRESHOLD', 5)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not (self.server_timing or self.log):
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not (self.server_timing or self.log):
+            return await self.get_response(request)
+
+        metrics = RequestMetrics()
+        # sync_to_async copies the context into the thread running the
+        # queries, so record_query sees this request's metrics there
+        token = _current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        total = time.perf_counter() - metrics.started
+        if metrics.render_started is not None:
+            metrics.render_time = time.perf_counter() - metrics.render_started
+        duplicates = metrics.duplicate_queries(self.duplicate_threshold)
+
+        if self.server_timing:
+            response['Server-Timing'] = self.server_timing_header(metrics, total, duplicates)
+        if self.log or duplicates:
+            self.log_request(request, response, metrics, total, duplicates)
+        return response
+
+    def process_template_response(self, request, response):
+        # Called right before DRF renders the response
+        metrics = _current_metrics.get()
+        if metrics is not None:
+            metrics.render_started = time.perf_counter()
+        return response
+
+    def server_timing_header(self, metrics, total, duplicates):
+        entries = [
+            f'db;dur={metrics.query_time * 1000:.2f};desc="{metrics.query_count} queries"',
+            f'db-slowest;dur={metrics.slowest_query * 1000:.2f}',
+            f'serialize;dur={metrics.serialize_time * 1000:.2f}',
+            f'render;dur={metrics.render_time * 1000:.2f}',
+            f'view;dur={total * 1000:.2f}',
+        ]
+        if duplicates:
+            worst_count = duplicates[0][1]
+            entries.append(f'db-duplicates;desc="{len(duplicates)} repeated queries, worst {worst_count}x"')
+        return ', '.join(entries)
+
+    def log_request(self, request, response, metrics, total, duplicates):
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': metrics.query_count,
+            'db_ms': round(metrics.query_time * 1000, 2),
+            'db_slowest_ms': round(metrics.slowest_query * 1000, 2),
+            'serialize_ms': round(metrics.serialize_time * 1000, 2),
+            'render_ms': round(metrics.render_time * 1000, 2),
+            'view_ms': round(total * 1000, 2),
+        }
+        if duplicates:
+            record['duplicate_queries'] = [{'sql': sql, 'count': count} for sql, count in duplicates]
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
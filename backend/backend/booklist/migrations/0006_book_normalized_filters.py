@@ -0,0 +1,55 @@
+# Generated by Django 6.0 on 2026-10-18 12:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_normalized(apps, schema_editor):
+    Book = apps.get_model('booklist', 'Book')
+    books = list(Book.objects.only('id', 'author', 'genre'))
+    for book in books:
+        book.author_normalized = book.author.strip().casefold() if book.author else ''
+        book.genre_normalized = book.genre.strip().casefold() if book.genre else None
+    Book.objects.bulk_update(books, ['author_normalized', 'genre_normalized'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booklist', '0005_book_author_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='author_normalized',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='genre_normalized',
+            field=models.CharField(blank=True, editable=False, max_length=50, null=True),
+        ),
+        migrations.RunPython(backfill_normalized, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['author_normalized'], name='book_author_norm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['genre_normalized'], name='book_genre_norm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userbook',
+            index=models.Index(condition=models.Q(('read', True)), fields=['user', 'book'], name='userbook_read_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userbook',
+            index=models.Index(condition=models.Q(('bought', True)), fields=['user', 'book'], name='userbook_bought_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userbook',
+            index=models.Index(condition=models.Q(('onBookshelf', True)), fields=['user', 'book'], name='userbook_shelf_idx'),
+        ),
+    ]
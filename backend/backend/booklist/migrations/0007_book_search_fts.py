@@ -0,0 +1,68 @@
+# Generated by Django 6.0 on 2026-10-18 12:30
+
+from django.db import migrations
+
+
+# The SQL as of this migration, frozen here so later changes to
+# booklist/search.py don't change what it does. Changes to the index or
+# its triggers belong in a new migration (post_migrate recreates dropped
+# triggers from search.py).
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS booklist_book_fts USING fts5(
+        title, author, description,
+        content='booklist_book', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS booklist_book_fts_ai AFTER INSERT ON booklist_book BEGIN
+        INSERT INTO booklist_book_fts(rowid, title, author, description)
+        VALUES (new.id, new.title, new.author, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS booklist_book_fts_ad AFTER DELETE ON booklist_book BEGIN
+        INSERT INTO booklist_book_fts(booklist_book_fts, rowid, title, author, description)
+        VALUES ('delete', old.id, old.title, old.author, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS booklist_book_fts_au AFTER UPDATE OF title, author, description ON booklist_book BEGIN
+        INSERT INTO booklist_book_fts(booklist_book_fts, rowid, title, author, description)
+        VALUES ('delete', old.id, old.title, old.author, old.description);
+        INSERT INTO booklist_book_fts(rowid, title, author, description)
+        VALUES (new.id, new.title, new.author, new.description);
+    END
+    """,
+    "INSERT INTO booklist_book_fts(booklist_book_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS booklist_book_fts_ai",
+    "DROP TRIGGER IF EXISTS booklist_book_fts_ad",
+    "DROP TRIGGER IF EXISTS booklist_book_fts_au",
+    "DROP TABLE IF EXISTS booklist_book_fts",
+]
+
+
+def run_sql(statements):
+    def run(apps, schema_editor):
+        # FTS5 is SQLite only, search.py falls back to a substring scan elsewhere
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booklist', '0006_book_normalized_filters'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sql(CREATE_SQL), run_sql(DROP_SQL)),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 6.0 on 2026-10-18 13:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# The SQL as of this migration, frozen here so later changes to
+# booklist/counters.py don't change what it does. Changes to the triggers
+# belong in a new migration (post_migrate recreates dropped triggers from
+# counters.py).
+CREATE_SQL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS booklist_book_counters_ai AFTER INSERT ON booklist_userbook
+    WHEN new."read" OR new."bought" OR new."onBookshelf" BEGIN
+        UPDATE booklist_book SET read_count = read_count + new."read", bought_count = bought_count + new."bought", shelved_count = shelved_count + new."onBookshelf" WHERE id = new.book_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS booklist_book_counters_ad AFTER DELETE ON booklist_userbook
+    WHEN old."read" OR old."bought" OR old."onBookshelf" BEGIN
+        UPDATE booklist_book SET read_count = read_count - old."read", bought_count = bought_count - old."bought", shelved_count = shelved_count - old."onBookshelf" WHERE id = old.book_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS booklist_book_counters_au
+    AFTER UPDATE OF "read", "bought", "onBookshelf", book_id ON booklist_userbook
+    WHEN old.book_id != new.book_id OR old."read" != new."read" OR old."bought" != new."bought" OR old."onBookshelf" != new."onBookshelf" BEGIN
+        UPDATE booklist_book SET read_count = read_count - old."read", bought_count = bought_count - old."bought", shelved_count = shelved_count - old."onBookshelf" WHERE id = old.book_id;
+        UPDATE booklist_book SET read_count = read_count + new."read", bought_count = bought_count + new."bought", shelved_count = shelved_count + new."onBookshelf" WHERE id = new.book_id;
+    END
+    """,
+    # Count the marks that existed before the triggers
+    """
+    UPDATE booklist_book SET read_count = counts.read_count, bought_count = counts.bought_count, shelved_count = counts.shelved_count
+    FROM (
+        SELECT book_id,
+            SUM(CASE WHEN "read" THEN 1 ELSE 0 END) AS read_count,
+            SUM(CASE WHEN "bought" THEN 1 ELSE 0 END) AS bought_count,
+            SUM(CASE WHEN "onBookshelf" THEN 1 ELSE 0 END) AS shelved_count
+        FROM booklist_userbook GROUP BY book_id
+    ) AS counts
+    WHERE booklist_book.id = counts.book_id
+    """,
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS booklist_book_counters_ai",
+    "DROP TRIGGER IF EXISTS booklist_book_counters_ad",
+    "DROP TRIGGER IF EXISTS booklist_book_counters_au",
+]
+
+
+def run_sql(statements):
+    def run(apps, schema_editor):
+        # Like counters.py, the triggers are SQLite only
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booklist', '0009_book_cover_renditions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='bought_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='read_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='shelved_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-read_count', 'id'], name='book_popular_idx'),
+        ),
+        migrations.RunPython(run_sql(CREATE_SQL), run_sql(DROP_SQL)),
+    ]
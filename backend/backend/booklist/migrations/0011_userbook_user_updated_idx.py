@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-18 13:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booklist', '0010_book_engagement_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userbook',
+            index=models.Index(fields=['user', 'updated_at'], name='userbook_user_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0 on 2026-10-18 13:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_isbn_normalized(apps, schema_editor):
+    from booklist.isbn import normalize_isbn
+
+    Book = apps.get_model('booklist', 'Book')
+    books = Book.objects.exclude(isbn=None).exclude(isbn='').only('id', 'isbn').order_by('id')
+    last_id = 0
+    while True:
+        batch = list(books.filter(id__gt=last_id)[:2000])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        for book in batch:
+            book.isbn_normalized = normalize_isbn(book.isbn)
+        Book.objects.bulk_update([book for book in batch if book.isbn_normalized], ['isbn_normalized'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booklist', '0011_userbook_user_updated_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='book',
+            name='book_isbn_idx',
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='isbn_normalized',
+            field=models.CharField(blank=True, editable=False, max_length=13, null=True),
+        ),
+        migrations.RunPython(backfill_isbn_normalized, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['isbn_normalized'], name='book_isbn_norm_idx'),
+        ),
+    ]
@@ -3,6 +3,8 @@ from django.conf import settings
 import os
 from cuid import cuid
 
+from .isbn import normalize_isbn
+
 # Create your models here.
 
 def book_cover_upload_path(instance, filename):
@@ -18,6 +20,9 @@ def book_cover_upload_path(instance, filename):
 
 
 class Book(models.Model):
+    # Written by the UserBook triggers only (see booklist/counters.py)
+    COUNTER_FIELDS = ('read_count', 'bought_count', 'shelved_count')
+
     title = models.CharField(max_length=100)
     author = models.CharField(max_length=100)
     description = models.TextField()
@@ -25,11 +30,67 @@ class Book(models.Model):
     genre = models.CharField(max_length=50, blank=True, null=True)
     cover = models.ImageField(upload_to=book_cover_upload_path, null=True, blank=True)
     coverUrl = models.URLField(max_length=500, blank=True, null=True)
+    # Resized WebP/JPEG copies of `cover` (see booklist/thumbnails.py)
+    cover_renditions = models.JSONField(default=dict, blank=True, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='uploaded_books')
+    # Case-folded copies of author/genre for indexed case-insensitive filtering
+    author_normalized = models.CharField(max_length=100, editable=False, default='')
+    genre_normalized = models.CharField(max_length=50, editable=False, blank=True, null=True)
+    # ISBN-13 form of `isbn`, None when it is not a valid ISBN (see booklist/isbn.py)
+    isbn_normalized = models.CharField(max_length=13, editable=False, blank=True, null=True)
+    # Users who marked the book read/bought/on their bookshelf, maintained by
+    # triggers on UserBook (see booklist/counters.py)
+    read_count = models.PositiveIntegerField(default=0, editable=False)
+    bought_count = models.PositiveIntegerField(default=0, editable=False)
+    shelved_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination walks the catalog in (author, id) order
+            models.Index(fields=['author', 'id'], name='book_author_id_idx'),
+            models.Index(fields=['author_normalized'], name='book_author_norm_idx'),
+            models.Index(fields=['genre_normalized'], name='book_genre_norm_idx'),
+            # import_books dedupes by ISBN
+            models.Index(fields=['isbn_normalized'], name='book_isbn_norm_idx'),
+            # ?sort=popular walks the catalog in (-read_count, id) order
+            models.Index(fields=['-read_count', 'id'], name='book_popular_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @staticmethod
+    def normalize(value):
+        """Case-fold a filter value the same way the normalized columns are stored"""
+        return value.strip().casefold() if value else value
+
+    def normalize_fields(self):
+        """Refresh the normalized columns (call before bulk_create / bulk_update)"""
+        self.author_normalized = self.normalize(self.author) or ''
+        self.genre_normalized = self.normalize(self.genre) or None
+        self.isbn_normalized = normalize_isbn(self.isbn)
+
+    def save(self, *args, **kwargs):
+        self.normalize_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            # The counters loaded with this instance may be behind by now,
+            # writing them back would drop the marks made since
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        elif update_fields is not None:
+            update_fields = set(update_fields)
+            if 'author' in update_fields:
+                update_fields.add('author_normalized')
+            if 'genre' in update_fields:
+                update_fields.add('genre_normalized')
+            if 'isbn' in update_fields:
+                update_fields.add('isbn_normalized')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
 
 class UserBook(models.Model):
     """Kapcsolótábla: Melyik user melyik könyvet jelölte meg"""
@@ -43,6 +104,14 @@ class UserBook(models.Model):
 
     class Meta:
         unique_together = ('user', 'book')
+        indexes = [
+            # "Marked ... by me" filters only touch the user's flagged rows
+            models.Index(fields=['user', 'book'], condition=models.Q(read=True), name='userbook_read_idx'),
+            models.Index(fields=['user', 'book'], condition=models.Q(bought=True), name='userbook_bought_idx'),
+            models.Index(fields=['user', 'book'], condition=models.Q(onBookshelf=True), name='userbook_shelf_idx'),
+            # /api/profile/books/ walks a user's marks in (updated_at, id) order
+            models.Index(fields=['user', 'updated_at'], name='userbook_user_updated_idx'),
+        ]
         verbose_name = 'User Book Mark'
         verbose_name_plural = 'User Book Marks'
 
@@ -0,0 +1,150 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over a stable, unique ordering
+
+    The cursor is an opaque token holding the ordering values of the last
+    row of the previous page, so every page is a range scan on the matching
+    index instead of an OFFSET that grows with the page number.
+    Pagination is opt-in: it only kicks in when the request carries a
+    `cursor` or `page_size` query parameter.
+    """
+    ordering = ('author', 'id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        self.page_size = getattr(settings, 'BOOK_PAGE_SIZE', 50)
+        self.max_page_size = getattr(settings, 'BOOK_MAX_PAGE_SIZE', 200)
+
+    def is_requested(self, request):
+        """Return True if the client asked for a paginated response"""
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def encode_cursor(self, position):
+        raw = json.dumps(position, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+        except (binascii.Error, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        if not all(isinstance(value, (str, int, float)) for value in position):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def position_filter(self, position):
+        """
+        Build the "comes after `position`" filter for the current ordering
+
+        The leading column is also bounded on its own so the database can
+        turn the lookup into a single index range scan.
+        """
+        fields = [field.lstrip('-') for field in self.ordering]
+        lookups = ['lt' if field.startswith('-') else 'gt' for field in self.ordering]
+
+        after = Q()
+        for index, (field, lookup) in enumerate(zip(fields, lookups)):
+            step = Q(**{f'{field}__{lookup}': position[index]})
+            for prev_field, prev_value in zip(fields[:index], position[:index]):
+                step &= Q(**{prev_field: prev_value})
+            after |= step
+
+        leading = Q(**{f'{fields[0]}__{lookups[0]}e': position[0]})
+        return leading & after
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_rows(list(self.get_page_queryset(queryset, request)))
+
+    def get_page_queryset(self, queryset, request):
+        """
+        Return the (unevaluated) queryset of the requested page
+
+        Split from paginate_rows() so async views can fetch the rows themselves.
+        """
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.position_filter(position))
+            except (TypeError, ValueError, ValidationError):
+                # Well-formed, but values that don't fit the ordering columns
+                raise NotFound(self.invalid_cursor_message)
+
+        # Fetch one extra row to know whether there is a next page
+        return queryset[:self.page_size_value + 1]
+
+    def paginate_rows(self, rows):
+        self.has_next = len(rows) > self.page_size_value
+        page = rows[:self.page_size_value]
+
+        self.next_position = None
+        if self.has_next:
+            last = page[-1]
+            self.next_position = [
+                self._position_value(last, field.lstrip('-')) for field in self.ordering
+            ]
+        return page
+
+    def _position_value(self, obj, field):
+        value = getattr(obj, field)
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size_value)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,27 @@
+from django.conf import settings
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+from .renderers import FastJSONRenderer, fast_json_enabled, orjson
+
+
+class FastJSONParser(parsers.JSONParser):
+    """
+    JSONParser on orjson
+
+    Accepts the same documents as DRF's strict JSONParser (orjson rejects
+    NaN and Infinity too). Bodies in a charset other than UTF-8, or
+    BOOK_JSON_BACKEND = 'json', go through DRF's parser.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if not fast_json_enabled() or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,51 @@
+from django.conf import settings
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Optional, DRF's stdlib encoder is used without it
+    orjson = None
+
+
+def fast_json_enabled():
+    """orjson is installed and BOOK_JSON_BACKEND asks for it"""
+    return orjson is not None and getattr(settings, 'BOOK_JSON_BACKEND', 'orjson') == 'orjson'
+
+
+# Everything orjson can't encode the way DRF does (Decimal, timedelta, lazy
+# strings, querysets, ...) goes through DRF's own encoder. Datetimes are
+# passed through as well: orjson keeps microseconds, DRF truncates them
+_default = JSONEncoder().default
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson is not None else 0
+
+
+def dumps(data):
+    """Encode `data` to the same bytes as a compact JSONRenderer"""
+    if not fast_json_enabled():
+        return renderers.JSONRenderer().render(data)
+    ret = orjson.dumps(data, default=_default, option=_OPTIONS)
+    # Same strict-javascript-subset escaping as JSONRenderer
+    if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+        ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return ret
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    JSONRenderer on orjson, several times faster on large lists
+
+    Output is byte for byte the same as DRF's compact JSONRenderer, so
+    ETags and cached responses don't change with the backend. Indented
+    output (`Accept: application/json; indent=4`, the browsable API),
+    BOOK_JSON_BACKEND = 'json' or a missing orjson use DRF's renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not (self.compact and self.strict and not self.ensure_ascii) or not fast_json_enabled():
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
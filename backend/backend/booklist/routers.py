@@ -0,0 +1,145 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import UntypedToken
+
+
+PIN_KEY = 'booklist:primary_pin:{}'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_routing = ContextVar('booklist_db_routing', default=None)
+
+
+def read_replicas():
+    """Database aliases that serve the reads of safe requests"""
+    return getattr(settings, 'BOOK_READ_REPLICAS', [])
+
+
+def pin_seconds():
+    """How long a client reads from the primary after writing"""
+    return getattr(settings, 'BOOK_PRIMARY_PIN_SECONDS', 5)
+
+
+class ReadRouting:
+    """Where the reads of one request go"""
+
+    def __init__(self, use_replicas):
+        self.use_replicas = use_replicas
+        # Picked on the first read and kept, so every query of the request
+        # sees the same snapshot
+        self.replica = None
+
+
+def _user_pin_key(user_id):
+    return PIN_KEY.format(f'user:{user_id}')
+
+
+def _address_pin_key(request):
+    return PIN_KEY.format('addr:' + request.META.get('REMOTE_ADDR', ''))
+
+
+def _unverified_user_id(request):
+    # Only decides where reads go: a forged token can at worst send its own
+    # reads to the primary, authentication still verifies it
+    header = request.headers.get('Authorization', '')
+    scheme, _, raw_token = header.partition(' ')
+    if scheme not in api_settings.AUTH_HEADER_TYPES or not raw_token:
+        return None
+    try:
+        token = UntypedToken(raw_token, verify=False)
+    except TokenError:
+        return None
+    return token.get(api_settings.USER_ID_CLAIM)
+
+
+def is_pinned(request):
+    """True if the client wrote in the last BOOK_PRIMARY_PIN_SECONDS"""
+    keys = [_address_pin_key(request)]
+    user_id = _unverified_user_id(request)
+    if user_id is not None:
+        keys.append(_user_pin_key(user_id))
+    return bool(cache.get_many(keys))
+
+
+def pin_to_primary(request):
+    """
+    Send the client's reads to the primary for BOOK_PRIMARY_PIN_SECONDS
+
+    Authenticated writers are pinned as a user, on every device. Anonymous
+    writes (registration, login, token refresh) pin the client address
+    instead: the reads that follow come with a token the write didn't have.
+    That pins every client sharing the address too (NAT, or everyone when
+    a reverse proxy is the REMOTE_ADDR), which only costs them replica reads
+    for a few seconds.
+
+    Pins are stored in Django's cache: the next request only sees them in
+    another worker process when CACHES is shared (see settings).
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        key = _user_pin_key(user.pk)
+    else:
+        key = _address_pin_key(request)
+    cache.set(key, True, timeout=pin_seconds())
+
+
+def start_routing(request):
+    """Route the reads of `request`, returns the token for `stop_routing`"""
+    use_replicas = (
+        request.method in SAFE_METHODS
+        and bool(read_replicas())
+        and not is_pinned(request)
+    )
+    return _routing.set(ReadRouting(use_replicas))
+
+
+def stop_routing(token):
+    _routing.reset(token)
+
+
+def replica_used():
+    """True if the current request has read from a replica"""
+    routing = _routing.get()
+    return routing is not None and routing.replica is not None
+
+
+class ReplicaRouter:
+    """
+    Sends the reads of safe requests to the BOOK_READ_REPLICAS
+
+    Everything else goes to the primary: writes, reads of unsafe requests,
+    reads inside a transaction and reads outside of a request (management
+    commands, signals, tests). A client that wrote reads from the primary
+    for BOOK_PRIMARY_PIN_SECONDS afterwards, so it sees its own writes even
+    though the replicas lag behind. ReplicaRoutingMiddleware sets up the
+    per-request state. Replicas are read-only copies: nothing is migrated
+    on them.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or not routing.use_replicas:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if routing.replica is None:
+            routing.replica = random.choice(read_replicas())
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        # Explicit, or Django would write an instance back where it was read
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # All aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in read_replicas():
+            return False
+        return None
@@ -0,0 +1,279 @@
+import time
+from operator import attrgetter
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models.functions import Substr
+from rest_framework import serializers
+
+from .covers import proxy_url
+from .middleware import current_metrics
+from .serializer import BookListSerializer, marks_by_book, user_marks_queryset
+from .thumbnails import cover_rendition_urls
+
+
+# Output fields, in BookSerializer order
+BOOK_FIELDS = (
+    'id', 'title', 'author', 'description', 'isbn', 'genre', 'cover', 'coverUrl',
+    'coverRenditions', 'coverProxyUrl', 'engagement', 'user', 'user_mark',
+)
+
+USER_COLUMNS = (
+    'user_id', 'user__username', 'user__email', 'user__first_name', 'user__last_name',
+    'user__is_staff', 'user__is_superuser', 'user__is_active', 'user__date_joined',
+)
+
+# Columns read for each output field
+FIELD_COLUMNS = {
+    'id': ('id',),
+    'title': ('title',),
+    'author': ('author',),
+    'description': ('description',),
+    'isbn': ('isbn',),
+    'genre': ('genre',),
+    'cover': ('cover',),
+    'coverUrl': ('coverUrl',),
+    'coverRenditions': ('cover', 'cover_renditions'),
+    'coverProxyUrl': ('coverUrl',),
+    'engagement': ('read_count', 'bought_count', 'shelved_count'),
+    'user': USER_COLUMNS,
+    'user_mark': (),
+}
+
+# Compact list view: description excerpt and the owner's id only
+COMPACT_COLUMNS = {
+    'description': ('description_excerpt',),
+    'user': ('user_id',),
+}
+
+BOOK_VIEWS = ('full', 'compact')
+
+# Related objects that can be side-loaded with ?include=
+BOOK_INCLUDES = ('users',)
+
+# Every row keeps the keyset pagination columns (of every BOOK_ORDERINGS)
+KEY_COLUMNS = ('id', 'author', 'read_count')
+
+# DRF's own field does the timezone handling, so dates match BookSerializer exactly
+_date_joined = serializers.DateTimeField()
+
+
+def excerpt_length():
+    return getattr(settings, 'BOOK_EXCERPT_LENGTH', 200)
+
+
+def requested_fields(request):
+    """
+    Return (fields, compact) asked for with `?fields=` and `?view=compact`
+
+    `fields` is a comma separated subset of BOOK_FIELDS, the response keeps
+    BookSerializer's field order. `view=compact` cuts the description to an
+    excerpt of BOOK_EXCERPT_LENGTH characters and replaces the nested owner
+    with the owner's id.
+    """
+    params = request.query_params
+
+    view = params.get('view', 'full')
+    if view not in BOOK_VIEWS:
+        raise serializers.ValidationError({"error": f"view must be one of: {', '.join(BOOK_VIEWS)}"})
+
+    fields = BOOK_FIELDS
+    requested = params.get('fields')
+    if requested is not None:
+        names = {name.strip() for name in requested.split(',') if name.strip()}
+        unknown = sorted(names - set(BOOK_FIELDS))
+        if unknown:
+            raise serializers.ValidationError({"error": f"Unknown field: {', '.join(unknown)}"})
+        if not names:
+            raise serializers.ValidationError({"error": "fields must name at least one field"})
+        fields = tuple(name for name in BOOK_FIELDS if name in names)
+
+    return fields, view == 'compact'
+
+
+def sideloaded_users(request, fields=BOOK_FIELDS):
+    """
+    True if the owners are requested side-loaded, with `?include=users`
+
+    Books then reference their owner by id and the response carries a
+    top-level `users` map holding each distinct owner once. `fields` are the
+    requested_fields(): the owners come from the `user` field, so it has to
+    be one of them.
+    """
+    include = request.query_params.get('include')
+    if include is None:
+        return False
+    names = {name.strip() for name in include.split(',') if name.strip()}
+    unknown = sorted(names - set(BOOK_INCLUDES))
+    if unknown:
+        raise serializers.ValidationError({"error": f"Unknown include: {', '.join(unknown)}"})
+    if 'users' in names and 'user' not in fields:
+        raise serializers.ValidationError({"error": "include=users needs the user field"})
+    return 'users' in names
+
+
+def book_rows(queryset, fields=BOOK_FIELDS, compact=False, sideload_users=False):
+    """
+    Narrow a Book queryset to the columns BookRowSerializer needs, as named rows
+
+    Only the columns of `fields` are selected (the owner is only joined when
+    `user` is requested), and in compact mode the database returns just the
+    start of the description.
+    """
+    columns = dict.fromkeys(KEY_COLUMNS)
+    for field in fields:
+        if field == 'user' and sideload_users:
+            columns.update(dict.fromkeys(USER_COLUMNS))
+        else:
+            columns.update(dict.fromkeys((compact and COMPACT_COLUMNS.get(field)) or FIELD_COLUMNS[field]))
+
+    if 'description_excerpt' in columns:
+        # One character more than the excerpt tells whether it was cut
+        queryset = queryset.annotate(description_excerpt=Substr('description', 1, excerpt_length() + 1))
+    return queryset.values_list(*columns, named=True)
+
+
+def excerpt(text, length):
+    """Cut `text` to at most `length` characters at a word boundary, marking the cut with an ellipsis"""
+    if text is None or len(text) <= length:
+        return text
+    cut = text[:length - 1]
+    if ' ' in cut:
+        cut = cut.rsplit(' ', 1)[0]
+    return cut.rstrip() + '…'
+
+
+class BookRowSerializer:
+    """
+    Read-only fast path producing exactly the output of BookSerializer(many=True)
+
+    Works on rows from book_rows() instead of model instances and builds the
+    response dicts directly, skipping DRF's per-field machinery. Owners are
+    serialized once per list and the current user's marks are loaded in one
+    query, like BookListSerializer. Any change to BookSerializer or
+    UserSerializer fields must be mirrored here, the tests compare both
+    outputs byte for byte.
+
+    `fields` and `compact` come from requested_fields() and must match the
+    ones the rows were fetched with. With `sideload_users` books hold their
+    owner's id and the owners of the last serialized list are left in
+    `users`, keyed by id.
+    """
+
+    def __init__(self, request=None, user_marks=None, fields=BOOK_FIELDS, compact=False, sideload_users=False):
+        self.request = request
+        self.user_marks = user_marks
+        self.fields = fields
+        self.compact = compact
+        self.sideload_users = sideload_users
+        self.users = {}
+
+    def rows(self, queryset):
+        """book_rows() with this serializer's fields"""
+        return book_rows(queryset, self.fields, self.compact, self.sideload_users)
+
+    def _url(self, url):
+        return self.request.build_absolute_uri(url) if self.request is not None else url
+
+    def _user(self, row):
+        return {
+            'id': row.user_id,
+            'username': row.user__username,
+            'email': row.user__email,
+            'first_name': row.user__first_name,
+            'last_name': row.user__last_name,
+            'is_staff': row.user__is_staff,
+            'is_superuser': row.user__is_superuser,
+            'is_active': row.user__is_active,
+            'date_joined': _date_joined.to_representation(row.user__date_joined),
+        }
+
+    def _getters(self, user_marks):
+        """(field, function of a row) for each output field"""
+        request = self.request
+        users = self.users
+
+        def owner(row):
+            user = users.get(row.user_id)
+            if user is None:
+                user = users[row.user_id] = self._user(row)
+            return user
+
+        def owner_id(row):
+            if row.user_id not in users:
+                users[row.user_id] = self._user(row)
+            return row.user_id
+
+        getters = {
+            'id': attrgetter('id'),
+            'title': attrgetter('title'),
+            'author': attrgetter('author'),
+            'description': attrgetter('description'),
+            'isbn': attrgetter('isbn'),
+            'genre': attrgetter('genre'),
+            'cover': lambda row: self._url(default_storage.url(row.cover)) if row.cover else None,
+            'coverUrl': attrgetter('coverUrl'),
+            'coverRenditions': lambda row: cover_rendition_urls(row.cover, row.cover_renditions, request),
+            'coverProxyUrl': lambda row: proxy_url(row.id, row.coverUrl, request),
+            'engagement': lambda row: {'read': row.read_count, 'bought': row.bought_count, 'onBookshelf': row.shelved_count},
+            'user': owner,
+            'user_mark': (lambda row: user_marks.get(row.id)) if user_marks is not None else (lambda row: None),
+        }
+        if self.compact:
+            length = excerpt_length()
+            getters['description'] = lambda row: excerpt(row.description_excerpt, length)
+            getters['user'] = attrgetter('user_id')
+        if self.sideload_users:
+            getters['user'] = owner_id
+        return [(field, getters[field]) for field in self.fields]
+
+    def _serialize_full(self, rows, user_marks):
+        # The default response, spelled out: a third faster than the getters
+        request = self.request
+        users = self.users
+        sideload_users = self.sideload_users
+        data = []
+        for row in rows:
+            user = users.get(row.user_id)
+            if user is None:
+                user = users[row.user_id] = self._user(row)
+
+            data.append({
+                'id': row.id,
+                'title': row.title,
+                'author': row.author,
+                'description': row.description,
+                'isbn': row.isbn,
+                'genre': row.genre,
+                'cover': self._url(default_storage.url(row.cover)) if row.cover else None,
+                'coverUrl': row.coverUrl,
+                'coverRenditions': cover_rendition_urls(row.cover, row.cover_renditions, request),
+                'coverProxyUrl': proxy_url(row.id, row.coverUrl, request),
+                'engagement': {'read': row.read_count, 'bought': row.bought_count, 'onBookshelf': row.shelved_count},
+                'user': row.user_id if sideload_users else user,
+                'user_mark': user_marks.get(row.id) if user_marks is not None else None,
+            })
+        return data
+
+    def serialize(self, rows):
+        metrics = current_metrics()
+        started = time.perf_counter()
+
+        request = self.request
+        user_marks = None
+        if request is not None and request.user.is_authenticated and 'user_mark' in self.fields:
+            user_marks = self.user_marks
+            if user_marks is None:
+                book_ids = [row.id for row in rows]
+                user_marks = marks_by_book(user_marks_queryset(request.user, book_ids, BookListSerializer.max_in_lookup))
+
+        self.users = {}
+        if self.fields == BOOK_FIELDS and not self.compact:
+            data = self._serialize_full(rows, user_marks)
+        else:
+            getters = self._getters(user_marks)
+            data = [{field: get(row) for field, get in getters} for row in rows]
+
+        if metrics is not None:
+            metrics.serialize_time += time.perf_counter() - started
+        return data
@@ -0,0 +1,135 @@
+import re
+
+from django.db import connection as default_connection
+from django.db.models import Q
+
+from .models import Book
+
+
+# External-content FTS5 index over Book.title/author/description.
+# Rows are kept in sync by triggers, so bulk_create/update() are covered too.
+FTS_TABLE = 'booklist_book_fts'
+BOOK_TABLE = Book._meta.db_table
+
+# bm25() column weights: a hit in the title outranks one in the description
+TITLE_WEIGHT = 10.0
+AUTHOR_WEIGHT = 5.0
+DESCRIPTION_WEIGHT = 1.0
+
+MAX_TERMS = 10
+
+TRIGGERS = {
+    f'{FTS_TABLE}_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {BOOK_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, title, author, description)
+            VALUES (new.id, new.title, new.author, new.description);
+        END
+    """,
+    f'{FTS_TABLE}_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {BOOK_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author, description)
+            VALUES ('delete', old.id, old.title, old.author, old.description);
+        END
+    """,
+    f'{FTS_TABLE}_au': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, author, description ON {BOOK_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author, description)
+            VALUES ('delete', old.id, old.title, old.author, old.description);
+            INSERT INTO {FTS_TABLE}(rowid, title, author, description)
+            VALUES (new.id, new.title, new.author, new.description);
+        END
+    """,
+}
+
+
+def is_supported(connection=default_connection):
+    return connection.vendor == 'sqlite'
+
+
+def install_search_index(connection=default_connection):
+    """
+    Create the FTS5 table and its sync triggers if they are missing
+
+    SQLite migrations that rebuild the book table drop its triggers, so this
+    also runs after every migrate and re-indexes the catalog when a trigger
+    had to be recreated.
+    """
+    if not is_supported(connection):
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s",
+            [BOOK_TABLE]
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                title, author, description,
+                content='{BOOK_TABLE}', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3'
+            )
+        """)
+        for sql in TRIGGERS.values():
+            cursor.execute(sql)
+
+        if not set(TRIGGERS) <= existing:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_search_index(connection=default_connection):
+    if not is_supported(connection):
+        return
+
+    with connection.cursor() as cursor:
+        for name in TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def build_match_query(query):
+    """
+    Turn free text into an FTS5 MATCH expression
+
+    Every word becomes a quoted prefix term (`"pott"*`), all of which must
+    match, so user input can never inject FTS5 query syntax.
+    """
+    terms = re.findall(r'\w+', query or '')[:MAX_TERMS]
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_books(query, limit, offset=0):
+    """
+    Return up to `limit` books matching `query`, best BM25 rank first
+
+    The owner is loaded with select_related, matching the book list views.
+    """
+    match = build_match_query(query)
+    if match is None:
+        return []
+
+    if not is_supported(default_connection):
+        # No FTS5 outside SQLite: fall back to a (slow) substring scan
+        condition = Q()
+        for term in re.findall(r'\w+', query)[:MAX_TERMS]:
+            condition &= Q(title__icontains=term) | Q(author__icontains=term) | Q(description__icontains=term)
+        return list(Book.objects.select_related('user').filter(condition).order_by('id')[offset:offset + limit])
+
+    with default_connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT rowid FROM {FTS_TABLE}
+            WHERE {FTS_TABLE} MATCH %s
+            ORDER BY bm25({FTS_TABLE}, %s, %s, %s), rowid
+            LIMIT %s OFFSET %s
+            """,
+            [match, TITLE_WEIGHT, AUTHOR_WEIGHT, DESCRIPTION_WEIGHT, limit, offset]
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+
+    books = Book.objects.select_related('user').in_bulk(ids)
+    return [books[pk] for pk in ids if pk in books]
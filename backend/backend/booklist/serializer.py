@@ -1,22 +1,71 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import Book, UserBook
+from .middleware import TimedSerializerMixin
+from .covers import proxy_url
+from .thumbnails import rendition_urls
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'is_staff', 'is_superuser', 'is_active', 'date_joined']
         read_only_fields = ['id', 'date_joined']
 
 
-class UserBookSerializer(serializers.ModelSerializer):
+class UserBookSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = UserBook
         fields = ['id', 'user', 'book', 'bought', 'read', 'onBookshelf', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class BookSerializer(serializers.ModelSerializer):
+class BookListSerializer(serializers.ListSerializer):
+    """
+    Loads the current user's marks for the whole list in one query
+
+    The marks are stored in the shared serializer context as a map keyed by
+    book id, so `BookSerializer.get_user_mark` never hits the database per row.
+    """
+    # Above this many books, fetch all of the user's marks instead of an IN list
+    max_in_lookup = 500
+
+    def to_representation(self, data):
+        books = list(data.all() if hasattr(data, 'all') else data)
+        # Async views preload the marks themselves
+        if 'user_marks' not in self.context:
+            request = self.context.get('request')
+            user = request.user if request else None
+            book_ids = [book.pk for book in books]
+            self.context['user_marks'] = marks_by_book(user_marks_queryset(user, book_ids, self.max_in_lookup))
+        return super().to_representation(books)
+
+
+def user_marks_queryset(user, book_ids, max_in_lookup=BookListSerializer.max_in_lookup):
+    """Values queryset of `user`'s marks on the books `book_ids`, or None for anonymous users"""
+    if not (user and user.is_authenticated):
+        return None
+
+    marks = UserBook.objects.filter(user=user)
+    if len(book_ids) <= max_in_lookup:
+        marks = marks.filter(book_id__in=book_ids)
+    return marks.values('book_id', 'bought', 'read', 'onBookshelf')
+
+
+def marks_by_book(marks):
+    """Map book id -> user_mark dict from rows of user_marks_queryset()"""
+    if marks is None:
+        return {}
+    return {
+        mark['book_id']: {
+            'bought': mark['bought'],
+            'read': mark['read'],
+            'onBookshelf': mark['onBookshelf']
+        }
+        for mark in marks
+    }
+
+
+class BookSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     user_mark = serializers.SerializerMethodField()
 
@@ -25,15 +74,36 @@ class BookSerializer(serializers.ModelSerializer):
     genre = serializers.CharField(required=False, allow_blank=True, allow_null=True)
     cover = serializers.ImageField(required=False, allow_null=True)
     coverUrl = serializers.URLField(required=False, allow_blank=True, allow_null=True)
+    coverRenditions = serializers.SerializerMethodField()
+    coverProxyUrl = serializers.SerializerMethodField()
+    engagement = serializers.SerializerMethodField()
 
     class Meta:
         model = Book
-        fields = ['id', 'title', 'author', 'description', 'isbn', 'genre', 'cover', 'coverUrl', 'user', 'user_mark']
+        fields = ['id', 'title', 'author', 'description', 'isbn', 'genre', 'cover', 'coverUrl', 'coverRenditions', 'coverProxyUrl', 'engagement', 'user', 'user_mark']
+        list_serializer_class = BookListSerializer
+
+    def get_coverRenditions(self, obj):
+        """Resized WebP/JPEG cover URLs by size (card, detail, retina), once generated"""
+        return rendition_urls(obj, self.context.get('request'))
+
+    def get_coverProxyUrl(self, obj):
+        """coverUrl served through the local cover cache, for proxied hosts"""
+        return proxy_url(obj.pk, obj.coverUrl, self.context.get('request'))
+
+    def get_engagement(self, obj):
+        """How many users marked the book read, bought or on their bookshelf"""
+        return {'read': obj.read_count, 'bought': obj.bought_count, 'onBookshelf': obj.shelved_count}
 
     def get_user_mark(self, obj):
         """Return the current user's mark for this book, if any"""
         request = self.context.get('request')
         if request and request.user.is_authenticated:
+            # Lists preload every mark in one query (see BookListSerializer)
+            user_marks = self.context.get('user_marks')
+            if user_marks is not None:
+                return user_marks.get(obj.pk)
+
             try:
                 user_book = UserBook.objects.get(user=request.user, book=obj)
                 return {
@@ -0,0 +1,96 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from .authentication import token_cache
+from .cache import bump_catalog_version
+from .models import Book
+from .serializer import UserSerializer
+from .stats import invalidate_readers_stats
+from .thumbnails import delete_rendition_files, needs_renditions, schedule_renditions
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_book_cache(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Book)
+def invalidate_readers_stats_on_save(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    # Profile stats group the marks by genre, a new book has no marks yet
+    if created or raw or (update_fields is not None and 'genre' not in update_fields):
+        return
+    invalidate_readers_stats(instance.pk)
+
+
+@receiver(pre_delete, sender=Book)
+def invalidate_readers_stats_on_delete(sender, instance, **kwargs):
+    # Before the marks are deleted along with the book
+    invalidate_readers_stats(instance.pk)
+
+
+@receiver(post_save, sender=Book)
+def update_cover_renditions(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if needs_renditions(instance):
+        schedule_renditions(instance)
+    elif not instance.cover and instance.cover_renditions:
+        # Cover removed
+        delete_rendition_files(instance.cover_renditions)
+        Book.objects.filter(pk=instance.pk).update(cover_renditions={})
+        instance.cover_renditions = {}
+
+
+@receiver(post_delete, sender=Book)
+def delete_cover_renditions(sender, instance, **kwargs):
+    renditions = instance.cover_renditions
+    if renditions:
+        transaction.on_commit(lambda: delete_rendition_files(renditions))
+
+
+# The owner fields book payloads embed
+OWNER_FIELDS = tuple(name for name in UserSerializer.Meta.fields if name != 'id')
+
+
+def _owner_values(instance):
+    # From __dict__: reading a deferred field would query it
+    return {name: instance.__dict__.get(name) for name in OWNER_FIELDS}
+
+
+@receiver(post_init, sender=User)
+def remember_owner_fields(sender, instance, **kwargs):
+    instance._owner_values = _owner_values(instance)
+
+
+@receiver(post_save, sender=User)
+def invalidate_owner_cache(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Book payloads embed the owner, so owner changes change them too
+
+    Only saves that change one of the embedded fields bump the catalog
+    version: logins (last_login) and password changes leave the cached
+    responses alone. A new user owns no books yet.
+    """
+    values = _owner_values(instance)
+    changed = raw or values != getattr(instance, '_owner_values', None)
+    instance._owner_values = values
+    if changed and not created:
+        bump_catalog_version()
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_owner_cache(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_tokens(sender, instance, **kwargs):
+    # Deactivated accounts and changed passwords must not stay authenticated
+    user_id = instance.pk
+    token_cache.invalidate_user(user_id)
+    # Again once committed, a request may have cached the old row meanwhile
+    transaction.on_commit(lambda: token_cache.invalidate_user(user_id))
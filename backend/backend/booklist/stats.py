@@ -0,0 +1,136 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, DateField, F, Q, When
+from django.db.models.functions import TruncMonth
+
+from .cache import replica_may_be_stale
+from .models import UserBook
+from .routers import replica_used
+
+
+STATS_KEY = 'booklist:profile_stats:{}'
+STATS_VERSION_KEY = 'booklist:profile_stats_version:{}'
+
+
+def stats_ttl():
+    return getattr(settings, 'BOOK_PROFILE_STATS_TTL', 24 * 60 * 60)
+
+
+def get_stats_version(user_id):
+    """Return the version of a user's marks, bumped whenever they change"""
+    key = STATS_VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_stats_version(*user_ids):
+    for user_id in user_ids:
+        key = STATS_VERSION_KEY.format(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate_profile_stats(user_id):
+    """
+    Drop the cached reading statistics of a user, call after changing their marks
+
+    The version is bumped once the change is committed: a request computing
+    the statistics before that would otherwise cache them under the new
+    version.
+    """
+    transaction.on_commit(lambda: bump_stats_version(user_id))
+
+
+def invalidate_readers_stats(*book_ids):
+    """
+    Drop the cached reading statistics of every user who marked the books
+
+    Call when a book's genre changes, or before deleting it (the marks go
+    with it). Only the readers are looked up, in one query for all books;
+    other users' entries stay.
+    """
+    user_ids = list(
+        UserBook.objects.filter(book_id__in=book_ids).values_list('user_id', flat=True).distinct()
+    )
+    if user_ids:
+        transaction.on_commit(lambda: bump_stats_version(*user_ids))
+
+
+def compute_profile_stats(user_id):
+    """
+    Reading statistics of a user's marks, in one query
+
+    The marks are grouped by (genre, month the book was read) with a
+    conditional count per flag; the totals, the genres read and the books
+    read per month are all sums over those few rows. A mark's updated_at
+    stands in for the day the book was finished.
+    """
+    read_month = TruncMonth(Case(When(read=True, then=F('updated_at'))), output_field=DateField())
+    rows = (
+        UserBook.objects.filter(user_id=user_id)
+        .values(genre=F('book__genre'), month=read_month)
+        .annotate(
+            marked=Count('id'),
+            read_total=Count('id', filter=Q(read=True)),
+            bought_total=Count('id', filter=Q(bought=True)),
+            shelved_total=Count('id', filter=Q(onBookshelf=True)),
+        )
+        .order_by()
+    )
+
+    totals = {'marked': 0, 'read': 0, 'bought': 0, 'onBookshelf': 0}
+    genres = {}
+    months = {}
+    for row in rows:
+        totals['marked'] += row['marked']
+        totals['read'] += row['read_total']
+        totals['bought'] += row['bought_total']
+        totals['onBookshelf'] += row['shelved_total']
+        if row['read_total'] and row['genre']:
+            genres[row['genre']] = genres.get(row['genre'], 0) + row['read_total']
+        if row['month'] is not None:
+            month = row['month'].strftime('%Y-%m')
+            months[month] = months.get(month, 0) + row['read_total']
+
+    return {
+        'totals': totals,
+        'genres': [
+            {'genre': genre, 'read': count}
+            for genre, count in sorted(genres.items(), key=lambda item: (-item[1], item[0]))
+        ],
+        'months': [{'month': month, 'read': count} for month, count in sorted(months.items())],
+    }
+
+
+def profile_stats(user_id):
+    """
+    Cached compute_profile_stats(), one cache round trip when warm
+
+    Entries hold the user's stats version they were computed at, bumped by
+    their mark changes (invalidate_profile_stats) and by edits or deletes of
+    the books they marked (invalidate_readers_stats).
+    """
+    key = STATS_KEY.format(user_id)
+    version_key = STATS_VERSION_KEY.format(user_id)
+    cached = cache.get_many([key, version_key])
+
+    version = cached.get(version_key)
+    entry = cached.get(key)
+    if entry is not None and version is not None and entry[0] == version:
+        return entry[1]
+
+    if version is None:
+        version = get_stats_version(user_id)
+    stats = compute_profile_stats(user_id)
+    # Not under the current version if the replica may predate a book change
+    if not (replica_used() and replica_may_be_stale()):
+        cache.set(key, (version, stats), timeout=stats_ttl())
+    return stats
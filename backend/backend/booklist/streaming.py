@@ -0,0 +1,136 @@
+from contextvars import copy_context
+from itertools import islice
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+
+from .renderers import FastJSONRenderer, dumps
+
+
+STREAM_FORMATS = ('ndjson', 'json')
+
+
+class NDJSONRenderer(FastJSONRenderer):
+    """
+    Newline-delimited JSON, one list item per line
+
+    Lets clients ask for `Accept: application/x-ndjson`. Streamed lists are
+    written by streaming_response(); this renders everything else (errors,
+    single objects) as a single line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, list):
+            return b''.join(super(NDJSONRenderer, self).render(item) + b'\n' for item in data)
+        return super().render(data, accepted_media_type, renderer_context) + b'\n'
+
+
+# Renderers of the list views that can stream
+STREAMING_RENDERER_CLASSES = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+
+
+def stream_format(request):
+    """
+    Return the requested streaming format ('ndjson' or 'json') or None
+
+    Streaming is opt-in, with `?stream=ndjson|json` or `Accept: application/x-ndjson`.
+    """
+    requested = request.query_params.get('stream')
+    if requested is not None:
+        if requested not in STREAM_FORMATS:
+            raise ValidationError({"error": f"stream must be one of: {', '.join(STREAM_FORMATS)}"})
+        return requested
+
+    renderer = getattr(request, 'accepted_renderer', None)
+    if renderer is not None and renderer.format == 'ndjson':
+        return 'ndjson'
+    return None
+
+
+def model_serializer(serializer_class, context=None):
+    """
+    Chunk serializer for streaming_response() built on a DRF serializer class
+
+    One serializer is reused for every chunk: serializers hold reference
+    cycles, so one per chunk would keep each chunk's rows alive until a full GC.
+    Meant for models without file fields: a FieldFile references its
+    instance, so those rows would also wait for the GC. Stream such models
+    from values() rows instead, like BookRowSerializer.
+    """
+    context = context or {}
+    serializer = serializer_class(many=True, context=dict(context))
+
+    def serialize(chunk):
+        # List serializers cache per-list data (e.g. the user's marks) in the context
+        serializer.context.clear()
+        serializer.context.update(context)
+        return serializer.to_representation(chunk)
+
+    return serialize
+
+
+def _serialized_chunks(queryset, serialize, chunk_size):
+    """Serialize the queryset `chunk_size` rows at a time, yielding lists of rendered rows"""
+    rows = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield [dumps(item) for item in serialize(chunk)]
+        # Free this chunk before the next one is read
+        del chunk
+
+
+def _in_context(context, iterator):
+    """Advance `iterator` inside `context`"""
+    done = object()
+    while True:
+        item = context.run(next, iterator, done)
+        if item is done:
+            return
+        yield item
+
+
+def _ndjson(chunks):
+    for chunk in chunks:
+        yield b''.join(row + b'\n' for row in chunk)
+        del chunk
+
+
+def _json_array(chunks):
+    # Same bytes as rendering the whole list with FastJSONRenderer
+    yield b'['
+    separator = b''
+    for chunk in chunks:
+        yield separator + b','.join(chunk)
+        del chunk
+        separator = b','
+    yield b']'
+
+
+def streaming_response(queryset, serialize, stream):
+    """
+    Stream a serialized queryset as NDJSON or as a JSON array
+
+    `serialize` turns a list of rows into a list of dicts, e.g.
+    BookRowSerializer(request).serialize or model_serializer(UserSerializer).
+    Rows are fetched with `.iterator()` and serialized BOOK_STREAM_CHUNK_SIZE
+    at a time, so memory stays flat however large the table is, and the
+    response starts before the last row is read.
+    Django buffers sync iterators under ASGI, so only WSGI servers stream.
+
+    The body is read after the view and the middleware have returned, so it
+    runs in a copy of the view's context: its queries go to the database
+    the request's other reads went to (ReplicaRoutingMiddleware). They are
+    not part of the Server-Timing header or log line, which are already
+    written by then.
+    """
+    chunk_size = getattr(settings, 'BOOK_STREAM_CHUNK_SIZE', 500)
+    chunks = _in_context(copy_context(), _serialized_chunks(queryset, serialize, chunk_size))
+    if stream == 'ndjson':
+        return StreamingHttpResponse(_ndjson(chunks), content_type=NDJSONRenderer.media_type)
+    return StreamingHttpResponse(_json_array(chunks), content_type='application/json')
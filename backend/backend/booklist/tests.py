@@ -1,3 +1,1666 @@
-from django.test import TestCase
+import asyncio
+import base64
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.http import HttpResponse
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import AnonymousUser, User, update_last_login
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase, APITransactionTestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .apps import ensure_triggers
+from .authentication import TokenCache, get_user_version
+from .cache import response_cache
+from .counters import reconcile_counters
+from .covers import CoverCache, proxy_version
+from .db import retry_on_locked, snapshot_database
+from .isbn import normalize_isbn
+from .middleware import ServerTimingMiddleware
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer
+from .models import Book, UserBook
+from .routers import ReplicaRouter, start_routing, stop_routing
+from .rows import BookRowSerializer, book_rows
+from .search import drop_search_index, search_books
+from .serializer import BookSerializer, UserSerializer
+from .stats import compute_profile_stats
 
 # Create your tests here.
+
+
+class BookListQueryCountTests(APITestCase):
+    """
+    Book list endpoints must run a constant number of queries, whatever the
+    number of books. Larger datasets are covered by `manage.py benchmark_endpoints`.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user('reader', 'reader@example.com', 'password123')
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password123')
+
+    def add_books(self, count):
+        for i in range(count):
+            book = Book.objects.create(title=f'Book {i}', author=f'Author {i % 3}', description='', user=self.admin)
+            UserBook.objects.create(user=self.user, book=book, read=i % 2 == 0)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, url):
+        self.add_books(3)
+        few = self.count_queries(url)
+        self.add_books(20)
+        self.assertEqual(self.count_queries(url), few)
+
+    def test_book_list(self):
+        self.client.force_authenticate(self.user)
+        self.assertConstantQueries('/api/books/')
+
+    def test_book_list_page(self):
+        self.client.force_authenticate(self.user)
+        self.assertConstantQueries('/api/books/?page_size=50')
+
+    def test_book_list_marked_by_me(self):
+        self.client.force_authenticate(self.user)
+        self.assertConstantQueries('/api/books/?marked=read')
+
+    def test_book_search(self):
+        self.client.force_authenticate(self.user)
+        self.assertConstantQueries('/api/books/search/?q=book')
+
+    def test_admin_book_list(self):
+        self.client.force_authenticate(self.admin)
+        self.assertConstantQueries('/api/admin/books/')
+
+    def test_book_list_stream(self):
+        self.client.force_authenticate(self.user)
+        self.assertConstantQueries('/api/books/?stream=ndjson')
+
+    def test_async_book_list(self):
+        # Async views authenticate on their own, force_authenticate does not apply
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        # The first request caches the token (see CachedJWTAuthenticationTests)
+        self.client.get('/api/async/profile/')
+        self.assertConstantQueries('/api/async/books/?page_size=50')
+
+
+class KeysetPaginationTests(APITestCase):
+    """Cursor pages walk the whole list exactly once, ties included, and reject bad cursors"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('reader', 'reader@example.com', 'password123')
+        authors = ['Austen', 'Borges', 'Austen', 'Calvino', 'Austen', 'Borges', 'Austen']
+        self.books = [
+            Book.objects.create(title=f'Book {i}', author=author, description='', user=self.user)
+            for i, author in enumerate(authors)
+        ]
+
+    def walk(self, url):
+        ids = []
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            data = response.json()
+            ids += [book['id'] for book in data['results']]
+            url = data['next']
+            pages += 1
+        return ids, pages
+
+    def cursor(self, position):
+        return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+
+    def test_pages_across_equal_authors(self):
+        expected = [book.pk for book in sorted(self.books, key=lambda book: (book.author, book.pk))]
+        for url in ('/api/books/?page_size=2', '/api/async/books/?page_size=2'):
+            self.assertEqual(self.walk(url), (expected, 4))
+
+        # Every book ties on read_count, the id breaks the tie
+        ids, pages = self.walk('/api/books/?page_size=3&sort=popular')
+        self.assertEqual(ids, sorted(book.pk for book in self.books))
+        self.assertEqual(pages, 3)
+
+    def test_invalid_cursors(self):
+        cursors = [
+            'not-base64!',
+            'AAAA',
+            self.cursor({'author': 'Austen'}),
+            self.cursor(['Austen']),
+            self.cursor(['Austen', 'not an id']),
+            self.cursor(['Austen', None]),
+            self.cursor([['Austen'], 1]),
+        ]
+        for url in ('/api/books/', '/api/async/books/'):
+            for cursor in cursors:
+                response = self.client.get(f'{url}?cursor={cursor}')
+                self.assertEqual(response.status_code, 404, (url, cursor))
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get(f"/api/profile/books/?cursor={self.cursor(['yesterday', 1])}")
+        self.assertEqual(response.status_code, 404)
+
+
+class BookSearchTests(APITestCase):
+    """Full-text search matches prefixes, ranks title hits first and follows book edits"""
+
+    def setUp(self):
+        response_cache.clear()
+        self.user = User.objects.create_user('searcher', 'searcher@example.com', 'password123')
+        self.in_description = Book.objects.create(
+            title='Collected Essays', author='Various', description='On dragons and their hoards', user=self.user)
+        self.in_author = Book.objects.create(
+            title='Poems', author='Dragonetti', description='', user=self.user)
+        self.in_title = Book.objects.create(
+            title='The Dragon Reborn', author='Robert Jordan', description='', user=self.user)
+
+    def titles(self, query):
+        return [book.title for book in search_books(query, limit=10)]
+
+    def test_prefix_match_ranked_by_field(self):
+        self.assertEqual(self.titles('drag'), ['The Dragon Reborn', 'Poems', 'Collected Essays'])
+        self.assertEqual(self.titles('DRAGON reb'), ['The Dragon Reborn'])
+        self.assertEqual(self.titles('ragon'), [])
+        # FTS5 syntax in the query is treated as plain words
+        self.assertEqual(self.titles('drag* OR "poems'), [])
+
+        response = self.client.get('/api/books/search/?q=drag&page_size=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([book['title'] for book in response.json()['results']], ['The Dragon Reborn', 'Poems'])
+        response = self.client.get(response.json()['next'])
+        self.assertEqual([book['title'] for book in response.json()['results']], ['Collected Essays'])
+        self.assertIsNone(response.json()['next'])
+
+    def test_page_out_of_range(self):
+        response = self.client.get('/api/books/search/?q=drag&page=99999999999999999999')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'page is too large'})
+
+        response = self.client.get('/api/books/search/?q=drag&page=999999999&page_size=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'next': None, 'results': []})
+
+    def test_index_follows_edits_and_deletes(self):
+        self.in_title.title = 'The Eye of the World'
+        self.in_title.save()
+        self.assertEqual(self.titles('reborn'), [])
+        self.assertEqual(self.titles('eye world'), ['The Eye of the World'])
+
+        Book.objects.filter(pk=self.in_author.pk).update(author='Someone Else')
+        self.assertEqual(self.titles('dragonetti'), [])
+
+        self.in_description.delete()
+        self.assertEqual(self.titles('drag'), [])
+
+    def test_post_migrate_reinstalls_triggers(self):
+        # A table rebuild during migrate drops the triggers and the index
+        drop_search_index()
+        Book.objects.create(title='Dragonsong', author='Anne McCaffrey', description='', user=self.user)
+
+        ensure_triggers(using='default')
+        self.assertEqual(self.titles('dragons'), ['Dragonsong', 'Collected Essays'])
+
+        Book.objects.create(title='Dragonflight', author='Anne McCaffrey', description='', user=self.user)
+        self.assertIn('Dragonflight', self.titles('mccaffrey'))
+
+    def test_triggers_wait_for_the_latest_schema(self):
+        drop_search_index()
+        # Migrated backwards: the triggers would reference missing columns
+        with mock.patch('django.db.migrations.executor.MigrationExecutor.migration_plan', return_value=[object()]):
+            ensure_triggers(using='default')
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE name LIKE 'booklist_book_fts%'")
+            self.assertEqual(cursor.fetchall(), [])
+
+
+class BookFilterTests(APITestCase):
+    """The book list filters return exactly the matching books, sync and async"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'password123')
+        self.reader = User.objects.create_user('reader', 'reader@example.com', 'password123')
+        self.other = User.objects.create_user('other', 'other@example.com', 'password123')
+        rows = [
+            ('Ursula K. Le Guin', 'Fantasy', self.owner),
+            ('ursula k. le guin', 'Science Fiction', self.owner),
+            ('Italo Calvino', 'fantasy', self.reader),
+            ('Italo Calvino', None, self.owner),
+        ]
+        self.books = [
+            Book.objects.create(title=f'Book {i}', author=author, genre=genre, description='', user=user)
+            for i, (author, genre, user) in enumerate(rows)
+        ]
+        UserBook.objects.create(user=self.reader, book=self.books[0], read=True, bought=True)
+        UserBook.objects.create(user=self.reader, book=self.books[1], read=True)
+        UserBook.objects.create(user=self.reader, book=self.books[2], onBookshelf=True)
+        UserBook.objects.create(user=self.other, book=self.books[3], read=True, bought=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.reader).access_token}')
+
+    def titles(self, query, status_code=200):
+        results = []
+        for url in (f'/api/books/?{query}', f'/api/async/books/?{query}'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status_code, url)
+            if status_code == 200:
+                results.append(sorted(book['title'] for book in response.json()))
+        if status_code == 200:
+            self.assertEqual(results[0], results[1], query)
+            return results[0]
+
+    def test_author_and_genre_ignore_case(self):
+        self.assertEqual(self.titles('author=URSULA K. LE GUIN'), ['Book 0', 'Book 1'])
+        self.assertEqual(self.titles('author=%20italo%20calvino%20'), ['Book 2', 'Book 3'])
+        self.assertEqual(self.titles('author=Italo'), [])
+        self.assertEqual(self.titles('genre=FANTASY'), ['Book 0', 'Book 2'])
+        self.assertEqual(self.titles('genre=fantasy&author=italo calvino'), ['Book 2'])
+
+    def test_uploader(self):
+        self.assertEqual(self.titles(f'user={self.owner.pk}'), ['Book 0', 'Book 1', 'Book 3'])
+        self.assertEqual(self.titles(f'user={self.other.pk}'), [])
+        self.titles('user=owner', status_code=400)
+
+    def test_marked(self):
+        self.assertEqual(self.titles('marked=any'), ['Book 0', 'Book 1', 'Book 2'])
+        self.assertEqual(self.titles('marked=read'), ['Book 0', 'Book 1'])
+        # All flags on the same mark, and only the current user's marks
+        self.assertEqual(self.titles('marked=read,bought'), ['Book 0'])
+        self.assertEqual(self.titles('marked=onBookshelf'), ['Book 2'])
+        self.assertEqual(self.titles(f'marked=read&user={self.owner.pk}&genre=science fiction'), ['Book 1'])
+
+        self.titles('marked=liked', status_code=400)
+        self.titles('marked=read,liked', status_code=400)
+        self.client.credentials()
+        self.titles('marked=read', status_code=401)
+
+
+@override_settings(BOOK_RESPONSE_CACHE_TTL=0)
+class ResponseCacheTests(APITestCase):
+    """Anonymous book responses are served from the cache until a Book or User changes"""
+
+    def setUp(self):
+        cache.clear()
+        response_cache.clear()
+        self.addCleanup(response_cache.clear)
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'password123')
+        self.book = Book.objects.create(title='Dune', author='Frank Herbert', description='d', user=self.owner)
+
+    def get(self, url, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, **headers)
+        return response, len(queries)
+
+    def test_etag_and_not_modified(self):
+        for url in ('/api/books/', f'/api/books/{self.book.pk}/', '/api/async/books/'):
+            first, queries = self.get(url)
+            self.assertGreater(queries, 0, url)
+            self.assertEqual(first['Cache-Control'], 'no-cache')
+
+            second, queries = self.get(url)
+            self.assertEqual(queries, 0, url)
+            self.assertEqual(second.content, first.content)
+            self.assertEqual(second['ETag'], first['ETag'])
+
+            not_modified, queries = self.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(not_modified.status_code, 304, url)
+            self.assertEqual(queries, 0, url)
+            self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH='"stale"')[0].status_code, 200)
+
+    def test_book_and_user_changes_invalidate(self):
+        first, _ = self.get('/api/books/')
+
+        self.book.title = 'Dune Messiah'
+        self.book.save()
+        response, queries = self.get('/api/books/')
+        self.assertGreater(queries, 0)
+        self.assertEqual(response.json()[0]['title'], 'Dune Messiah')
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(self.get('/api/books/', HTTP_IF_NONE_MATCH=first['ETag'])[0].status_code, 200)
+
+        # Book payloads embed the owner
+        self.owner.first_name = 'Frank'
+        self.owner.save()
+        self.assertEqual(self.get('/api/books/')[0].json()[0]['user']['first_name'], 'Frank')
+
+        Book.objects.get(pk=self.book.pk).delete()
+        self.assertEqual(self.get('/api/books/')[0].json(), [])
+
+    def test_owner_changes_outside_book_payloads_keep_the_cache(self):
+        self.get('/api/books/')
+        # Session logins save last_login, changing the password saves the hash
+        update_last_login(None, self.owner)
+        self.owner.set_password('password456')
+        self.owner.save()
+        User.objects.create_user('newcomer', 'new@example.com', 'password123')
+        self.assertEqual(self.get('/api/books/')[1], 0)
+
+        # Loaded with the embedded fields deferred, then changed
+        owner = User.objects.only('id').get(pk=self.owner.pk)
+        owner.last_name = 'Herbert'
+        owner.save(update_fields=['last_name'])
+        response, queries = self.get('/api/books/')
+        self.assertGreater(queries, 0)
+        self.assertEqual(response.json()[0]['user']['last_name'], 'Herbert')
+
+        User.objects.get(pk=self.owner.pk).delete()
+        self.assertEqual(self.get('/api/books/')[0].json(), [])
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'books.example.com'])
+    def test_keyed_on_host_and_scheme(self):
+        Book.objects.filter(pk=self.book.pk).update(cover='covers/dune.jpg')
+        response_cache.clear()
+        url = f'/api/books/{self.book.pk}/'
+
+        plain = self.get(url)[0].json()['cover']
+        self.assertTrue(plain.startswith('http://testserver/'))
+        for headers, origin in (
+            ({'HTTP_HOST': 'books.example.com'}, 'http://books.example.com/'),
+            ({'secure': True}, 'https://testserver/'),
+        ):
+            response, queries = self.get(url, **headers)
+            self.assertGreater(queries, 0, origin)
+            self.assertTrue(response.json()['cover'].startswith(origin), response.json()['cover'])
+        self.assertEqual(self.get(url)[0].json()['cover'], plain)
+
+    def test_authenticated_requests_are_not_cached(self):
+        self.get('/api/books/')
+        token = f'Bearer {RefreshToken.for_user(self.owner).access_token}'
+        response, queries = self.get('/api/books/', HTTP_AUTHORIZATION=token)
+        self.assertGreater(queries, 0)
+        self.assertNotIn('ETag', response)
+
+
+@override_settings(BOOK_DB_WRITE_RETRIES=2, BOOK_DB_RETRY_DELAY=0)
+class RetryOnLockedTests(APITestCase):
+    """Writes that find SQLite locked are retried a bounded number of times"""
+
+    def failing(self, *errors):
+        calls = []
+
+        @retry_on_locked
+        def write():
+            calls.append(1)
+            if len(calls) <= len(errors):
+                raise errors[len(calls) - 1]
+            return 'done'
+        return write, calls
+
+    def test_retries_locked_errors(self):
+        write, calls = self.failing(OperationalError('database is locked'), OperationalError('database is locked'))
+        # APITestCase wraps each test in a transaction
+        with mock.patch.object(connection, 'in_atomic_block', False):
+            self.assertEqual(write(), 'done')
+        self.assertEqual(len(calls), 3)
+
+    def test_gives_up(self):
+        write, calls = self.failing(*[OperationalError('database is locked')] * 3)
+        with mock.patch.object(connection, 'in_atomic_block', False), self.assertRaises(OperationalError):
+            write()
+        self.assertEqual(len(calls), 3)
+
+    def test_other_errors_and_transactions_are_not_retried(self):
+        write, calls = self.failing(OperationalError('no such table: x'))
+        with mock.patch.object(connection, 'in_atomic_block', False), self.assertRaises(OperationalError):
+            write()
+        self.assertEqual(len(calls), 1)
+
+        write, calls = self.failing(OperationalError('database is locked'))
+        with self.assertRaises(OperationalError):
+            write()
+        self.assertEqual(len(calls), 1)
+
+
+@override_settings(BOOK_READ_REPLICAS=['replica'])
+class ReplicaRoutingTests(APITransactionTestCase):
+    """Safe requests read from the replica, except for clients that just wrote"""
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        # The replica is a snapshot file of the (committed) test database
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'replica.sqlite3')
+        self.mirror = connections['replica']
+        primary = connections['default']
+        connections['replica'] = primary.__class__({**primary.settings_dict, 'NAME': self.path}, alias='replica')
+        cache.clear()
+
+        self.user = User.objects.create_user('reader', 'reader@example.com', 'password123')
+        self.other = User.objects.create_user('other', 'other@example.com', 'password123')
+        self.book = Book.objects.create(title='Dune', author='Frank Herbert', description='', user=self.other)
+        self.token = f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        self.other_token = f'Bearer {RefreshToken.for_user(self.other).access_token}'
+        snapshot_database(self.path)
+
+    def tearDown(self):
+        connections['replica'].close()
+        connections['replica'] = self.mirror
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def get(self, url, token=None):
+        headers = {'HTTP_AUTHORIZATION': token} if token else {}
+        with CaptureQueriesContext(connections['default']) as primary, CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(primary), len(replica)
+
+    def test_safe_requests_read_from_replica(self):
+        Book.objects.create(title='Emma', author='Jane Austen', description='', user=self.other)
+        data, primary, replica = self.get('/api/books/')
+        self.assertEqual([book['title'] for book in data], ['Dune'])
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+        # The stale page wasn't cached under the new catalog version
+        snapshot_database(self.path)
+        self.assertEqual(len(self.get('/api/books/')[0]), 2)
+        self.assertEqual(len(self.get('/api/async/books/')[0]), 2)
+
+    def test_streamed_rows_read_from_replica(self):
+        Book.objects.create(title='Emma', author='Jane Austen', description='', user=self.other)
+        for token in (None, self.token):
+            headers = {'HTTP_AUTHORIZATION': token} if token else {}
+            # The body is read after the middleware has reset the routing
+            response = self.client.get('/api/books/?stream=ndjson', **headers)
+            with CaptureQueriesContext(connections['default']) as primary, \
+                    CaptureQueriesContext(connections['replica']) as replica:
+                rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+            self.assertEqual([row['title'] for row in rows], ['Dune'])
+            self.assertEqual(len(primary), 0)
+            self.assertGreater(len(replica), 0)
+
+    def test_writers_read_their_writes(self):
+        response = self.client.post(
+            f'/api/books/{self.book.pk}/mark/', {'read': True}, format='json', HTTP_AUTHORIZATION=self.token,
+        )
+        self.assertEqual(response.status_code, 201)
+
+        for url in ('/api/books/', '/api/async/books/'):
+            data, primary, replica = self.get(url, self.token)
+            self.assertTrue(data[0]['user_mark']['read'])
+            self.assertEqual(replica, 0)
+
+        # Other clients keep reading from the replica, only their user comes from the primary
+        data, primary, replica = self.get('/api/books/', self.other_token)
+        self.assertEqual(primary, 1)
+        self.assertGreater(replica, 0)
+
+    def test_deactivated_users_are_rejected(self):
+        for url in ('/api/profile/', '/api/async/profile/'):
+            self.get(url, self.token)
+        # The replica still has the active row
+        self.user.is_active = False
+        self.user.save()
+
+        for url in ('/api/profile/', '/api/async/profile/'):
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION=self.token).status_code, 401)
+        snapshot_database(self.path)
+        for url in ('/api/profile/', '/api/async/profile/'):
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION=self.token).status_code, 401)
+
+    def test_router(self):
+        router = ReplicaRouter()
+        factory = APIRequestFactory()
+        token = start_routing(factory.get('/api/books/'))
+        try:
+            self.assertEqual(router.db_for_read(Book), 'replica')
+            book = Book.objects.get(pk=self.book.pk)
+            self.assertEqual(book._state.db, 'replica')
+            self.assertEqual(router.db_for_write(Book, instance=book), 'default')
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Book), 'default')
+        finally:
+            stop_routing(token)
+        self.assertEqual(router.db_for_read(Book), 'default')
+
+        token = start_routing(factory.post('/api/books/'))
+        try:
+            self.assertEqual(router.db_for_read(Book), 'default')
+        finally:
+            stop_routing(token)
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    """Repeated requests with the same token skip the user query until the user changes"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('reader', 'reader@example.com', 'password123')
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password123')
+        self.token = f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        admin_token = f'Bearer {RefreshToken.for_user(self.admin).access_token}'
+        self.admin_headers = {'HTTP_AUTHORIZATION': admin_token}
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_AUTHORIZATION=self.token)
+        return response, [query['sql'] for query in queries if 'auth_user' in query['sql']]
+
+    def test_cached_user(self):
+        for url in ('/api/profile/', '/api/async/profile/'):
+            self.get('/api/profile/')
+            response, user_queries = self.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['username'], 'reader')
+            self.assertEqual(user_queries, [])
+
+    def test_user_changes_invalidate(self):
+        self.get('/api/profile/')
+        url = f'/api/admin/users/{self.user.pk}/'
+        self.client.patch(url, {'first_name': 'Réka'}, format='json', **self.admin_headers)
+        response, user_queries = self.get('/api/async/profile/')
+        self.assertEqual(response.json()['first_name'], 'Réka')
+        self.assertEqual(len(user_queries), 1)
+
+        self.client.patch(url, {'is_active': False}, format='json', **self.admin_headers)
+        for url in ('/api/profile/', '/api/async/profile/'):
+            self.assertEqual(self.get(url)[0].status_code, 401)
+
+    def test_bounds(self):
+        tokens = [RefreshToken.for_user(self.user).access_token for _ in range(2)]
+        expired = TokenCache(max_entries=10, ttl=0)
+        expired.set(b'a', tokens[0], self.user, get_user_version(self.user.pk))
+        self.assertIsNone(expired.get(b'a'))
+
+        small = TokenCache(max_entries=1, ttl=60)
+        small.set(b'a', tokens[0], self.user, get_user_version(self.user.pk))
+        small.set(b'b', tokens[1], self.user, get_user_version(self.user.pk))
+        self.assertIsNone(small.get(b'a'))
+        self.assertEqual(small.get(b'b')[0], self.user)
+
+    def test_own_changes_are_not_shared(self):
+        # Each request gets its own copy of the cached user
+        self.get('/api/profile/')
+        self.client.patch('/api/profile/', {'first_name': 'Anna'}, format='json', HTTP_AUTHORIZATION=self.token)
+        self.assertEqual(self.get('/api/profile/')[0].json()['first_name'], 'Anna')
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Anna')
+
+
+@override_settings(BOOK_COVER_PROXY_HOSTS=['covers.example.com'])
+class BookRowSerializerTests(APITestCase):
+    """The values() fast path must render exactly what BookSerializer renders"""
+
+    def setUp(self):
+        self.reader = User.objects.create_user('reader', 'reader@example.com', 'password123', first_name='Réka')
+        owner = User.objects.create_user('owner', '', 'password123', is_staff=True)
+        books = [
+            Book.objects.create(
+                title='Egri csillagok', author='Gárdonyi Géza', description='Line one\nline "two" \u2028',
+                isbn='9789634150496', genre='Történelmi', user=owner,
+                coverUrl='https://covers.example.com/b/isbn/9789634150496-L.jpg',
+            ),
+            Book.objects.create(
+                title='No extras', author='Anon', description='', isbn=None, genre=None, user=self.reader,
+                coverUrl='https://elsewhere.example.com/cover.jpg',
+            ),
+            Book.objects.create(title='Uploaded', author='Anon', description='d', user=owner, cover='images/cover.jpg'),
+            Book.objects.create(title='Rendered', author='Zed', description='d', user=owner, cover='images/new.jpg'),
+        ]
+        Book.objects.filter(pk=books[3].pk).update(cover_renditions={
+            'source': 'images/new.jpg',
+            'sizes': {'card': {'webp': 'images/renditions/new-card.webp', 'jpeg': 'images/renditions/new-card.jpg'}},
+        })
+        UserBook.objects.create(user=self.reader, book=books[0], read=True)
+        UserBook.objects.create(user=self.reader, book=books[3], bought=True, onBookshelf=True)
+
+    def request(self, user=None):
+        request = Request(APIRequestFactory().get('/api/books/'))
+        request.user = user or AnonymousUser()
+        return request
+
+    def assertSameBytes(self, request):
+        queryset = Book.objects.order_by('author', 'id')
+        context = {'request': request} if request is not None else {}
+        expected = JSONRenderer().render(BookSerializer(queryset.select_related('user'), many=True, context=context).data)
+        actual = JSONRenderer().render(BookRowSerializer(request).serialize(list(book_rows(queryset))))
+        self.assertEqual(actual, expected)
+
+    def test_authenticated(self):
+        self.assertSameBytes(self.request(self.reader))
+
+    def test_anonymous(self):
+        self.assertSameBytes(self.request())
+
+    def test_without_request(self):
+        self.assertSameBytes(None)
+
+    def test_book_list_endpoint(self):
+        self.client.force_authenticate(self.reader)
+        response = self.client.get('/api/books/?page_size=3')
+        self.assertEqual(len(response.json()['results']), 3)
+
+        expected = BookSerializer(
+            Book.objects.select_related('user').order_by('author', 'id')[:3], many=True,
+            context={'request': response.renderer_context['request']}
+        ).data
+        self.assertEqual(JSONRenderer().render(response.data['results']), JSONRenderer().render(expected))
+
+
+@override_settings(BOOK_EXCERPT_LENGTH=20)
+class SparseFieldsetTests(APITestCase):
+    """?fields= and ?view=compact trim the book list, down to the SQL"""
+
+    def setUp(self):
+        self.reader = User.objects.create_user('reader', 'reader@example.com', 'password123')
+        self.book = Book.objects.create(
+            title='Hosszú', author='Szerző', description='Egy nagyon hosszú leírás, ami nem fér ki a kártyára',
+            user=self.reader,
+        )
+        Book.objects.create(title='Rövid', author='Szerző', description='Rövid leírás', user=self.reader)
+        UserBook.objects.create(user=self.reader, book=self.book, read=True)
+        self.client.force_authenticate(self.reader)
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), ' '.join(query['sql'] for query in queries)
+
+    def test_fields(self):
+        data, sql = self.get('/api/books/?fields=title,id,user_mark')
+        self.assertEqual(list(data[0]), ['id', 'title', 'user_mark'])
+        self.assertEqual(data[0]['user_mark']['read'], True)
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn('auth_user', sql)
+
+    def test_compact_view(self):
+        data, sql = self.get('/api/books/?view=compact')
+        self.assertEqual(data[0]['description'], 'Egy nagyon hosszú…')
+        self.assertEqual(data[1]['description'], 'Rövid leírás')
+        self.assertEqual(data[0]['user'], self.reader.pk)
+        self.assertIn('SUBSTR', sql)
+        self.assertNotIn('auth_user', sql)
+
+        page, _ = self.get('/api/books/?view=compact&fields=id,description&page_size=1')
+        self.assertEqual(page['results'], [{'id': self.book.pk, 'description': 'Egy nagyon hosszú…'}])
+        following, _ = self.get(page['next'])
+        self.assertEqual(following['results'][0]['description'], 'Rövid leírás')
+
+    def test_async_and_stream_match(self):
+        # The async views only know JWT
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.reader).access_token}')
+        url = '/api/books/?view=compact&fields=id,title,description,user,user_mark'
+        expected = self.client.get(url).content
+        self.assertIn(b'"read":true', expected)
+        self.assertEqual(self.client.get(url.replace('/api/books/', '/api/async/books/')).content, expected)
+        self.assertEqual(b''.join(self.client.get(url + '&stream=json').streaming_content), expected)
+
+    def test_invalid_parameters(self):
+        for url in ('/api/books/?fields=title,secret', '/api/books/?fields=,', '/api/books/?view=tiny',
+                    '/api/async/books/?fields=secret'):
+            self.assertEqual(self.client.get(url).status_code, 400, url)
+
+
+class EngagementCounterTests(APITestCase):
+    """Per-book mark counters follow every mark change and back ?sort=popular"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', 'o@example.com', 'password123')
+        self.readers = [User.objects.create_user(f'reader{i}', f'r{i}@example.com', 'password123') for i in range(3)]
+        self.books = [
+            Book.objects.create(title=f'Book {i}', author=f'Author {i}', description='d', user=self.owner)
+            for i in range(4)
+        ]
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+    def counts(self, book):
+        book.refresh_from_db()
+        return book.read_count, book.bought_count, book.shelved_count
+
+    def test_mark_changes(self):
+        book = self.books[0]
+        url = f'/api/books/{book.pk}/mark/'
+        self.authenticate(self.readers[0])
+        self.client.post(url, {'read': True, 'bought': True}, format='json')
+        self.assertEqual(self.counts(book), (1, 1, 0))
+        self.client.patch(url, {'bought': False, 'onBookshelf': True}, format='json')
+        self.assertEqual(self.counts(book), (1, 0, 1))
+        self.client.post(url, {'read': True}, format='json')
+        self.assertEqual(self.counts(book), (1, 0, 1))
+
+        self.authenticate(self.readers[1])
+        self.client.post(url, {'read': True}, format='json')
+        self.assertEqual(self.counts(book), (2, 0, 1))
+        self.client.delete(url)
+        self.assertEqual(self.counts(book), (1, 0, 1))
+
+        response = self.client.get(f'/api/books/{book.pk}/')
+        self.assertEqual(response.json()['engagement'], {'read': 1, 'bought': 0, 'onBookshelf': 1})
+
+        # Cascading deletes of marks count too
+        self.readers[0].delete()
+        self.assertEqual(self.counts(book), (0, 0, 0))
+
+    def test_saving_a_book_keeps_newer_counts(self):
+        book = Book.objects.get(pk=self.books[0].pk)
+        UserBook.objects.create(user=self.readers[0], book=self.books[0], read=True, bought=True)
+
+        book.title = 'Renamed'
+        book.save()
+        self.assertEqual(self.counts(book), (1, 1, 0))
+        self.assertEqual(book.title, 'Renamed')
+
+        # Same through the API, with a mark landing while the request runs
+        self.authenticate(self.owner)
+        save = Book.save
+
+        def save_after_mark(instance, *args, **kwargs):
+            UserBook.objects.create(user=self.readers[1], book=instance, read=True)
+            save(instance, *args, **kwargs)
+
+        with mock.patch.object(Book, 'save', save_after_mark):
+            response = self.client.patch(f'/api/books/{book.pk}/', {'genre': 'Drama'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.counts(book), (2, 1, 0))
+
+    def test_bulk_marks(self):
+        self.authenticate(self.readers[0])
+        items = [{'book': book.pk, 'read': True} for book in self.books[:3]]
+        self.client.post('/api/books/marks/bulk/', items, format='json')
+        items = [
+            {'book': self.books[0].pk, 'delete': True},
+            {'book': self.books[1].pk, 'bought': True},
+            {'book': self.books[3].pk, 'onBookshelf': True},
+        ]
+        self.client.post('/api/books/marks/bulk/', items, format='json')
+        self.assertEqual(
+            [self.counts(book) for book in self.books],
+            [(0, 0, 0), (1, 1, 0), (1, 0, 0), (0, 0, 1)],
+        )
+
+    def test_reconcile(self):
+        for reader in self.readers:
+            UserBook.objects.create(user=reader, book=self.books[1], read=True)
+        Book.objects.filter(pk=self.books[1].pk).update(read_count=7)
+        Book.objects.filter(pk=self.books[2].pk).update(shelved_count=2)
+
+        self.assertEqual(reconcile_counters(batch_size=2), 2)
+        self.assertEqual([self.counts(book) for book in self.books], [(0, 0, 0), (3, 0, 0), (0, 0, 0), (0, 0, 0)])
+        self.assertEqual(reconcile_counters(), 0)
+
+    def test_popular_sort(self):
+        for book, readers in zip(self.books, (1, 3, 0, 2)):
+            for reader in self.readers[:readers]:
+                UserBook.objects.create(user=reader, book=book, read=True)
+        expected = [self.books[i].pk for i in (1, 3, 0, 2)]
+
+        for base in ('/api/books/', '/api/async/books/'):
+            response = self.client.get(f'{base}?sort=popular&fields=id')
+            self.assertEqual([book['id'] for book in response.json()], expected)
+
+            ids = []
+            url = f'{base}?sort=popular&fields=id&page_size=1'
+            while url:
+                data = self.client.get(url).json()
+                ids += [book['id'] for book in data['results']]
+                url = data['next']
+            self.assertEqual(ids, expected)
+
+        self.assertEqual(self.client.get('/api/books/?sort=title').status_code, 400)
+
+
+class BookMarkTests(APITestCase):
+    """The single mark endpoint creates, updates and removes one user's mark"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('marker', 'marker@example.com', 'password123')
+        self.other = User.objects.create_user('other', 'other@example.com', 'password123')
+        self.book = Book.objects.create(title='Marked', author='Author', description='', user=self.other)
+        self.url = f'/api/books/{self.book.pk}/mark/'
+        self.client.force_authenticate(self.user)
+
+    def mark(self, user=None):
+        return UserBook.objects.get(user=user or self.user, book=self.book)
+
+    def test_post_creates_then_updates(self):
+        response = self.client.post(self.url, {'read': True}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'bought': False, 'read': True, 'onBookshelf': False})
+
+        response = self.client.post(self.url, {'bought': 'true'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        # Flags left out of the request keep their value
+        self.assertEqual(response.json(), {'bought': True, 'read': True, 'onBookshelf': False})
+        mark = self.mark()
+        self.assertEqual((mark.bought, mark.read, mark.onBookshelf), (True, True, False))
+        self.assertEqual(UserBook.objects.count(), 1)
+
+    def test_patch_changes_only_the_given_flags(self):
+        UserBook.objects.create(user=self.user, book=self.book, bought=True, read=True)
+        UserBook.objects.create(user=self.other, book=self.book, read=True)
+
+        response = self.client.patch(self.url, {'read': False, 'onBookshelf': 1}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'bought': True, 'read': False, 'onBookshelf': True})
+        self.assertEqual(self.client.patch(self.url, {}, format='json').json(), response.json())
+        self.assertTrue(self.mark(self.other).read)
+
+    def test_delete(self):
+        UserBook.objects.create(user=self.user, book=self.book, read=True)
+        UserBook.objects.create(user=self.other, book=self.book, read=True)
+
+        self.assertEqual(self.client.delete(self.url).status_code, 204)
+        self.assertFalse(UserBook.objects.filter(user=self.user).exists())
+        self.assertTrue(UserBook.objects.filter(user=self.other).exists())
+
+        response = self.client.delete(self.url)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'error': 'Mark not found'})
+
+    def test_missing_book_or_mark(self):
+        missing = f'/api/books/{self.book.pk + 100}/mark/'
+        for method in ('post', 'patch', 'delete'):
+            response = getattr(self.client, method)(missing, {'read': True}, format='json')
+            self.assertEqual(response.status_code, 404, method)
+            self.assertEqual(response.json(), {'error': 'Book not found'}, method)
+
+        response = self.client.patch(self.url, {'read': True}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'error': 'Mark not found. Use POST to create one.'})
+        self.assertFalse(UserBook.objects.exists())
+
+    def test_rejects_non_boolean_flags(self):
+        UserBook.objects.create(user=self.user, book=self.book, read=True)
+        for method in ('post', 'patch'):
+            for value in ('maybe', 2, None, [True]):
+                response = getattr(self.client, method)(self.url, {'read': value}, format='json')
+                self.assertEqual(response.status_code, 400, (method, value))
+                self.assertIn('read', response.json())
+        self.assertTrue(self.mark().read)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.post(self.url, {'read': True}, format='json').status_code, 401)
+        self.assertFalse(UserBook.objects.exists())
+
+
+class BulkMarkTests(APITestCase):
+    """/api/books/marks/bulk/ applies every valid item and reports each one"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('reader', 'reader@example.com', 'password123')
+        self.books = [
+            Book.objects.create(title=f'Book {i}', author='Author', description='d', user=self.user)
+            for i in range(5)
+        ]
+        UserBook.objects.create(user=self.user, book=self.books[1], read=True)
+        UserBook.objects.create(user=self.user, book=self.books[2], bought=True)
+        UserBook.objects.create(user=self.user, book=self.books[3], bought=True)
+        self.client.force_authenticate(self.user)
+
+    def post(self, items):
+        return self.client.post('/api/books/marks/bulk/', items, format='json')
+
+    def marks(self):
+        return {
+            mark.book_id: (mark.read, mark.bought, mark.onBookshelf)
+            for mark in UserBook.objects.filter(user=self.user)
+        }
+
+    def test_results(self):
+        missing = self.books[-1].pk + 100
+        response = self.post([
+            {'book': self.books[0].pk, 'read': True},
+            {'book': self.books[1].pk, 'bought': 'true'},
+            {'book': self.books[2].pk, 'delete': True},
+            {'book': self.books[4].pk, 'delete': True},
+            {'book': missing, 'read': True},
+            {'book': missing + 1, 'delete': True},
+            {'book': self.books[0].pk, 'bought': True},
+            {'book': 'one', 'read': True},
+            {'book': self.books[3].pk, 'read': 'maybe'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+
+        self.assertEqual([result['status'] for result in results], [
+            'created', 'updated', 'deleted', 'error', 'error', 'error', 'error', 'error', 'error',
+        ])
+        self.assertEqual(results[1]['mark'], {'bought': True, 'read': True, 'onBookshelf': False})
+        self.assertEqual(results[3]['error'], 'Mark not found')
+        self.assertEqual(results[4]['error'], 'Book not found')
+        self.assertEqual(results[5]['error'], 'Book not found')
+        self.assertEqual(results[6]['error'], 'Duplicate book in request')
+        self.assertEqual(results[7]['error'], 'book must be a book ID')
+        self.assertIn('read', results[8]['error'])
+
+        self.assertEqual(self.marks(), {
+            self.books[0].pk: (True, False, False),
+            self.books[1].pk: (True, True, False),
+            self.books[3].pk: (False, True, False),
+        })
+
+    def test_delete_must_be_true(self):
+        results = self.post([
+            {'book': self.books[1].pk, 'delete': 'false'},
+            {'book': self.books[2].pk, 'delete': 0},
+            {'book': self.books[3].pk, 'delete': 'maybe'},
+        ]).json()['results']
+        self.assertEqual([result['status'] for result in results], ['updated', 'updated', 'error'])
+        self.assertIn('delete', results[2]['error'])
+        self.assertEqual(len(self.marks()), 3)
+
+        results = self.post([{'book': self.books[1].pk, 'delete': 'true'}, {'book': self.books[2].pk, 'delete': 1}]).json()['results']
+        self.assertEqual([result['status'] for result in results], ['deleted', 'deleted'])
+        self.assertEqual(list(self.marks()), [self.books[3].pk])
+
+    @override_settings(BOOK_BULK_MARK_LIMIT=2)
+    def test_limits(self):
+        items = [{'book': book.pk, 'read': True} for book in self.books[:3]]
+        self.assertEqual(self.post(items).status_code, 400)
+        self.assertEqual(self.post(items[:2]).status_code, 200)
+        self.assertEqual(self.post({'book': self.books[0].pk}).status_code, 400)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.post(items[:1]).status_code, 401)
+
+
+class GenerateDatasetTests(APITestCase):
+    """generate_dataset creates the requested rows, the same ones for the same seed"""
+
+    def generate(self, *args):
+        out = io.StringIO()
+        call_command('generate_dataset', '--users', '20', '--books', '150', '--marks', '400', *args, stdout=out)
+        return out.getvalue()
+
+    def snapshot(self):
+        users = list(User.objects.order_by('username').values_list('username', 'first_name', 'last_name'))
+        books = list(Book.objects.order_by('isbn').values_list(
+            'isbn', 'title', 'author', 'genre', 'description', 'user__username'))
+        marks = list(UserBook.objects.order_by('user__username', 'book__isbn').values_list(
+            'user__username', 'book__isbn', 'bought', 'read', 'onBookshelf'))
+        return users, books, marks
+
+    def test_creates_the_requested_counts(self):
+        output = self.generate()
+        marks = UserBook.objects.count()
+        self.assertIn(f'Generated 20 users, 150 books and {marks} marks', output)
+        self.assertEqual(User.objects.filter(username__startswith='loadtest_').count(), 20)
+        self.assertEqual(Book.objects.count(), 150)
+        # Shelf sizes are rounded down and capped, so close to but not over --marks
+        self.assertLessEqual(marks, 400)
+        self.assertGreater(marks, 300)
+        self.assertFalse(Book.objects.filter(isbn_normalized=None).exists())
+
+        with self.assertRaises(CommandError):
+            self.generate()
+
+    def test_same_seed_same_dataset(self):
+        self.generate('--seed', '7')
+        first = self.snapshot()
+        self.generate('--seed', '7', '--clear')
+        self.assertEqual(self.snapshot(), first)
+        self.generate('--seed', '8', '--clear')
+        self.assertNotEqual(self.snapshot(), first)
+
+
+class ImportBooksTests(APITestCase):
+    """import_books dedupes on the normalized ISBN, whatever form the stored ISBN has"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('bookadmin', 'admin@example.com', 'password123')
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def run_import(self, name, content, *args):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        stdout = io.StringIO()
+        call_command('import_books', path, '--user', 'bookadmin', *args, stdout=stdout, stderr=io.StringIO())
+        return stdout.getvalue()
+
+    def test_normalize_isbn(self):
+        self.assertEqual(normalize_isbn('0-306-40615-2'), '9780306406157')
+        self.assertEqual(normalize_isbn('978-0-306-40615-7'), '9780306406157')
+        self.assertEqual(normalize_isbn('080442957x'), '9780804429573')
+        self.assertEqual(normalize_isbn('979 10 90636 07 1'), '9791090636071')
+        # Wrong check digits, prefix or length
+        self.assertIsNone(normalize_isbn('0-306-40615-3'))
+        self.assertIsNone(normalize_isbn('9780306406158'))
+        self.assertIsNone(normalize_isbn('1230306406155'))
+        self.assertIsNone(normalize_isbn('12345'))
+        self.assertIsNone(normalize_isbn(''))
+        # Only ASCII digits, other Unicode digits are not an ISBN
+        self.assertIsNone(normalize_isbn('123456789²'))
+        self.assertIsNone(normalize_isbn('٠٣٠٦٤٠٦١٥٢'))
+        self.assertIsNone(normalize_isbn('978030640615٧'))
+
+    def test_non_ascii_digits_are_rejected(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/api/books/', {
+            'title': 'Odd', 'author': 'A', 'description': 'd', 'isbn': '123456789²',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(Book.objects.get(title='Odd').isbn_normalized)
+
+        output = self.run_import('books.csv', 'title,author,description,isbn\nOdd,A,d,123456789²\nFine,A,d,,\n')
+        self.assertIn('1 created, 0 updated, 0 skipped, 1 invalid', output)
+
+    def test_import_update_and_skip(self):
+        # Created through the API, as typed
+        existing = Book.objects.create(
+            title='Old title', author='Author', description='', isbn='0-306-40615-2', user=self.user
+        )
+        self.assertEqual(existing.isbn_normalized, '9780306406157')
+
+        content = (
+            'title,author,description,isbn,genre,coverUrl\n'
+            'New title,Author,d,978-0-306-40615-7,Science,\n'
+            'Fresh,Writer,d,080442957X,,\n'
+            'Fresher,Writer,d,9780804429573,,\n'
+            'No ISBN,Writer,d,,,\n'
+            'Bad check digit,Writer,d,9780306406158,,\n'
+            'No author,,d,,,\n'
+        )
+        output = self.run_import('books.csv', content)
+        self.assertIn('2 created, 1 updated, 1 skipped, 2 invalid', output)
+
+        existing.refresh_from_db()
+        self.assertEqual((existing.title, existing.genre, existing.isbn), ('New title', 'Science', '0-306-40615-2'))
+        self.assertEqual(Book.objects.filter(isbn_normalized='9780306406157').count(), 1)
+        # The last row of a repeated ISBN wins
+        self.assertEqual(Book.objects.get(isbn='9780804429573').title, 'Fresher')
+
+        output = self.run_import('books.csv', content, '--on-duplicate', 'skip')
+        self.assertIn('1 created, 0 updated, 3 skipped, 2 invalid', output)
+        existing.refresh_from_db()
+        self.assertEqual(existing.title, 'New title')
+
+    def test_updates_invalidate_readers_stats(self):
+        cache.clear()
+        book = Book.objects.create(
+            title='Old', author='Author', description='', isbn='0-306-40615-2', genre='Horror', user=self.user
+        )
+        UserBook.objects.create(user=self.user, book=book, read=True)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get('/api/profile/stats/').json()['genres'], [{'genre': 'Horror', 'read': 1}])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_import('books.csv', 'title,author,description,isbn,genre\nOld,Author,d,9780306406157,Poetry\n')
+        self.assertEqual(client.get('/api/profile/stats/').json()['genres'], [{'genre': 'Poetry', 'read': 1}])
+
+    def test_jsonl(self):
+        content = '{"title": "One", "author": "A", "isbn": "0-306-40615-2"}\nnot json\n\n[1]\n'
+        output = self.run_import('books.jsonl', content)
+        self.assertIn('1 created, 0 updated, 0 skipped, 2 invalid', output)
+        self.assertEqual(Book.objects.get().isbn, '9780306406157')
+
+
+class ProfileBooksTests(APITestCase):
+    """/api/profile/books/ pages through the user's own marks in one query"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', 'o@example.com', 'password123')
+        self.reader = User.objects.create_user('reader', 'r@example.com', 'password123')
+        self.books = [
+            Book.objects.create(title=f'Book {i}', author=f'Author {i}', description='d', user=self.owner)
+            for i in range(5)
+        ]
+        self.uploaded = Book.objects.create(title='Mine', author='Me', description='d', user=self.reader)
+        now = datetime.now(timezone.utc)
+        for i, book in enumerate(self.books[:4]):
+            mark = UserBook.objects.create(user=self.reader, book=book, read=i % 2 == 0, bought=i == 3)
+            UserBook.objects.filter(pk=mark.pk).update(updated_at=now - timedelta(days=i))
+        UserBook.objects.create(user=self.owner, book=self.books[4], read=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.reader).access_token}')
+
+    def ids(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [book['id'] for book in response.json()['results']]
+
+    def test_marked_books(self):
+        self.client.get('/api/profile/')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/profile/books/')
+        self.assertEqual(len(queries), 1)
+
+        data = response.json()
+        self.assertEqual([book['id'] for book in data['results']], [book.pk for book in self.books[:4]])
+        self.assertIsNone(data['next'])
+        expected = BookSerializer(self.books[0], context={'request': response.wsgi_request}).data
+        self.assertEqual(data['results'][0]['user'], json.loads(JSONRenderer().render(expected['user'])))
+        self.assertEqual(data['results'][3]['user_mark'], {'bought': True, 'read': False, 'onBookshelf': False})
+
+        self.assertEqual(self.ids('/api/profile/books/?marked=read'), [self.books[0].pk, self.books[2].pk])
+        self.assertEqual(self.ids('/api/profile/books/?marked=read,bought'), [])
+
+    def test_pages(self):
+        ids = []
+        url = '/api/profile/books/?page_size=3'
+        while url:
+            data = self.client.get(url).json()
+            ids += [book['id'] for book in data['results']]
+            url = data['next']
+        self.assertEqual(ids, [book.pk for book in self.books[:4]])
+
+    def test_uploaded_books(self):
+        UserBook.objects.create(user=self.reader, book=self.uploaded, onBookshelf=True)
+        response = self.client.get('/api/profile/books/?uploaded=true')
+        self.assertEqual([book['id'] for book in response.json()['results']], [self.uploaded.pk])
+        self.assertTrue(response.json()['results'][0]['user_mark']['onBookshelf'])
+        self.assertEqual(self.ids('/api/profile/books/?uploaded=true&marked=read'), [])
+
+    def test_errors(self):
+        self.assertEqual(self.client.get('/api/profile/books/?marked=liked').status_code, 400)
+        self.assertEqual(self.client.get('/api/profile/books/?uploaded=maybe').status_code, 400)
+        self.client.credentials()
+        self.assertEqual(self.client.get('/api/profile/books/').status_code, 401)
+
+
+class ProfileStatsTests(APITestCase):
+    """/api/profile/stats/ is one aggregate query, then a cache hit until the marks change"""
+
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user('reader', 'r@example.com', 'password123')
+        genres = ['Fantasy', 'Fantasy', 'Horror', None, 'Horror']
+        self.books = [
+            Book.objects.create(title=f'Book {i}', author='A', description='d', genre=genre, user=self.reader)
+            for i, genre in enumerate(genres)
+        ]
+        months = [datetime(2026, 8, 3, tzinfo=timezone.utc), datetime(2026, 9, 20, tzinfo=timezone.utc)]
+        for i, book in enumerate(self.books[:4]):
+            mark = UserBook.objects.create(user=self.reader, book=book, read=i < 3, bought=i == 0, onBookshelf=i == 3)
+            UserBook.objects.filter(pk=mark.pk).update(updated_at=months[i % 2])
+        other = User.objects.create_user('other', 'x@example.com', 'password123')
+        UserBook.objects.create(user=other, book=self.books[4], read=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.reader).access_token}')
+
+    def test_stats(self):
+        self.client.get('/api/profile/')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/profile/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.json(), {
+            'totals': {'marked': 4, 'read': 3, 'bought': 1, 'onBookshelf': 1},
+            'genres': [{'genre': 'Fantasy', 'read': 2}, {'genre': 'Horror', 'read': 1}],
+            'months': [{'month': '2026-08', 'read': 2}, {'month': '2026-09', 'read': 1}],
+        })
+
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.client.get('/api/profile/stats/')
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(cached.json(), response.json())
+
+    def test_mark_changes_invalidate(self):
+        self.client.get('/api/profile/stats/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/books/{self.books[4].pk}/mark/', {'read': True}, format='json')
+        self.assertEqual(self.client.get('/api/profile/stats/').json()['totals']['read'], 4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/books/{self.books[0].pk}/mark/')
+        self.assertEqual(self.client.get('/api/profile/stats/').json()['totals']['bought'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/books/marks/bulk/', [{'book': self.books[1].pk, 'onBookshelf': True}], format='json')
+        self.assertEqual(self.client.get('/api/profile/stats/').json(), compute_profile_stats(self.reader.pk))
+
+    def test_book_changes_invalidate_their_readers(self):
+        other = APIClient()
+        other.force_authenticate(User.objects.get(username='other'))
+        self.client.get('/api/profile/stats/')
+        other.get('/api/profile/stats/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.books[2].genre = 'Fantasy'
+            self.books[2].save()
+            # A new book has no readers
+            Book.objects.create(title='New', author='A', description='d', genre='Horror', user=self.reader)
+        self.assertEqual(self.client.get('/api/profile/stats/').json()['genres'], [{'genre': 'Fantasy', 'read': 3}])
+        # Only the book's readers are invalidated
+        with CaptureQueriesContext(connection) as queries:
+            other.get('/api/profile/stats/')
+        self.assertEqual(len(queries), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.books[0].delete()
+        self.assertEqual(self.client.get('/api/profile/stats/').json()['totals'], {
+            'marked': 3, 'read': 2, 'bought': 0, 'onBookshelf': 1,
+        })
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.books[4].genre = 'Poetry'
+            self.books[4].save(update_fields=['genre'])
+        response = other.get('/api/profile/stats/')
+        self.assertEqual(response.json()['genres'], [{'genre': 'Poetry', 'read': 1}])
+
+    def test_requires_authentication(self):
+        self.client.credentials()
+        self.assertEqual(self.client.get('/api/profile/stats/').status_code, 401)
+
+
+class SideloadedUsersTests(APITestCase):
+    """?include=users lists each owner once instead of nesting it in every book"""
+
+    def setUp(self):
+        self.owners = [
+            User.objects.create_user('prolific', 'p@example.com', 'password123', first_name='Péter'),
+            User.objects.create_user('casual', 'c@example.com', 'password123'),
+        ]
+        for i in range(6):
+            Book.objects.create(title=f'Book {i}', author=f'Author {i}', description='d', user=self.owners[i % 5 == 0])
+        self.reader = User.objects.create_user('reader', 'r@example.com', 'password123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.reader).access_token}')
+
+    def test_users_listed_once(self):
+        full = self.client.get('/api/books/')
+        response = self.client.get('/api/books/?include=users')
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(len(response.content), len(full.content))
+
+        data = response.json()
+        self.assertEqual(set(data['users']), {str(owner.pk) for owner in self.owners})
+        for owner in self.owners:
+            self.assertEqual(data['users'][str(owner.pk)], json.loads(JSONRenderer().render(UserSerializer(owner).data)))
+        # Same books, with the owner replaced by its id
+        expected = full.json()
+        for book in expected:
+            book['user'] = book['user']['id']
+        self.assertEqual(data['results'], expected)
+
+    def test_paginated_and_async(self):
+        for url in ('/api/books/?include=users&page_size=4', '/api/books/?include=users&view=compact&fields=id,user'):
+            expected = self.client.get(url).json()
+            actual = self.client.get(url.replace('/api/books/', '/api/async/books/')).json()
+            if 'next' in expected:
+                # Links point at their own endpoint
+                self.assertEqual(actual.pop('next').replace('/async/', '/'), expected.pop('next'))
+            self.assertEqual(actual, expected)
+
+        page = self.client.get('/api/books/?include=users&page_size=4').json()
+        self.assertEqual(len(page['results']), 4)
+        self.assertEqual(set(page['users']), {str(book['user']) for book in page['results']})
+        self.assertIsNotNone(page['next'])
+
+    def test_invalid(self):
+        for url in ('/api/books/?include=owners', '/api/books/?include=users&stream=ndjson', '/api/async/books/?include=marks'):
+            self.assertEqual(self.client.get(url).status_code, 400, url)
+
+    def test_needs_the_user_field(self):
+        for url in ('/api/books/?include=users&fields=id,title', '/api/async/books/?include=users&fields=id,title&page_size=2'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 400, url)
+            self.assertEqual(response.json(), {'error': 'include=users needs the user field'})
+
+        data = self.client.get('/api/books/?include=users&fields=title,user').json()
+        self.assertEqual(set(data['users']), {str(owner.pk) for owner in self.owners})
+        self.assertEqual(set(data['results'][0]), {'title', 'user'})
+
+
+@override_settings(BOOK_SERVER_TIMING=True, BOOK_TIMING_LOG=False, BOOK_DUPLICATE_QUERY_THRESHOLD=5)
+class ServerTimingTests(APITestCase):
+    """ServerTimingMiddleware counts each request's own queries"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('reader', 'reader@example.com', 'password123')
+        self.books = [
+            Book.objects.create(title=f'Book {i}', author=f'Author {i}', description='d', user=self.user)
+            for i in range(3)
+        ]
+        self.token = f'Bearer {RefreshToken.for_user(self.user).access_token}'
+
+    def query_count(self, response):
+        return int(re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', response['Server-Timing']).group(1))
+
+    def test_header(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/books/?page_size=2', HTTP_AUTHORIZATION=self.token)
+        entries = [entry.split(';')[0] for entry in response['Server-Timing'].split(', ')]
+        self.assertEqual(entries, ['db', 'db-slowest', 'serialize', 'render', 'view'])
+        self.assertEqual(self.query_count(response), len(queries))
+        for name in entries:
+            duration = re.search(rf'(?:^|, ){name};dur=([\d.]+)', response['Server-Timing'])
+            self.assertGreaterEqual(float(duration.group(1)), 0, name)
+
+    @override_settings(BOOK_DUPLICATE_QUERY_THRESHOLD=3)
+    def test_duplicate_queries_are_flagged(self):
+        def n_plus_one(request):
+            titles = [Book.objects.get(pk=book.pk).title for book in Book.objects.order_by('pk')[:limit]]
+            return HttpResponse(', '.join(titles))
+
+        middleware = ServerTimingMiddleware(n_plus_one)
+        request = APIRequestFactory().get('/n-plus-one/')
+
+        limit = 2
+        with self.assertNoLogs('booklist.performance'):
+            response = middleware(request)
+        self.assertNotIn('db-duplicates', response['Server-Timing'])
+
+        # One template per book: the same query three times
+        limit = 3
+        with self.assertLogs('booklist.performance', 'WARNING') as logs:
+            response = middleware(request)
+        self.assertIn('db-duplicates;desc="1 repeated queries, worst 3x"', response['Server-Timing'])
+        self.assertEqual(self.query_count(response), 4)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], '/n-plus-one/')
+        self.assertEqual([entry['count'] for entry in record['duplicate_queries']], [3])
+        self.assertIn('WHERE "booklist_book"."id" = %s', record['duplicate_queries'][0]['sql'])
+
+    @override_settings(BOOK_SERVER_TIMING=False, BOOK_TIMING_LOG=True)
+    def test_log_line(self):
+        with self.assertLogs('booklist.performance', 'INFO') as logs, CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/books/?page_size=2', HTTP_AUTHORIZATION=self.token)
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(
+            (record['method'], record['path'], record['status'], record['queries']),
+            ('GET', '/api/books/', 200, len(queries))
+        )
+        self.assertEqual(
+            set(record),
+            {'method', 'path', 'status', 'queries', 'db_ms', 'db_slowest_ms', 'serialize_ms', 'render_ms', 'view_ms'}
+        )
+
+    @override_settings(BOOK_SERVER_TIMING=False)
+    def test_disabled(self):
+        with self.assertNoLogs('booklist.performance'):
+            response = self.client.get('/api/books/?page_size=2', HTTP_AUTHORIZATION=self.token)
+        self.assertNotIn('Server-Timing', response)
+
+    async def test_concurrent_async_requests(self):
+        urls = ['/api/async/books/?page_size=2', f'/api/async/books/{self.books[0].pk}/', '/api/async/profile/']
+        headers = {'Authorization': self.token}
+        await self.async_client.get(urls[0], headers=headers)
+        expected = [self.query_count(await self.async_client.get(url, headers=headers)) for url in urls]
+        self.assertEqual(expected, [2, 2, 0])
+
+        for _ in range(5):
+            responses = await asyncio.gather(*(self.async_client.get(url, headers=headers) for url in urls * 3))
+            self.assertEqual([self.query_count(response) for response in responses], expected * 3)
+
+
+@override_settings(BOOK_STREAM_CHUNK_SIZE=4)
+class StreamingListTests(APITestCase):
+    """Streamed lists hold the same rows as the regular responses"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password123')
+        for i in range(10):
+            book = Book.objects.create(title=f'Könyv {i}', author=f'Author {i % 3}', description='"quoted"', user=self.admin)
+            UserBook.objects.create(user=self.admin, book=book, read=i % 2 == 0)
+        self.client.force_authenticate(self.admin)
+
+    def get_stream(self, url, **headers):
+        response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_json_stream_matches_regular_response(self):
+        for url in ('/api/books/', '/api/admin/books/', '/api/admin/users/'):
+            regular = self.client.get(url).content
+            _, streamed = self.get_stream(f'{url}?stream=json')
+            self.assertEqual(streamed, regular)
+
+    def test_ndjson_stream(self):
+        response, body = self.get_stream('/api/books/', HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(rows, self.client.get('/api/books/').json())
+        self.assertEqual(sum(row['user_mark']['read'] for row in rows), 5)
+
+    def test_unknown_stream_format(self):
+        self.assertEqual(self.client.get('/api/books/?stream=xml').status_code, 400)
+
+
+class FastJSONTests(APITestCase):
+    """FastJSONRenderer/FastJSONParser are drop-in replacements of DRF's JSON renderer/parser"""
+
+    payload = {
+        'text': 'Árvíztűrő "tükörfúrógép"\n\u2028\u2029</script>',
+        'numbers': [0, -1, 2 ** 53, 1.5, Decimal('12.30'), True, False, None],
+        'when': datetime(2024, 5, 17, 8, 30, 15, 123456, tzinfo=timezone.utc),
+        'naive': datetime(2024, 5, 17, 8, 30),
+        'day': date(2024, 5, 17),
+        'duration': timedelta(hours=1, seconds=5),
+        'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'lazy': gettext_lazy('This field is required.'),
+        'nested': [{1: 'int key', 'empty': {}}, ()],
+    }
+
+    def test_same_bytes_as_json_renderer(self):
+        self.assertEqual(FastJSONRenderer().render(self.payload), JSONRenderer().render(self.payload))
+
+    def test_indent_and_stdlib_backend(self):
+        data = {'a': [1, 2]}
+        self.assertEqual(
+            FastJSONRenderer().render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2'),
+        )
+        with override_settings(BOOK_JSON_BACKEND='json'):
+            self.assertEqual(FastJSONRenderer().render(self.payload), JSONRenderer().render(self.payload))
+
+    def test_parser(self):
+        body = JSONRenderer().render({'title': 'Könyv \u2028', 'n': [1, 2.5, None]})
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(body)), {'title': 'Könyv \u2028', 'n': [1, 2.5, None]})
+
+    def test_api_uses_fast_json(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password123')
+        book = Book.objects.create(title='Könyv', author='Szerző', description='d', user=admin)
+        self.client.force_authenticate(admin)
+
+        response = self.client.get(f'/api/books/{book.pk}/')
+        self.assertIsInstance(response.accepted_renderer, FastJSONRenderer)
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+        url = f'/api/books/{book.pk}/mark/'
+        self.assertEqual(self.client.post(url, '{"read": true}', content_type='application/json').status_code, 201)
+        response = self.client.post(url, '{"read": NaN}', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('JSON parse error', response.json()['detail'])
+
+
+@override_settings(BOOK_THUMBNAIL_WORKERS=0)
+class CoverRenditionTests(APITestCase):
+    """Uploaded covers get resized, metadata-free WebP/JPEG renditions"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user('reader', 'reader@example.com', 'password123')
+        self.client.force_authenticate(self.user)
+
+    def upload(self, size=(1200, 1800)):
+        image = Image.new('RGB', size, (120, 40, 40))
+        exif = image.getexif()
+        exif[0x010f] = 'Camera maker'
+        content = io.BytesIO()
+        image.save(content, 'JPEG', exif=exif)
+        cover = SimpleUploadedFile('cover.jpg', content.getvalue(), content_type='image/jpeg')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/books/', {'title': 'Title', 'author': 'Author', 'description': 'Description', 'cover': cover},
+                format='multipart'
+            )
+        self.assertEqual(response.status_code, 201)
+        return Book.objects.get(pk=response.data['id'])
+
+    def test_renditions_are_generated(self):
+        book = self.upload()
+        sizes = book.cover_renditions['sizes']
+        self.assertEqual(set(sizes), {'card', 'detail', 'retina'})
+
+        with Image.open(os.path.join(self.media_root, sizes['card']['webp'])) as card:
+            self.assertEqual(card.format, 'WEBP')
+            self.assertEqual(card.size, (200, 300))
+        with Image.open(os.path.join(self.media_root, sizes['detail']['jpeg'])) as detail:
+            self.assertEqual(detail.size, (400, 600))
+            self.assertEqual(len(detail.getexif()), 0)
+
+        response = self.client.get(f'/api/books/{book.pk}/')
+        self.assertTrue(response.data['coverRenditions']['card']['webp'].endswith(sizes['card']['webp']))
+
+    def test_renditions_are_deleted_with_the_book(self):
+        book = self.upload()
+        card = os.path.join(self.media_root, book.cover_renditions['sizes']['card']['webp'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/books/{book.pk}/')
+        self.assertFalse(os.path.exists(card))
+
+
+class CoverOrigin:
+    """Local stand-in for a remote cover host, counting the requests it gets"""
+
+    def __init__(self, delay=0):
+        self.hits = 0
+        self.delay = delay
+        self.image = io.BytesIO()
+        Image.new('RGB', (60, 90), (10, 80, 160)).save(self.image, 'JPEG')
+        origin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                origin.hits += 1
+                time.sleep(origin.delay)
+                if self.path.startswith('/missing'):
+                    self.send_error(404)
+                    return
+                if self.path.startswith('/garbled'):
+                    self.wfile.write(b'NOT HTTP\r\n\r\n')
+                    return
+                body = origin.image.getvalue()
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/jpeg')
+                # The connection closes before the promised length
+                extra = 100 if self.path.startswith('/truncated') else 0
+                self.send_header('Content-Length', str(len(body) + extra))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, path):
+        return f'http://127.0.0.1:{self.server.server_port}{path}'
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@override_settings(BOOK_COVER_PROXY_HOSTS=['127.0.0.1'])
+class CoverProxyTests(APITestCase):
+    """The cover proxy fetches remote covers once and serves them from disk"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.cache = CoverCache(directory, max_bytes=1024 * 1024)
+        patcher = mock.patch('booklist.covers.cover_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.origin = CoverOrigin()
+        self.addCleanup(self.origin.close)
+        self.user = User.objects.create_user('reader', 'reader@example.com', 'password123')
+
+    def add_book(self, path='/cover.jpg'):
+        return Book.objects.create(
+            title='Title', author='Author', description='', user=self.user, coverUrl=self.origin.url(path)
+        )
+
+    def get_cover(self, book, query='', **headers):
+        response = self.client.get(f'/api/books/{book.pk}/cover/{query}', **headers)
+        if getattr(response, 'streaming', False):
+            response.body = b''.join(response.streaming_content)
+        return response
+
+    def test_cover_is_fetched_once(self):
+        book = self.add_book()
+        first = self.get_cover(book, f'?v={proxy_version(book.coverUrl)}')
+        second = self.get_cover(book)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first['Content-Type'], 'image/jpeg')
+        self.assertIn('immutable', first['Cache-Control'])
+        # Unversioned or outdated links may point at an old cover
+        self.assertEqual(second['Cache-Control'], 'public, max-age=300')
+        self.assertNotIn('immutable', self.get_cover(book, '?v=outdated')['Cache-Control'])
+        self.assertEqual(second.body, self.origin.image.getvalue())
+        self.assertEqual(self.origin.hits, 1)
+
+        not_modified = self.get_cover(book, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_concurrent_requests_share_one_fetch(self):
+        self.origin.delay = 0.2
+        url = self.origin.url('/cover.jpg')
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            covers = list(pool.map(lambda _: self.cache.get(url), range(8)))
+
+        self.assertEqual(self.origin.hits, 1)
+        self.assertEqual({cover.digest for cover in covers}, {covers[0].digest})
+
+    def test_least_recently_used_covers_are_evicted(self):
+        size = len(self.origin.image.getvalue())
+        self.cache.max_bytes = size * 2
+        first, second, third = (self.origin.url(f'/cover-{i}.jpg') for i in range(3))
+
+        self.cache.get(first)
+        self.cache.get(second)
+        os.utime(self.cache.get(first).path, (0, 0))
+        os.utime(self.cache.get(second).path, (1, 1))
+        self.cache.get(third)
+
+        self.assertEqual(self.origin.hits, 3)
+        self.cache.get(second)
+        self.assertEqual(self.origin.hits, 3)
+        self.cache.get(first)
+        self.assertEqual(self.origin.hits, 4)
+
+    def test_origin_errors(self):
+        for path in ('/missing.jpg', '/truncated.jpg', '/garbled.jpg'):
+            response = self.get_cover(self.add_book(path))
+            self.assertEqual(response.status_code, 502, path)
+
+    def test_other_hosts_are_not_served(self):
+        book = self.add_book()
+        book.coverUrl = 'https://example.com/cover.jpg'
+        book.save()
+        response = self.get_cover(book)
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('Location', response)
+        self.assertEqual(self.origin.hits, 0)
@@ -0,0 +1,166 @@
+import logging
+import multiprocessing
+import os
+import posixpath
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+
+from .cache import bump_catalog_version
+from .imaging import render_renditions
+from .models import Book
+
+
+logger = logging.getLogger(__name__)
+
+RENDITION_DIR = 'images/renditions'
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = None
+
+
+def rendition_sizes():
+    return getattr(settings, 'BOOK_COVER_RENDITIONS', {
+        'card': (200, 300),
+        'detail': (400, 600),
+        'retina': (800, 1200),
+    })
+
+
+def get_executor():
+    """
+    Return the shared thumbnail process pool, or None to render inline
+
+    The pool is created on first use with BOOK_THUMBNAIL_WORKERS processes.
+    At most BOOK_THUMBNAIL_QUEUE jobs wait for a worker, uploads beyond that
+    are skipped and left to `manage.py generate_cover_renditions`.
+    """
+    global _executor, _pending
+    workers = getattr(settings, 'BOOK_THUMBNAIL_WORKERS', 2)
+    if workers <= 0:
+        return None
+
+    with _executor_lock:
+        if _executor is None:
+            # Workers only need booklist.imaging, so spawn them clean
+            # instead of forking a process that holds DB connections
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pending = threading.BoundedSemaphore(workers + getattr(settings, 'BOOK_THUMBNAIL_QUEUE', 100))
+    return _executor
+
+
+def needs_renditions(book):
+    return bool(book.cover) and book.cover_renditions.get('source') != book.cover.name
+
+
+def schedule_renditions(book):
+    """
+    Generate the cover renditions of `book` once the transaction commits
+
+    Rendering happens in the process pool, so the request that saved the
+    book returns without waiting for it.
+    """
+    book_id, source = book.pk, book.cover.name
+    transaction.on_commit(lambda: _submit(book_id, source))
+
+
+def _job(source):
+    stem = os.path.splitext(posixpath.basename(source))[0]
+    return (
+        default_storage.path(source),
+        default_storage.path(RENDITION_DIR),
+        stem,
+        rendition_sizes(),
+        getattr(settings, 'BOOK_COVER_QUALITY', 80),
+    )
+
+
+def _submit(book_id, source):
+    executor = get_executor()
+    if executor is None:
+        render_book_cover(book_id, source)
+        return
+
+    if not _pending.acquire(blocking=False):
+        logger.warning('Thumbnail queue full, skipping cover renditions of book %s', book_id)
+        return
+    try:
+        future = executor.submit(render_renditions, *_job(source))
+    except Exception:
+        _pending.release()
+        raise
+    future.add_done_callback(lambda done: _finish(book_id, source, done))
+
+
+def _finish(book_id, source, future):
+    # Runs on the pool's management thread
+    _pending.release()
+    try:
+        _store(book_id, source, future.result())
+    except Exception:
+        logger.exception('Could not generate cover renditions of book %s', book_id)
+    finally:
+        close_old_connections()
+
+
+def render_book_cover(book_id, source):
+    """Render the renditions of one cover in this process and store them"""
+    _store(book_id, source, render_renditions(*_job(source)))
+
+
+def _store(book_id, source, renditions):
+    sizes = {
+        name: {key: posixpath.join(RENDITION_DIR, filename) for key, filename in files.items()}
+        for name, files in renditions.items()
+    }
+    old = Book.objects.filter(pk=book_id).values_list('cover_renditions', flat=True).first()
+
+    # The cover may have been replaced (or the book deleted) meanwhile
+    updated = Book.objects.filter(pk=book_id, cover=source).update(
+        cover_renditions={'source': source, 'sizes': sizes}
+    )
+    if not updated:
+        delete_rendition_files({'sizes': sizes})
+        return
+
+    bump_catalog_version()
+    if old:
+        delete_rendition_files(old, keep={'sizes': sizes})
+
+
+def _rendition_names(renditions):
+    return {name for files in renditions.get('sizes', {}).values() for name in files.values()}
+
+
+def delete_rendition_files(renditions, keep=None):
+    """Delete the files listed in a `cover_renditions` value"""
+    keep_names = _rendition_names(keep) if keep else set()
+    for name in _rendition_names(renditions) - keep_names:
+        default_storage.delete(name)
+
+
+def rendition_urls(book, request=None):
+    """
+    Map rendition name -> {'webp': url, 'jpeg': url} for the current cover
+
+    Returns None until the renditions of the current cover exist.
+    """
+    return cover_rendition_urls(book.cover.name if book.cover else None, book.cover_renditions, request)
+
+
+def cover_rendition_urls(cover, renditions, request=None):
+    """rendition_urls() from the raw `cover` and `cover_renditions` column values"""
+    if not cover or renditions.get('source') != cover:
+        return None
+
+    urls = {}
+    for name, files in renditions['sizes'].items():
+        urls[name] = {}
+        for key, path in files.items():
+            url = default_storage.url(path)
+            urls[name][key] = request.build_absolute_uri(url) if request is not None else url
+    return urls
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, async_views
 
 app_name = "booklist"
 urlpatterns = [
@@ -8,9 +8,19 @@ urlpatterns = [
     path('register/', views.register, name="register"),
     path('change-password/', views.change_password, name="change_password"),
     path('profile/', views.userProfile, name="userProfile"),
+    path('profile/books/', views.profileBooks, name="profileBooks"),
+    path('profile/stats/', views.profileStats, name="profileStats"),
     path('books/', views.bookList, name="bookList"),
+    path('books/search/', views.bookSearch, name="bookSearch"),
+    path('books/marks/bulk/', views.bookMarkBulk, name="bookMarkBulk"),
     path('books/<int:bookId>/', views.bookDetail, name="bookDetail"),
     path('books/<int:bookId>/mark/', views.bookMark, name="bookMark"),
+    path('books/<int:bookId>/cover/', views.bookCover, name="bookCover"),
+
+    # Native async read endpoints (best served through config/asgi.py)
+    path('async/profile/', async_views.userProfileAsync, name="userProfileAsync"),
+    path('async/books/', async_views.bookListAsync, name="bookListAsync"),
+    path('async/books/<int:bookId>/', async_views.bookDetailAsync, name="bookDetailAsync"),
 
     # Admin Endpoints (Superuser only)
     path('admin/users/', views.adminUserList, name="adminUserList"),
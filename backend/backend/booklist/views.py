@@ -1,14 +1,27 @@
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny, BasePermission
 from rest_framework import status
-from drf_spectacular.utils import extend_schema
+from rest_framework.exceptions import ValidationError
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from drf_spectacular.types import OpenApiTypes
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from django.conf import settings
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.utils.urls import replace_query_param
 
 from .models import Book, UserBook
 from .serializer import BookSerializer, UserSerializer, UserBookSerializer
+from .pagination import KeysetPagination
+from .filters import BOOK_ORDERINGS, book_ordering, filter_books, mark_flags
+from .search import search_books
+from .cache import cache_public_response
+from .covers import CoverFetchError, cover_response, is_proxied
+from .streaming import STREAMING_RENDERER_CLASSES, model_serializer, stream_format, streaming_response
+from .rows import BOOK_INCLUDES, BOOK_VIEWS, BookRowSerializer, book_rows, requested_fields, sideloaded_users
+from .marks import parse_mark_fields, upsert_mark, update_mark, delete_mark, apply_bulk_marks
+from .stats import profile_stats
 
 
 # Custom permission for superusers only
@@ -187,27 +200,69 @@ def change_password(request):
 
 
 # ============== BOOKS ==============
+@cache_public_response
 @extend_schema(
     request=BookSerializer,
     responses={
         200: BookSerializer(many=True),
         201: BookSerializer
     },
+    parameters=[
+        OpenApiParameter("cursor", str, description="Opaque cursor from the previous page's `next` link"),
+        OpenApiParameter("page_size", int, description="Number of books per page"),
+        OpenApiParameter("author", str, description="Case-insensitive author name"),
+        OpenApiParameter("genre", str, description="Case-insensitive genre"),
+        OpenApiParameter("user", int, description="Uploader's user ID"),
+        OpenApiParameter("marked", str, description="`any` or comma separated read/bought/onBookshelf marked by the current user"),
+        OpenApiParameter("sort", str, enum=list(BOOK_ORDERINGS), description="`author` (default) or `popular`: most read first"),
+        OpenApiParameter("stream", str, enum=["ndjson", "json"], description="Stream the unpaginated list as NDJSON or a JSON array (or send `Accept: application/x-ndjson`)"),
+        OpenApiParameter("fields", str, description="Comma separated book fields to return, e.g. `id,title,author,coverRenditions`"),
+        OpenApiParameter("view", str, enum=list(BOOK_VIEWS), description="`compact`: description excerpt and the owner's id instead of the owner object"),
+        OpenApiParameter("include", str, enum=list(BOOK_INCLUDES), description="`users`: books reference their owner by id, each owner is listed once in a top-level `users` map (needs `user` in `fields`, not with `stream`)"),
+    ],
     description="Get all books from all users (GET) or create a new book (POST - requires authentication)",
     tags=["Books"]
 )
 @api_view(["GET", "POST"])
 @permission_classes([AllowAny])  # GET is public, POST will check authentication manually
+@renderer_classes(STREAMING_RENDERER_CLASSES)
 def bookList(request):
     """
     GET: List all books from all users (public access)
+         Pass `page_size` and/or `cursor` to get keyset-paginated results
+         Filter with `author`, `genre`, `user` and `marked`, order with `sort=author|popular`
+         Pass `stream=ndjson|json` to stream the whole list
+         Pass `fields` and/or `view=compact` for smaller payloads
+         Pass `include=users` to side-load the owners: {"results": [...], "users": {id: user}}
     POST: Create a new book (requires authentication, user is automatically assigned)
     """
     if request.method == "GET":
         # Public access - return all books with user_mark for authenticated users
-        allBooks = Book.objects.all().order_by('author')
-        serialized = BookSerializer(allBooks, many=True, context={'request': request})
-        return Response(serialized.data, status=status.HTTP_200_OK)
+        # Read-only fast path, same output as BookSerializer (see rows.py)
+        fields, compact = requested_fields(request)
+        sideload = sideloaded_users(request, fields)
+        ordering = book_ordering(request)
+        serializer = BookRowSerializer(request, fields=fields, compact=compact, sideload_users=sideload)
+        allBooks = serializer.rows(filter_books(request, Book.objects.order_by(*ordering)))
+
+        paginator = KeysetPagination(ordering)
+        if paginator.is_requested(request):
+            page = paginator.paginate_queryset(allBooks, request)
+            response = paginator.get_paginated_response(serializer.serialize(page))
+            if sideload:
+                response.data['users'] = serializer.users
+            return response
+
+        stream = stream_format(request)
+        if stream:
+            if sideload:
+                raise ValidationError({"error": "include=users cannot be streamed"})
+            return streaming_response(allBooks, serializer.serialize, stream)
+
+        books = serializer.serialize(list(allBooks))
+        if sideload:
+            return Response({'results': books, 'users': serializer.users}, status=status.HTTP_200_OK)
+        return Response(books, status=status.HTTP_200_OK)
 
     if request.method == "POST":
         # Only authenticated users can create books
@@ -224,6 +279,59 @@ def bookList(request):
         return Response(serialized.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@extend_schema(
+    parameters=[
+        OpenApiParameter("q", str, required=True, description="Search text, every word is matched as a prefix"),
+        OpenApiParameter("page", int, description="1-based page number"),
+        OpenApiParameter("page_size", int, description="Number of books per page"),
+    ],
+    responses={200: BookSerializer(many=True)},
+    description="Full-text search over book title, author and description, best match first",
+    tags=["Books"]
+)
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def bookSearch(request):
+    """
+    Full-text search over title, author and description (public access)
+
+    Results are BM25-ranked (title hits weigh most) and paginated with `page`.
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response(
+            {"error": "Search query (q) is required"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        page = max(int(request.query_params.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    page_size = KeysetPagination().get_page_size(request)
+    offset = (page - 1) * page_size
+    # SQLite integers are 64-bit
+    if offset > 2 ** 63 - 1:
+        return Response(
+            {"error": "page is too large"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # Fetch one extra row to know whether there is a next page
+    books = search_books(query, limit=page_size + 1, offset=offset)
+    next_link = None
+    if len(books) > page_size:
+        books = books[:page_size]
+        next_link = replace_query_param(request.build_absolute_uri(), 'page', page + 1)
+
+    serialized = BookSerializer(books, many=True, context={'request': request})
+    return Response({
+        'next': next_link,
+        'results': serialized.data
+    }, status=status.HTTP_200_OK)
+
+
+@cache_public_response
 @extend_schema(
     request=BookSerializer,
     responses={
@@ -242,7 +350,7 @@ def bookDetail(request, bookId):
     DELETE: Delete a book (only book owner)
     """
     try:
-        book = Book.objects.get(pk=bookId)
+        book = Book.objects.select_related('user').get(pk=bookId)
     except Book.DoesNotExist:
         return Response(
             {"error": "Book not found"},
@@ -278,6 +386,50 @@ def bookDetail(request, bookId):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+@extend_schema(
+    parameters=[
+        OpenApiParameter("v", str, description="Cover URL version, only used to bust browser caches"),
+    ],
+    responses={(200, "image/*"): OpenApiTypes.BINARY},
+    description="The book's external cover image served through the local cover cache",
+    tags=["Books"]
+)
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def bookCover(request, bookId):
+    """
+    GET: Serve the book's coverUrl image from the local on-disk cover cache
+         Covers on hosts outside BOOK_COVER_PROXY_HOSTS are 404s: redirecting
+         to a user-supplied URL would make this an open redirect
+    """
+    book = Book.objects.filter(pk=bookId).values('coverUrl').first()
+    if book is None:
+        return Response(
+            {"error": "Book not found"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    cover_url = book['coverUrl']
+    if not cover_url:
+        return Response(
+            {"error": "Book has no cover URL"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    if not is_proxied(cover_url):
+        return Response(
+            {"error": "Cover is not served through the proxy"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    try:
+        return cover_response(request, cover_url)
+    except CoverFetchError:
+        return Response(
+            {"error": "Could not fetch the cover"},
+            status=status.HTTP_502_BAD_GATEWAY
+        )
+
+
 # ============== USER PROFILE ==============
 @extend_schema(
     request=UserSerializer,
@@ -310,21 +462,99 @@ def userProfile(request):
         return Response(serialized.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@extend_schema(
+    responses={200: BookSerializer(many=True)},
+    parameters=[
+        OpenApiParameter("cursor", str, description="Opaque cursor from the previous page's `next` link"),
+        OpenApiParameter("page_size", int, description="Number of books per page"),
+        OpenApiParameter("marked", str, description="Comma separated read/bought/onBookshelf, only books marked with all of them"),
+        OpenApiParameter("uploaded", bool, description="List the books the user uploaded instead of the marked ones"),
+    ],
+    description="The authenticated user's library: marked books, most recently marked first, or uploaded books, newest first",
+    tags=["User"]
+)
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def profileBooks(request):
+    """
+    GET: Keyset-paginated library of the current user: {"next": ..., "results": [...]}
+         Marked books by default, most recently changed mark first, read
+         in one UserBook -> Book join along the (user, updated_at) index
+         Filter with `marked=read,bought,onBookshelf`
+         Pass `uploaded=true` for the books the user uploaded, newest first
+    """
+    uploaded = request.query_params.get('uploaded', 'false').lower()
+    if uploaded not in ('true', 'false', '1', '0'):
+        raise ValidationError({"error": "uploaded must be true or false"})
+    flags = mark_flags(request.query_params.get('marked', ''))
+
+    if uploaded in ('true', '1'):
+        books = Book.objects.filter(user=request.user).select_related('user')
+        if flags:
+            conditions = {'user_marks__user': request.user}
+            conditions.update({f'user_marks__{flag}': True for flag in flags})
+            books = books.filter(**conditions)
+        paginator = KeysetPagination(('-id',))
+        page = paginator.paginate_queryset(books, request)
+        serialized = BookSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serialized.data)
+
+    marks = UserBook.objects.filter(user=request.user, **{flag: True for flag in flags}).select_related('book__user')
+    paginator = KeysetPagination(('-updated_at', '-id'))
+    page = paginator.paginate_queryset(marks, request)
+    # The marks are already loaded, BookListSerializer doesn't query them again
+    user_marks = {
+        mark.book_id: {'bought': mark.bought, 'read': mark.read, 'onBookshelf': mark.onBookshelf}
+        for mark in page
+    }
+    serialized = BookSerializer(
+        [mark.book for mark in page], many=True, context={'request': request, 'user_marks': user_marks}
+    )
+    return paginator.get_paginated_response(serialized.data)
+
+
+@extend_schema(
+    responses={200: OpenApiTypes.OBJECT},
+    description="Reading statistics of the authenticated user: mark totals, genres read and books read per month",
+    tags=["User"]
+)
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def profileStats(request):
+    """
+    GET: {"totals": {"marked", "read", "bought", "onBookshelf"},
+          "genres": [{"genre", "read"}, ...] (most read first),
+          "months": [{"month": "YYYY-MM", "read"}, ...] (oldest first)}
+         Computed in one aggregate query and cached per user until their
+         marks change, so repeated reads cost one cache lookup
+    """
+    return Response(profile_stats(request.user.pk), status=status.HTTP_200_OK)
+
+
 # ============== ADMIN - USERS ==============
 @extend_schema(
     responses={200: UserSerializer(many=True)},
+    parameters=[
+        OpenApiParameter("stream", str, enum=["ndjson", "json"], description="Stream the unpaginated list as NDJSON or a JSON array (or send `Accept: application/x-ndjson`)"),
+    ],
     description="[ADMIN ONLY] Get all users in the system",
     tags=["Admin"]
 )
 @api_view(["GET"])
 @permission_classes([IsSuperUser])
+@renderer_classes(STREAMING_RENDERER_CLASSES)
 def adminUserList(request):
     """
-    [ADMIN ONLY] List all users
+    [ADMIN ONLY] List all users (`stream=ndjson|json` streams it)
 
     Requires: is_superuser=True
     """
     users = User.objects.all().order_by('username')
+
+    stream = stream_format(request)
+    if stream:
+        return streaming_response(users, model_serializer(UserSerializer), stream)
+
     serialized = UserSerializer(users, many=True)
     return Response(serialized.data, status=status.HTTP_200_OK)
 
@@ -380,24 +610,42 @@ def adminUserDetail(request, userId):
         200: BookSerializer(many=True),
         201: BookSerializer
     },
+    parameters=[
+        OpenApiParameter("cursor", str, description="Opaque cursor from the previous page's `next` link"),
+        OpenApiParameter("page_size", int, description="Number of books per page"),
+        OpenApiParameter("stream", str, enum=["ndjson", "json"], description="Stream the unpaginated list as NDJSON or a JSON array (or send `Accept: application/x-ndjson`)"),
+    ],
     description="[ADMIN ONLY] Get all books (GET) or create a book for any user (POST)",
     tags=["Admin"]
 )
 @api_view(["GET", "POST"])
 @permission_classes([IsSuperUser])
+@renderer_classes(STREAMING_RENDERER_CLASSES)
 def adminBookList(request):
     """
     [ADMIN ONLY] List all books from all users or create a book
 
-    GET: List all books from all users
+    GET: List all books from all users (`page_size`/`cursor` paginate it,
+         `stream=ndjson|json` streams it)
     POST: Create a book (user ID must be provided in request body)
 
     Requires: is_superuser=True
     """
     if request.method == "GET":
-        books = Book.objects.all().order_by('author')
-        serialized = BookSerializer(books, many=True)
-        return Response(serialized.data, status=status.HTTP_200_OK)
+        # Read-only fast path, same output as BookSerializer without a request
+        books = book_rows(Book.objects.order_by('author', 'id'))
+        serializer = BookRowSerializer()
+
+        paginator = KeysetPagination()
+        if paginator.is_requested(request):
+            page = paginator.paginate_queryset(books, request)
+            return paginator.get_paginated_response(serializer.serialize(page))
+
+        stream = stream_format(request)
+        if stream:
+            return streaming_response(books, serializer.serialize, stream)
+
+        return Response(serializer.serialize(list(books)), status=status.HTTP_200_OK)
 
     if request.method == "POST":
         # Admin can specify the user ID
@@ -444,7 +692,7 @@ def adminBookDetail(request, bookId):
     Requires: is_superuser=True
     """
     try:
-        book = Book.objects.get(pk=bookId)
+        book = Book.objects.select_related('user').get(pk=bookId)
     except Book.DoesNotExist:
         return Response(
             {"error": "Book not found"},
@@ -503,72 +751,112 @@ def bookMark(request, bookId):
     POST: Mark a book (bought/read/onBookshelf)
     PATCH: Update existing mark
     DELETE: Remove mark
+
+    Each method is a single SQL statement (see marks.py).
     """
-    try:
-        book = Book.objects.get(pk=bookId)
-    except Book.DoesNotExist:
-        return Response(
-            {"error": "Book not found"},
-            status=status.HTTP_404_NOT_FOUND
-        )
+    if request.method in ("POST", "PATCH"):
+        try:
+            fields = parse_mark_fields(request.data)
+        except ValidationError as exc:
+            return Response(exc.detail, status=status.HTTP_400_BAD_REQUEST)
 
     if request.method == "POST":
-        # Create or get existing mark
-        user_book, created = UserBook.objects.get_or_create(
-            user=request.user,
-            book=book,
-            defaults={
-                'bought': request.data.get('bought', False),
-                'read': request.data.get('read', False),
-                'onBookshelf': request.data.get('onBookshelf', False)
-            }
-        )
-
-        if not created:
-            # If already exists, update it
-            user_book.bought = request.data.get('bought', user_book.bought)
-            user_book.read = request.data.get('read', user_book.read)
-            user_book.onBookshelf = request.data.get('onBookshelf', user_book.onBookshelf)
-            user_book.save()
-
-        return Response({
-            'bought': user_book.bought,
-            'read': user_book.read,
-            'onBookshelf': user_book.onBookshelf
-        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
-
-    if request.method == "PATCH":
-        try:
-            user_book = UserBook.objects.get(user=request.user, book=book)
-        except UserBook.DoesNotExist:
+        # Create or update the mark in one upsert
+        result = upsert_mark(request.user.pk, bookId, fields)
+        if result is None:
             return Response(
-                {"error": "Mark not found. Use POST to create one."},
+                {"error": "Book not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Update only provided fields
-        if 'bought' in request.data:
-            user_book.bought = request.data['bought']
-        if 'read' in request.data:
-            user_book.read = request.data['read']
-        if 'onBookshelf' in request.data:
-            user_book.onBookshelf = request.data['onBookshelf']
+        mark, created = result
+        return Response(mark, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
-        user_book.save()
+    if request.method == "PATCH":
+        # Update only provided fields
+        mark = update_mark(request.user.pk, bookId, fields)
+        if mark is None:
+            return _mark_not_found(bookId, "Mark not found. Use POST to create one.")
 
-        return Response({
-            'bought': user_book.bought,
-            'read': user_book.read,
-            'onBookshelf': user_book.onBookshelf
-        }, status=status.HTTP_200_OK)
+        return Response(mark, status=status.HTTP_200_OK)
 
     if request.method == "DELETE":
-        try:
-            user_book = UserBook.objects.get(user=request.user, book=book)
-            user_book.delete()
+        if delete_mark(request.user.pk, bookId):
             return Response(status=status.HTTP_204_NO_CONTENT)
-        except UserBook.DoesNotExist:
-            return Response(
-                {"error": "Mark not found"},
-                status=status.HTTP_404_NOT_FOUND
-            )
+        return _mark_not_found(bookId, "Mark not found")
+
+
+def _mark_not_found(bookId, message):
+    """404 for a missing mark, telling a missing book apart only on this error path"""
+    if not Book.objects.filter(pk=bookId).exists():
+        message = "Book not found"
+    return Response(
+        {"error": message},
+        status=status.HTTP_404_NOT_FOUND
+    )
+
+
+@extend_schema(
+    request={
+        "application/json": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "book": {"type": "integer"},
+                    "bought": {"type": "boolean"},
+                    "read": {"type": "boolean"},
+                    "onBookshelf": {"type": "boolean"},
+                    "delete": {"type": "boolean"}
+                },
+                "required": ["book"]
+            }
+        }
+    },
+    responses={
+        200: {
+            "type": "object",
+            "properties": {
+                "results": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "book": {"type": "integer"},
+                            "status": {"type": "string", "enum": ["created", "updated", "deleted", "error"]},
+                            "mark": {"type": "object"},
+                            "error": {"type": "string"}
+                        }
+                    }
+                }
+            }
+        }
+    },
+    description="Create, update or remove many marks in one request - requires authentication",
+    tags=["Book Marks"]
+)
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def bookMarkBulk(request):
+    """
+    POST: Apply a list of mark changes in one transaction
+
+    Items are {book, bought, read, onBookshelf} to create/update a mark or
+    {book, delete: true} to remove it. Every item gets its own result.
+    """
+    items = request.data
+    if not isinstance(items, list):
+        return Response(
+            {"error": "Expected a list of marks"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    max_items = getattr(settings, 'BOOK_BULK_MARK_LIMIT', 1000)
+    if len(items) > max_items:
+        return Response(
+            {"error": f"At most {max_items} marks can be changed at once"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    results = apply_bulk_marks(request.user, items)
+    return Response({"results": results}, status=status.HTTP_200_OK)
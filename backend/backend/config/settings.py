@@ -53,6 +53,8 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'booklist.middleware.ReplicaRoutingMiddleware',
+    'booklist.middleware.ServerTimingMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -78,13 +80,82 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# Applied to every new SQLite connection: WAL lets readers run alongside
+# the writer, NORMAL sync is durable in WAL mode except on power loss, and
+# writers wait up to busy_timeout ms for the lock instead of failing
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -32000,  # KiB
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        # Reuse connections across requests, the pragmas then run once per thread
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            # Take the write lock at BEGIN: a deferred transaction that reads
+            # first fails with "database is locked" when upgrading to a write
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+    # Local stand-in for a read replica: a snapshot of db.sqlite3 refreshed
+    # by `manage.py sync_replica`
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.replica.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in {**SQLITE_PRAGMAS, 'query_only': 1}.items()),
+        },
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+# Safe requests read from these aliases, e.g. ['replica'] with sync_replica
+# running; empty sends everything to the primary (see booklist/routers.py)
+DATABASE_ROUTERS = ['booklist.routers.ReplicaRouter']
+BOOK_READ_REPLICAS = []
+# Reads of a client that wrote stay on the primary this long, it has to
+# cover the replica lag. Pins live in CACHES, which must be shared when
+# there are several worker processes, or a client's next request may read a
+# stale replica on another worker. Anonymous writes pin the client address,
+# so every client behind the same proxy/NAT is pinned with it.
+BOOK_PRIMARY_PIN_SECONDS = 5
+
+# Django's cache holds the invalidation state shared by the workers: the
+# catalog version (booklist/cache.py), the per-user auth and stats versions
+# (authentication.py, stats.py) and the read-your-writes pins (routers.py).
+# The local-memory backend is per process, so a change handled by one
+# process is not seen by the others: their cached responses, tokens and
+# stats stay stale and pins don't apply. It is only correct with a single
+# process (runserver, one threaded worker). With several workers point them
+# all at one shared backend, e.g. RedisCache (needs the redis package):
+#   'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+#   'LOCATION': 'redis://127.0.0.1:6379',
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'booklist',
+        # Evicted versions are replaced by new ones, each eviction
+        # invalidates what was cached under them
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+# Retries of mark writes that still find the database locked (see booklist/db.py)
+BOOK_DB_WRITE_RETRIES = 4
+BOOK_DB_RETRY_DELAY = 0.05
+BOOK_DB_RETRY_MAX_DELAY = 1.0
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -135,9 +206,83 @@ CORS_ORIGIN_ALLOW_ALL = True
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'booklist.authentication.CachedJWTAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'booklist.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'booklist.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# JSON encoder/decoder of the API: 'orjson' (falls back to 'json' when
+# orjson is not installed) or 'json' for DRF's stdlib one (see booklist/renderers.py)
+BOOK_JSON_BACKEND = 'orjson'
+
+# Verified access tokens and user snapshots kept by CachedJWTAuthentication
+# (see booklist/authentication.py). Entries expire after the TTL (seconds)
+# or when the user is saved. 0 entries disables the cache.
+# Saving a user only reaches the other processes through a shared CACHES
+# backend: with the default per-process one, a deactivated user or changed
+# password is only seen by other workers once their entries expire, so
+# keep the TTL short unless CACHES is shared.
+BOOK_AUTH_CACHE_SIZE = 10000
+BOOK_AUTH_CACHE_TTL = 30
+
+# Keyset pagination for book listings (?page_size=&cursor=)
+BOOK_PAGE_SIZE = 50
+BOOK_MAX_PAGE_SIZE = 200
+
+# Description length of ?view=compact book lists
+BOOK_EXCERPT_LENGTH = 200
+
+# Rows serialized per chunk by ?stream=ndjson|json list responses
+BOOK_STREAM_CHUNK_SIZE = 500
+
+# In-process LRU of anonymous book list/detail responses (see booklist/cache.py)
+BOOK_RESPONSE_CACHE_MAX_BYTES = 16 * 1024 * 1024
+# Cached anonymous responses are served for at most this many seconds, as
+# engagement counters change without invalidating them. A trade-off: every
+# cached URL is rebuilt once per period even without catalog changes; 0 keeps
+# entries until a catalog change, with the counters frozen meanwhile
+BOOK_RESPONSE_CACHE_TTL = 60
+
+# Per-user /api/profile/stats/ entries are invalidated by the user's mark
+# changes and by edits or deletes of the books they marked, the timeout only
+# bounds how long unused entries stay in the cache
+BOOK_PROFILE_STATS_TTL = 24 * 60 * 60
+
+# Maximum number of items accepted by /api/books/marks/bulk/
+BOOK_BULK_MARK_LIMIT = 1000
+
+# Resized WebP/JPEG cover copies, rendered by a process pool after upload
+# (see booklist/thumbnails.py). 0 workers renders inline.
+BOOK_COVER_RENDITIONS = {
+    'card': (200, 300),
+    'detail': (400, 600),
+    'retina': (800, 1200),
 }
+BOOK_COVER_QUALITY = 80
+BOOK_THUMBNAIL_WORKERS = 2
+BOOK_THUMBNAIL_QUEUE = 100
+
+# Local caching proxy for external coverUrl images (see booklist/covers.py)
+BOOK_COVER_PROXY_HOSTS = ['covers.openlibrary.org']
+BOOK_COVER_CACHE_DIR = BASE_DIR / 'cover_cache'
+BOOK_COVER_CACHE_MAX_BYTES = 256 * 1024 * 1024
+BOOK_COVER_PROXY_TIMEOUT = 5
+BOOK_COVER_PROXY_MAX_AGE = 365 * 24 * 3600
+# Browser cache lifetime of proxy requests without the current ?v= version
+BOOK_COVER_UNVERSIONED_MAX_AGE = 300
+
+# Per-request SQL/timing instrumentation (see booklist/middleware.py)
+BOOK_SERVER_TIMING = DEBUG
+BOOK_TIMING_LOG = False
+BOOK_DUPLICATE_QUERY_THRESHOLD = 5
 
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Book List API',
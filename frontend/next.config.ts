@@ -19,6 +19,12 @@ const nextConfig: NextConfig = {
 				port: "8000",
 				pathname: "/media/**",
 			},
+			{
+				protocol: "http",
+				hostname: "localhost",
+				port: "8000",
+				pathname: "/api/books/*/cover/**",
+			},
 		],
 	},
 };
@@ -335,15 +335,15 @@ export default function AdminPage() {
 									>
 										<TableCell>
 											<div className="relative w-12 h-16 bg-stone-100 rounded overflow-hidden">
-												{getBookCoverUrl(book) ? (
+												{getBookCoverUrl(book, "card") ? (
 													<Image
-														src={getBookCoverUrl(book)!}
+														src={getBookCoverUrl(book, "card")!}
 														fill
 														alt={book.title}
 														className="object-cover"
 														unoptimized={
-															getBookCoverUrl(book)!.includes("localhost") ||
-															getBookCoverUrl(book)!.includes("127.0.0.1")
+															getBookCoverUrl(book, "card")!.includes("localhost") ||
+															getBookCoverUrl(book, "card")!.includes("127.0.0.1")
 														}
 													/>
 												) : (
@@ -50,19 +50,9 @@ export default function AuthorPage() {
 
 		const fetchBooks = async () => {
 			try {
-				const response = await bookApi.getAll();
-				console.log("All books:", response.data.length);
-				console.log(
-					"Authors in DB:",
-					response.data.map((b) => b.author)
-				);
-				console.log("Looking for author:", authorName);
-				// Filter books by author name (case-insensitive)
-				const authorBooks = response.data.filter(
-					(book) => book.author.toLowerCase() === authorName.toLowerCase()
-				);
-				console.log("Found books:", authorBooks.length);
-				setBooks(authorBooks);
+				// Filter books by author name on the server (case-insensitive)
+				const response = await bookApi.getAll({ author: authorName });
+				setBooks(response.data);
 			} catch (error) {
 				console.error("Failed to fetch books:", error);
 			} finally {
@@ -55,7 +55,7 @@ export default function BookDetailsPage() {
 	const [coverType, setCoverType] = useState<"url" | "file">("url");
 	const [coverFile, setCoverFile] = useState<File | null>(null);
 	const [coverUrl, setCoverUrl] = useState("");
-	const coverUrlDisplay = book ? getBookCoverUrl(book) : null;
+	const coverUrlDisplay = book ? getBookCoverUrl(book, "detail") : null;
 
 	useEffect(() => {
 		const fetchBook = async () => {
@@ -102,6 +102,10 @@ export default function BookDetailsPage() {
 			// Update local state
 			setBook({
 				...book,
+				engagement: {
+					...book.engagement,
+					[action]: book.engagement[action] + (newValue ? 1 : -1),
+				},
 				user_mark: {
 					...(book.user_mark || {
 						bought: false,
@@ -358,6 +362,10 @@ export default function BookDetailsPage() {
 								<p className="text-xl text-amber-700 font-medium">
 									by {book.author}
 								</p>
+								<p className="text-sm text-stone-500 mt-2">
+									{book.engagement.read} read · {book.engagement.onBookshelf} on
+									bookshelves · {book.engagement.bought} bought
+								</p>
 							</div>
 
 							{/* Book Details */}
@@ -1,6 +1,6 @@
 "use client";
 import { Book } from "@/interface";
-import { bookApi } from "@/lib/api-routes";
+import { profileApi } from "@/lib/api-routes";
 import { useEffect, useState, useMemo } from "react";
 import BookCard from "@/components/shared/book-card";
 import Bookshelf from "@/components/shared/bookshelf";
@@ -48,8 +48,7 @@ export default function MyBooksPage() {
 
 		const fetchBooks = async () => {
 			try {
-				const response = await bookApi.getAll();
-				setBooks(response.data);
+				setBooks(await profileApi.getAllBooks());
 			} catch (error) {
 				console.error("Failed to fetch books:", error);
 			} finally {
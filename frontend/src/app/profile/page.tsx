@@ -2,8 +2,8 @@
 import { useEffect, useState } from "react";
 import { useRouter } from "next/navigation";
 import { useUser } from "@/hooks/use-user";
-import { adminApi, authApi, bookApi } from "@/lib/api-routes";
-import { User, Book } from "@/interface";
+import { adminApi, authApi, profileApi } from "@/lib/api-routes";
+import { User, Book, ReadingStats } from "@/interface";
 import { Button } from "@/components/ui/button";
 import { UserCircle, ArrowLeft } from "lucide-react";
 import { toast } from "sonner";
@@ -18,6 +18,7 @@ export default function ProfilePage() {
 	const router = useRouter();
 	const { user, isAuthenticated } = useUser();
 	const [userBooks, setUserBooks] = useState<Book[]>([]);
+	const [stats, setStats] = useState<ReadingStats | null>(null);
 	const [loading, setLoading] = useState(true);
 	const [isEditingUser, setIsEditingUser] = useState(false);
 	const [editedUser, setEditedUser] = useState<Partial<User>>({});
@@ -39,18 +40,24 @@ export default function ProfilePage() {
 		if (user) {
 			setEditedUser(user);
 			fetchUserBooks();
+			fetchStats();
 		}
 	}, [isAuthenticated, user, router]);
 
+	const fetchStats = async () => {
+		try {
+			const response = await profileApi.getStats();
+			setStats(response.data);
+		} catch (error) {
+			console.error("Failed to fetch reading stats:", error);
+		}
+	};
+
 	const fetchUserBooks = async () => {
 		if (!user) return;
 
 		try {
-			const booksResponse = await bookApi.getAll();
-			const userBooksFiltered = booksResponse.data.filter(
-				(book) => book.user.id === user.id
-			);
-			setUserBooks(userBooksFiltered);
+			setUserBooks(await profileApi.getAllBooks({ uploaded: true }));
 		} catch (error) {
 			console.error("Failed to fetch user books:", error);
 			toast.error("Failed to load your books");
@@ -197,6 +204,14 @@ export default function ProfilePage() {
 					<p className="text-stone-600 mt-2">
 						Manage your account and uploaded books
 					</p>
+					{stats && (
+						<p className="text-sm text-stone-500 mt-1">
+							{stats.totals.read} read · {stats.totals.onBookshelf} on bookshelf ·{" "}
+							{stats.totals.bought} bought
+							{stats.genres.length > 0 &&
+								` · mostly ${stats.genres[0].genre}`}
+						</p>
+					)}
 					<Button
 						variant="ghost"
 						onClick={() => router.back()}
@@ -1,5 +1,5 @@
 "use client";
-import { Book } from "@/interface";
+import { CompactBook } from "@/interface";
 import { bookApi } from "@/lib/api-routes";
 import { useEffect, useState, useMemo } from "react";
 import BookCard from "@/components/shared/book-card";
@@ -22,13 +22,13 @@ import {
 } from "@/components/ui/card";
 
 export default function BrowsePage() {
-	const [books, setBooks] = useState<Book[]>([]);
+	const [books, setBooks] = useState<CompactBook[]>([]);
 	const [searchQuery, setSearchQuery] = useState("");
 	const router = useRouter();
 
 	useEffect(() => {
 		const booksPromise = async () => {
-			const response = await bookApi.getAll();
+			const response = await bookApi.getCompact();
 			setBooks(response.data);
 		};
 		booksPromise();
@@ -36,7 +36,7 @@ export default function BrowsePage() {
 
 	// Group books by genre
 	const booksByGenre = useMemo(() => {
-		const genres: Record<string, Book[]> = {};
+		const genres: Record<string, CompactBook[]> = {};
 		books.forEach((book) => {
 			const genre = book.genre || "Uncategorized";
 			if (!genres[genre]) {
@@ -58,7 +58,7 @@ export default function BrowsePage() {
 
 	// Group books by author
 	const booksByAuthor = useMemo(() => {
-		const authors: Record<string, Book[]> = {};
+		const authors: Record<string, CompactBook[]> = {};
 		books.forEach((book) => {
 			if (!authors[book.author]) {
 				authors[book.author] = [];
@@ -106,7 +106,7 @@ export default function BrowsePage() {
 		// Filter by search query
 		if (searchQuery.trim()) {
 			const query = searchQuery.toLowerCase();
-			const filterBooks = (bookList: Book[]) =>
+			const filterBooks = (bookList: CompactBook[]) =>
 				bookList.filter(
 					(book) =>
 						book.title.toLowerCase().includes(query) ||
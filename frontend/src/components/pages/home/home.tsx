@@ -1,5 +1,5 @@
 "use client";
-import { Book } from "@/interface";
+import { CompactBook } from "@/interface";
 import { bookApi } from "@/lib/api-routes";
 import { useEffect, useState, useMemo } from "react";
 import BookCard from "@/components/shared/book-card";
@@ -34,7 +34,7 @@ type FilterCategory = "all" | "bought" | "read" | "onBookshelf";
 const ITEMS_PER_PAGE = 48;
 
 export default function HomePage() {
-	const [books, setBooks] = useState<Book[]>([]);
+	const [books, setBooks] = useState<CompactBook[]>([]);
 	const [searchQuery, setSearchQuery] = useState("");
 	const [activeCategory, setActiveCategory] = useState<FilterCategory>("all");
 	const [currentPage, setCurrentPage] = useState(1);
@@ -43,7 +43,7 @@ export default function HomePage() {
 
 	useEffect(() => {
 		const booksPromise = async () => {
-			const response = await bookApi.getAll();
+			const response = await bookApi.getCompact();
 			setBooks(response.data);
 		};
 		booksPromise();
@@ -1,17 +1,17 @@
 "use client";
-import { Book } from "@/interface";
+import { Book, CompactBook } from "@/interface";
 import Image from "next/image";
 import { BookOpen } from "lucide-react";
 import { useRouter } from "next/navigation";
 import { getBookCoverUrl } from "@/lib/utils/book-cover";
 
 interface BookCardProps {
-	book: Book;
+	book: Book | CompactBook;
 }
 
 export default function BookCard({ book }: BookCardProps) {
 	const router = useRouter();
-	const coverUrl = getBookCoverUrl(book);
+	const coverUrl = getBookCoverUrl(book, "card");
 
 	return (
 		<div
@@ -43,7 +43,7 @@ export default function Bookshelf({ books }: BookshelfProps) {
 				{/* Books on shelf */}
 				<div className="flex items-end gap-2 min-h-50 pb-4 overflow-x-auto">
 					{displayBooks.map((book) => {
-				const coverUrl = getBookCoverUrl(book);
+				const coverUrl = getBookCoverUrl(book, "card");
 				return (
 						<div
 							key={book.id}
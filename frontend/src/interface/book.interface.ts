@@ -7,6 +7,17 @@ export interface UserBookMark {
 	onBookshelf: boolean;
 }
 
+// How many users marked a book read, bought or on their bookshelf
+export type BookEngagement = Record<keyof UserBookMark, number>;
+
+// Resized copies of an uploaded cover
+export type CoverRenditionSize = "card" | "detail" | "retina";
+
+export interface CoverRendition {
+	webp: string;
+	jpeg: string;
+}
+
 // Response Type
 export interface Book {
 	id: number;
@@ -17,10 +28,48 @@ export interface Book {
 	genre: string | null;
 	cover: string | null;
 	coverUrl: string | null;
+	coverRenditions: Record<CoverRenditionSize, CoverRendition> | null; // null until generated
+	coverProxyUrl: string | null; // coverUrl served from the backend's cover cache
+	engagement: BookEngagement;
 	user: User;
 	user_mark: UserBookMark | null; // null if user is not authenticated or hasn't marked this book
 }
 
+// GET /books/?view=compact: description cut to an excerpt, owner as an id
+export interface CompactBook extends Omit<Book, "user"> {
+	user: number;
+}
+
+// Query parameters for GET /books/
+export interface BookListParams {
+	author?: string;
+	genre?: string;
+	user?: number;
+	marked?: string; // "any" or comma separated read/bought/onBookshelf
+	fields?: string; // comma separated subset of the Book fields
+	sort?: "author" | "popular"; // popular: most read first
+}
+
+// Query parameters for GET /profile/books/
+export interface LibraryParams {
+	marked?: string; // comma separated read/bought/onBookshelf
+	uploaded?: boolean; // the user's uploads instead of the marked books
+	page_size?: number;
+}
+
+// Keyset-paginated list response
+export interface Page<T> {
+	next: string | null;
+	results: T[];
+}
+
+// GET /profile/stats/
+export interface ReadingStats {
+	totals: { marked: number } & BookEngagement;
+	genres: { genre: string; read: number }[]; // most read first
+	months: { month: string; read: number }[]; // "YYYY-MM", oldest first
+}
+
 // Request DTOs
 export interface CreateBookDto {
 	title: string;
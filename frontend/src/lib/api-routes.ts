@@ -1,8 +1,13 @@
 import {
 	Book,
+	BookListParams,
 	BookMarkDto,
+	CompactBook,
 	CreateBookDto,
+	LibraryParams,
 	LoginDto,
+	Page,
+	ReadingStats,
 	LoginResponse,
 	RegisterDto,
 	RegisterResponse,
@@ -47,7 +52,10 @@ export const bookApi = {
 	create: (data: CreateBookDto) => api.post<Book>("/books/", data),
 
 	// get books
-	getAll: () => api.get<Book[]>("/books/"),
+	getAll: (params?: BookListParams) => api.get<Book[]>("/books/", { params }),
+	// smaller payload for book cards
+	getCompact: (params?: BookListParams) =>
+		api.get<CompactBook[]>("/books/", { params: { ...params, view: "compact" } }),
 	getById: (id: string) => api.get<Book>(`/books/${id}/`),
 
 	// update book
@@ -72,6 +80,26 @@ export const bookApi = {
 	},
 };
 
+export const profileApi = {
+	// one page of the current user's marked (or uploaded) books
+	getBooks: (params?: LibraryParams) =>
+		api.get<Page<Book>>("/profile/books/", { params }),
+
+	// the whole library, following the `next` links
+	getAllBooks: async (params?: LibraryParams) => {
+		let response = await profileApi.getBooks({ page_size: 200, ...params });
+		const books = [...response.data.results];
+		while (response.data.next) {
+			response = await api.get<Page<Book>>(response.data.next);
+			books.push(...response.data.results);
+		}
+		return books;
+	},
+
+	// totals, genres read and books read per month, cached server-side
+	getStats: () => api.get<ReadingStats>("/profile/stats/"),
+};
+
 export const adminApi = {
 	// Users management
 	users: {
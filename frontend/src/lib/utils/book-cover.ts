@@ -1,12 +1,19 @@
-import { Book } from "@/interface";
+import { Book, CompactBook, CoverRenditionSize } from "@/interface";
 
 /**
  * Get the cover URL for a book, prioritizing uploaded files over external URLs
  * @param book - The book object
+ * @param size - Resized WebP rendition to use for uploaded covers, once the backend has generated it
  * @returns The cover URL or null if no cover is available
  */
-export function getBookCoverUrl(book: Book): string | null {
-	// Priority 1: Uploaded cover file
+export function getBookCoverUrl(book: Book | CompactBook, size?: CoverRenditionSize): string | null {
+	// Priority 1: Resized copy of the uploaded cover
+	const rendition = size ? book.coverRenditions?.[size]?.webp : undefined;
+	if (rendition) {
+		return rendition;
+	}
+
+	// Priority 2: Uploaded cover file
 	if (book.cover) {
 		// Check if backend already returned a full URL (starts with http:// or https://)
 		if (book.cover.startsWith('http://') || book.cover.startsWith('https://')) {
@@ -25,7 +32,10 @@ export function getBookCoverUrl(book: Book): string | null {
 		return `${baseUrl}/media/${book.cover}`;
 	}
 
-	// Priority 2: External URL
+	// Priority 3: External URL, through the backend's cover cache when it proxies that host
+	if (book.coverProxyUrl) {
+		return book.coverProxyUrl;
+	}
 	if (book.coverUrl) {
 		return book.coverUrl;
 	}